@@ -0,0 +1,106 @@
+"""
+Async in-process HTTP client for the Behave HTTP stage.
+
+Drives the test app through ``httpx.AsyncClient`` +
+``httpx.ASGITransport`` on **one long-lived event loop** instead of
+``fastapi.testclient.TestClient``, which hops through an anyio portal
+thread for every request.
+
+Step files keep calling ``context.client.post(...)`` etc.: the
+:class:`AsyncStageClient` facade exposes the same synchronous surface as
+``TestClient`` and returns plain ``httpx.Response`` objects.  Requests run
+one at a time; the gain is the shared loop, not concurrency.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable
+from typing import Any
+
+import httpx
+from fastapi import FastAPI
+
+BASE_URL = "http://testserver"
+
+
+class AsyncStageLoop:
+    """Owns the event loop shared by every :class:`AsyncStageClient`.
+
+    Create once in ``before_all`` and :meth:`close` it in ``after_all``.
+    """
+
+    def __init__(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._clients: set[AsyncStageClient] = set()
+
+    def client(self, app: FastAPI) -> AsyncStageClient:
+        """Open a client bound to *app* on this loop."""
+        client = AsyncStageClient(self, app)
+        self._clients.add(client)
+        return client
+
+    def run(self, awaitable: Awaitable[Any]) -> Any:
+        """Run *awaitable* to completion on the shared loop."""
+        return self._loop.run_until_complete(awaitable)
+
+    def _forget(self, client: AsyncStageClient) -> None:
+        self._clients.discard(client)
+
+    def close(self) -> None:
+        for client in list(self._clients):
+            client.close()
+        self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        self._loop.close()
+
+
+class AsyncStageClient:
+    """Synchronous ``TestClient``-compatible facade over ``httpx.AsyncClient``.
+
+    Every request goes through the :meth:`arequest` coroutine on the shared
+    loop (:mod:`timing` wraps it to time requests).
+    """
+
+    def __init__(self, loop: AsyncStageLoop, app: FastAPI) -> None:
+        self._loop = loop
+        self._client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url=BASE_URL,
+            # -- Same default as ``TestClient``; steps rely on it.
+            follow_redirects=True,
+        )
+        self._closed = False
+
+    @property
+    def cookies(self) -> httpx.Cookies:
+        return self._client.cookies
+
+    async def arequest(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        return await self._client.request(method, url, **kwargs)
+
+    # -- Sync API (TestClient-compatible) --
+
+    def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        return self._loop.run(self.arequest(method, url, **kwargs))
+
+    def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def delete(self, url: str, **kwargs: Any) -> httpx.Response:
+        return self.request("DELETE", url, **kwargs)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._loop.run(self._client.aclose())
+        self._loop._forget(self)
@@ -0,0 +1,71 @@
+"""
+Per-worker cache of the admin's authenticated Playwright storage state.
+
+Signing in through the UI is the slowest part of most UI scenarios.  The
+cache drives :class:`pages.sign_in_page.SignInPage` once, captures the
+resulting ``storage_state`` (cookies plus ``localStorage`` such as
+``access_token``) and lets the environment seed every new browser context
+from it.
+
+When the backend rejects the cached session the frontend redirects to
+``/sign-in``; callers then :meth:`AuthStateCache.invalidate` it and
+:meth:`AuthStateCache.store` the state of their fresh login.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any
+
+from test_config import DEFAULT_TIMEOUT_MS
+
+from pages.sign_in_page import SignInPage
+
+
+class AuthStateCache:
+    """Lazily logged-in ``storage_state`` shared by one worker's scenarios."""
+
+    def __init__(
+        self,
+        browser: Any,
+        base_url: str,
+        username: str,
+        password: str,
+        path: str | None = None,
+    ) -> None:
+        self.browser = browser
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.path = path
+        self.state: dict[str, Any] | None = None
+        self.logins = 0
+
+    def get(self) -> dict[str, Any]:
+        """The cached state, logging in with a throwaway context if needed."""
+        if self.state is None:
+            browser_context = self.browser.new_context()
+            try:
+                page = browser_context.new_page()
+                sign_in = SignInPage(page, self.base_url)
+                sign_in.navigate()
+                sign_in.login(self.username, self.password)
+                page.wait_for_url(
+                    lambda url: "/sign-in" not in url, timeout=DEFAULT_TIMEOUT_MS
+                )
+                self.store(browser_context)
+            finally:
+                browser_context.close()
+        return self.state
+
+    def store(self, browser_context: Any) -> None:
+        """Capture the state of a context that has just signed in."""
+        if self.path:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.state = browser_context.storage_state(path=self.path)
+        self.logins += 1
+
+    def invalidate(self) -> None:
+        self.state = None
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,156 @@
+"""
+Indexed recorder for requests dispatched into spreadsheet interactors.
+
+:class:`RecordingInteractor` sits in front of the (mocked) interactor that
+the DI container hands to a controller and records every request passed
+to ``execute()`` into a shared :class:`DispatchRecorder`.
+
+The recorder indexes requests by ``(kind, operation)`` and by hashable
+payload items, so step files can assert dispatches in O(1) instead of
+scanning ``AsyncMock.await_args_list``.  Sub-operations of batch requests
+(``payload["operations"]``) are indexed by ``operation_type`` and
+``operation_id`` as well, which keeps assertions on batches with
+thousands of ``BatchOperationPydantic`` entries cheap.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Mapping
+from typing import Any
+
+COMMAND = "command"
+QUERY = "query"
+
+
+def _value_of(item: Any) -> Any:
+    """Normalize enums to their raw value for index keys."""
+    return getattr(item, "value", item)
+
+
+def _is_hashable(value: Any) -> bool:
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def _field(item: Any, name: str) -> Any:
+    if isinstance(item, Mapping):
+        return item.get(name)
+    return getattr(item, name, None)
+
+
+class DispatchRecorder:
+    """Multimap of dispatched requests with payload-subset lookup."""
+
+    def __init__(self) -> None:
+        self._by_kind: dict[str, list[Any]] = defaultdict(list)
+        self._by_operation: dict[tuple[str, str], list[Any]] = defaultdict(list)
+        self._by_payload_item: dict[tuple, list[Any]] = defaultdict(list)
+        self._batch_by_type: dict[tuple[str, str], list[Any]] = defaultdict(list)
+        self._batch_by_id: dict[tuple[str, str], Any] = {}
+
+    def __len__(self) -> int:
+        return sum(len(requests) for requests in self._by_kind.values())
+
+    # -- Recording --
+
+    def record(self, kind: str, request: Any) -> None:
+        operation = getattr(request, "operation", None)
+        self._by_kind[kind].append(request)
+        self._by_operation[(kind, operation)].append(request)
+
+        payload = getattr(request, "payload", None)
+        if not isinstance(payload, Mapping):
+            return
+        for key, value in payload.items():
+            if _is_hashable(value):
+                self._by_payload_item[(kind, operation, key, value)].append(request)
+        for sub_operation in payload.get("operations") or ():
+            operation_type = _value_of(_field(sub_operation, "operation_type"))
+            self._batch_by_type[(kind, operation_type)].append(sub_operation)
+            operation_id = _field(sub_operation, "operation_id")
+            if operation_id is not None:
+                self._batch_by_id[(kind, operation_id)] = sub_operation
+
+    # -- Queries --
+
+    def count(self, kind: str, operation: str | None = None) -> int:
+        if operation is None:
+            return len(self._by_kind.get(kind, ()))
+        return len(self._by_operation.get((kind, operation), ()))
+
+    def calls(self, kind: str, operation: str) -> list[Any]:
+        """Every request dispatched with *operation*, in dispatch order."""
+        return list(self._by_operation.get((kind, operation), ()))
+
+    def last(self, kind: str, operation: str | None = None) -> Any | None:
+        requests = (
+            self._by_kind.get(kind)
+            if operation is None
+            else self._by_operation.get((kind, operation))
+        )
+        return requests[-1] if requests else None
+
+    def find(
+        self,
+        kind: str,
+        operation: str,
+        payload_subset: Mapping[str, Any] | None = None,
+    ) -> Any | None:
+        """First request of *operation* whose payload contains *payload_subset*.
+
+        Candidates come from the smallest payload-item bucket, so the lookup
+        does not depend on how many other requests were dispatched.
+        """
+        if not payload_subset:
+            requests = self._by_operation.get((kind, operation))
+            return requests[0] if requests else None
+
+        buckets = [
+            self._by_payload_item.get((kind, operation, key, value), [])
+            for key, value in payload_subset.items()
+            if _is_hashable(value)
+        ]
+        candidates = (
+            min(buckets, key=len)
+            if buckets
+            else self._by_operation.get((kind, operation), [])
+        )
+        for request in candidates:
+            payload = getattr(request, "payload", {})
+            if all(
+                key in payload and payload[key] == value
+                for key, value in payload_subset.items()
+            ):
+                return request
+        return None
+
+    def batch_operations(self, kind: str, operation_type: str) -> list[Any]:
+        """Every batched sub-operation of *operation_type* across all requests."""
+        return list(self._batch_by_type.get((kind, _value_of(operation_type)), ()))
+
+    def batch_operation(self, kind: str, operation_id: str) -> Any | None:
+        return self._batch_by_id.get((kind, operation_id))
+
+
+class RecordingInteractor:
+    """Spy that records each ``execute()`` request, then delegates to *target*.
+
+    Any other attribute is looked up on *target*, so the spy is transparent
+    to controllers and to step files that configure the underlying mock.
+    """
+
+    def __init__(self, target: Any, recorder: DispatchRecorder, kind: str) -> None:
+        self._target = target
+        self._recorder = recorder
+        self._kind = kind
+
+    async def execute(self, request: Any, *args: Any, **kwargs: Any) -> Any:
+        self._recorder.record(self._kind, request)
+        return await self._target.execute(request, *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._target, name)
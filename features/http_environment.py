@@ -15,12 +15,52 @@ The mocked interactors / handlers can be configured per-step via
    ``uv sync`` at the monorepo root, so no ``sys.path`` manipulation
    for ``backend/src`` is needed.  Only the ``features/`` directory
    itself is appended so that ``mock_app`` can be imported by name.
+
+Client mode
+~~~~~~~~~~~
+``BDD_HTTP_CLIENT=sync`` (default) drives the app through
+``fastapi.testclient.TestClient``.  ``BDD_HTTP_CLIENT=async`` drives it
+through ``httpx.AsyncClient`` + ``ASGITransport`` on one long-lived event
+loop (see :mod:`async_client`); step files are unaffected.
+
+Client scope
+~~~~~~~~~~~~
+``BDD_HTTP_CLIENT_SCOPE=scenario`` (default) opens and closes a client per
+scenario.  ``BDD_HTTP_CLIENT_SCOPE=session`` opens one client per run (per
+worker when sharded) and keeps its portal / connection alive.
+``after_scenario`` resets the registry and clears the cookie jar; the next
+``before_scenario`` checks the state it inherits *before* resetting
+anything, so a mock, dispatch, engine entry or cookie touched after the
+teardown (late hooks, requests still running on the event loop, background
+workers) fails the scenario.
+
+Backend
+~~~~~~~
+``BDD_HTTP_BACKEND=mock`` (default) answers spreadsheet commands / queries
+with ``AsyncMock`` return values configured by steps.
+``BDD_HTTP_BACKEND=engine`` — or the ``@engine`` scenario tag — routes them
+into the stateful in-memory :mod:`spreadsheet_engine` instead.
+``BDD_ENGINE_PLAN_BATCHES=1`` — or the ``@plan_batches`` scenario tag —
+builds that engine with ``plan_batches=True``, so ``:batch`` requests go
+through the batch planner.
+
+Step lookups go through :mod:`step_index` (prefix trie + per-text cache);
+``BDD_STEP_INDEX=off`` falls back to behave's linear scan.
+
+Set ``BDD_TIMING_REPORT=<path>`` to record per-step and per-endpoint
+timings (see :mod:`timing`).
+
+Set ``BDD_HTTP_OVERHEAD_REPORT=<path>`` to record the per-scenario hook
+overhead of the current mode into a JSON file; runs in different modes
+accumulate in the same file and are compared in the ``after_all`` summary.
 """
 
 from __future__ import annotations
 
+import json
 import os
 import sys
+import time
 
 # ---------------------------------------------------------------------------
 # Ensure ``features/`` is importable so ``mock_app`` resolves by name.
@@ -32,26 +72,149 @@ if _FEATURES_DIR not in sys.path:
 
 from fastapi.testclient import TestClient  # noqa: E402
 
+from async_client import AsyncStageLoop  # noqa: E402
 from mock_app import MockRegistry, create_test_app  # noqa: E402
+import step_index  # noqa: E402
+import timing  # noqa: E402
+
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+HTTP_CLIENT = os.environ.get("BDD_HTTP_CLIENT", "sync").lower()
+HTTP_CLIENT_SCOPE = os.environ.get("BDD_HTTP_CLIENT_SCOPE", "scenario").lower()
+HTTP_BACKEND = os.environ.get("BDD_HTTP_BACKEND", "mock").lower()
+PLAN_BATCHES = os.environ.get("BDD_ENGINE_PLAN_BATCHES", "0").lower() in ("1", "on", "true")
+OVERHEAD_REPORT = os.environ.get("BDD_HTTP_OVERHEAD_REPORT")
+STEP_INDEX = os.environ.get("BDD_STEP_INDEX", "on").lower() not in ("off", "0", "false")
 
 
 # ---------------------------------------------------------------------------
 # Hooks
 # ---------------------------------------------------------------------------
 def before_all(context):
-    context.mocks = MockRegistry()
+    if STEP_INDEX:
+        step_index.install(context)
+    context.mocks = MockRegistry(
+        use_engine=HTTP_BACKEND == "engine", plan_batches=PLAN_BATCHES
+    )
     context.app = create_test_app(context.mocks)
+    context.async_loop = AsyncStageLoop() if HTTP_CLIENT == "async" else None
+    context.hook_overhead = []
+    context.timing = timing.TimingRecorder("http") if timing.REPORT_PATH else None
+    timing.activate(context.timing)
+    context.session_client = (
+        _open_client(context, session=True) if HTTP_CLIENT_SCOPE == "session" else None
+    )
 
 
 def before_scenario(context, scenario):
-    context.mocks.reset_all()
+    started = time.perf_counter()
+    use_engine = HTTP_BACKEND == "engine" or "engine" in scenario.effective_tags
+    plan_batches = PLAN_BATCHES or "plan_batches" in scenario.effective_tags
+    if context.session_client is not None:
+        _verify_clean_slate(context)
+        context.client = context.session_client
+    else:
+        context.client = _open_client(context)
+    if context.session_client is None or (
+        context.mocks.use_engine,
+        context.mocks.plan_batches,
+    ) != (use_engine, plan_batches):
+        context.mocks.use_engine = use_engine
+        context.mocks.plan_batches = plan_batches
+        context.mocks.reset_all()
     context.users = {}
     context.response = None
     context.current_username = None
-    context.client = TestClient(context.app)
+    context.scenario_overhead = time.perf_counter() - started
+
+
+def after_step(context, step):
+    if context.timing is not None:
+        context.timing.record_step(context.scenario, step)
 
 
 def after_scenario(context, scenario):
+    started = time.perf_counter()
     client = getattr(context, "client", None)
-    if client is not None:
+    if client is not None and client is not context.session_client:
+        client.close()
+    if context.session_client is not None:
+        context.mocks.reset_all()
+        context.session_client.cookies.clear()
+    context.hook_overhead.append(
+        context.scenario_overhead + time.perf_counter() - started
+    )
+
+
+def after_all(context):
+    session_client = getattr(context, "session_client", None)
+    if session_client is not None:
+        _close_client(session_client)
+    loop = getattr(context, "async_loop", None)
+    if loop is not None:
+        loop.close()
+    context.mocks.close()
+    _report_overhead(context.hook_overhead)
+    if context.timing is not None:
+        report = context.timing.write_report(timing.REPORT_PATH, timing.BASELINE_PATH)
+        context.timing.print_summary(report)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+def _open_client(context, *, session: bool = False):
+    """Return a ``TestClient`` or its async-backed drop-in replacement.
+
+    A session ``TestClient`` is entered once so that every request reuses
+    the same anyio blocking portal instead of starting one per request.
+    """
+    if context.async_loop is not None:
+        client = context.async_loop.client(context.app)
+    else:
+        client = TestClient(context.app)
+        if session:
+            client.__enter__()
+    if context.timing is not None:
+        timing.instrument_client(client, context.timing)
+    return client
+
+
+def _close_client(client) -> None:
+    if isinstance(client, TestClient):
+        client.__exit__(None, None, None)
+    else:
         client.close()
+
+
+def _verify_clean_slate(context) -> None:
+    """Reset protocol check on the state left behind by the previous teardown."""
+    context.mocks.assert_pristine()
+    assert not context.session_client.cookies, (
+        f"Cookies leaked between scenarios: {dict(context.session_client.cookies)}"
+    )
+
+
+def _report_overhead(samples: list[float]) -> None:
+    if not samples:
+        return
+    mode = f"{HTTP_CLIENT}/{HTTP_CLIENT_SCOPE}"
+    stats = {
+        "scenarios": len(samples),
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "total_ms": sum(samples) * 1000,
+    }
+    print(
+        f"[http-stage] {mode}: {stats['scenarios']} scenario(s), "
+        f"hook overhead {stats['mean_ms']:.3f} ms/scenario"
+    )
+    if not OVERHEAD_REPORT:
+        return
+    if os.environ.get("BEHAVE_WORKER_ID"):
+        # -- Sharded run: parallel_runner merges the workers' files.
+        with open(timing.worker_path(OVERHEAD_REPORT), "w", encoding="utf-8") as f:
+            json.dump({mode: stats}, f, indent=2)
+        return
+    timing.accumulate_overhead(OVERHEAD_REPORT, mode, stats)
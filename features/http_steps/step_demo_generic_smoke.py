@@ -68,7 +68,6 @@ def then_demo_dispatches_command(context, operation):
     state = _state(context)
     assert state["expected_operation"] == operation
 
-    execute = context.mocks.spreadsheet_command.execute
-    assert execute.await_count > 0
-    request = execute.await_args_list[-1].args[0]
+    request = context.mocks.dispatches.last("command")
+    assert request is not None
     assert request.operation == operation
@@ -0,0 +1,801 @@
+"""
+Behaviour of the in-memory spreadsheet engine (``@engine`` scenarios).
+
+Requests go through :meth:`EngineInteractor.run`, i.e. the engine plus the
+error translation the controllers see, without the HTTP round trip: the
+engine also implements operations (chunked uploads, cursors, change feeds)
+that have no route yet.  Rejections are recorded as their HTTP status.
+
+Cell values in step text and tables are JSON literals (``2``, ``"bolt"``).
+"""
+
+from __future__ import annotations
+
+import base64
+import csv
+import io
+import json
+from http import HTTPStatus
+from types import SimpleNamespace
+from uuid import NAMESPACE_URL, UUID, uuid5
+
+from behave import given, then, use_step_matcher, when
+from fastapi import HTTPException
+
+from spreadsheet_engine import SpreadsheetEngineError
+from spreadsheet_engine.interactors import http_status
+
+
+use_step_matcher("re")
+
+
+def _id(kind: str, name: str) -> UUID:
+    return uuid5(NAMESPACE_URL, f"tuner:engine:{kind}:{name}")
+
+
+def _state(context) -> dict:
+    if not hasattr(context, "engine_state"):
+        assert context.mocks.engine is not None, "Tag the scenario with @engine"
+        context.engine_state = {
+            "baseline": None,
+            "cursor": None,
+            "paged": [],
+            "uploads": {},
+            "export": None,
+            "dry_runs": [],
+            "jobs": [],
+        }
+    return context.engine_state
+
+
+def _send(context, operation: str, **payload):
+    """Run one request; keep its result or the status it was rejected with."""
+    state = _state(context)
+    if state["baseline"] is None:
+        tables = context.mocks.engine.tables.values()
+        state["baseline"] = {table.id: table.version for table in tables}
+    context.engine_result = None
+    context.engine_status = HTTPStatus.OK
+    try:
+        context.engine_result = context.mocks.spreadsheet_command.run(
+            SimpleNamespace(operation=operation, payload=payload)
+        )
+    except HTTPException as exc:
+        context.engine_status = exc.status_code
+        context.engine_error = exc.detail
+    return context.engine_result
+
+
+def _seed(context, operation: str, **payload):
+    result = _send(context, operation, **payload)
+    assert context.engine_status == HTTPStatus.OK, context.engine_error
+    _state(context)["baseline"] = None
+    return result
+
+
+def _value(raw: str):
+    return json.loads(raw) if raw.strip() else None
+
+
+def _table(context, table: str):
+    return context.mocks.engine.tables[_id("table", table)]
+
+
+def _cell(context, table: str, row: str, column: str):
+    engine_table = _table(context, table)
+    return engine_table.columns[column].values[engine_table.slot_of(_id("row", row))]
+
+
+def _view_payload(table: str, view: str | None) -> dict:
+    payload = {"table_id": _id("table", table)}
+    if view is not None:
+        payload["view_id"] = _id("view", view)
+    return payload
+
+
+def _quoted(raw: str) -> list[str]:
+    return [item.strip().strip('"') for item in raw.split(",") if item.strip()]
+
+
+# ---------------------------------------------------------------------------
+# Given
+# ---------------------------------------------------------------------------
+@given(r'an engine table "(?P<table>[^"]+)" with columns')
+def given_engine_table(context, table):
+    _seed(
+        context,
+        "create_plain_table",
+        project_id=_id("project", "P1"),
+        table_id=_id("table", table),
+        table_name=table,
+    )
+    for row in context.table:
+        payload = {"key": row["key"], "data_type": row["data_type"]}
+        if row.get("formula"):
+            payload["formula"] = row["formula"]
+        _seed(context, "add_column", table_id=_id("table", table), **payload)
+
+
+@given(r'engine table "(?P<table>[^"]+)" has rows')
+def given_engine_rows(context, table):
+    for row in context.table:
+        cells = {
+            heading: _value(row[heading])
+            for heading in context.table.headings
+            if heading != "row" and row[heading]
+        }
+        _seed(
+            context,
+            "add_row",
+            table_id=_id("table", table),
+            row_id=_id("row", row["row"]),
+            cells=cells,
+        )
+
+
+@given(
+    r'an engine view "(?P<view>[^"]+)" of "(?P<table>[^"]+)" filtered by "(?P<expr>[^"]+)"'
+    r'(?: sorted by "(?P<sort>[^"]+)")?'
+)
+def given_engine_view(context, view, table, expr, sort=None):
+    _seed(
+        context,
+        "create_view",
+        table_id=_id("table", table),
+        view_id=_id("view", view),
+        name=view,
+        filters={"expr": expr},
+        sorts=[{"expr": sort}] if sort else [],
+    )
+
+
+@given(
+    r'"(?P<table>[^"]+)" has a link column "(?P<column>[^"]+)" to "(?P<target>[^"]+)"'
+    r' shown by "(?P<shown>[^"]+)"'
+)
+def given_link_column(context, table, column, target, shown):
+    _seed(
+        context,
+        "add_column",
+        table_id=_id("table", table),
+        key=column,
+        data_type="link",
+        property={"target_table_id": str(_id("table", target)), "display_column": shown},
+    )
+
+
+@given(
+    r'"(?P<table>[^"]+)" has a lookup column "(?P<column>[^"]+)" of "(?P<target_column>[^"]+)"'
+    r' through "(?P<link>[^"]+)"'
+)
+def given_lookup_column(context, table, column, target_column, link):
+    _seed(
+        context,
+        "add_column",
+        table_id=_id("table", table),
+        key=column,
+        data_type="lookup",
+        property={"link_column": link, "target_column": target_column},
+    )
+
+
+@given(
+    r'engine row "(?P<row>[^"]+)" of "(?P<table>[^"]+)" links "(?P<column>[^"]+)" to (?P<targets>.+)'
+)
+def given_linked_row(context, row, table, column, targets):
+    ids = [str(_id("row", target)) for target in _quoted(targets)]
+    _seed(
+        context,
+        "add_row",
+        table_id=_id("table", table),
+        row_id=_id("row", row),
+        cells={column: ids[0] if len(ids) == 1 else ids},
+    )
+
+
+@given(r'the change log of "(?P<table>[^"]+)" keeps (?P<count>\d+) versions?')
+def given_change_log_size(context, table, count):
+    context.mocks.engine.change_logs[_id("table", table)].max_entries = int(count)
+
+
+@given(r'an engine asset "(?P<title>[^"]+)" holds "(?P<content>[^"]*)"')
+def given_engine_asset(context, title, content):
+    _seed(
+        context,
+        "upload_asset",
+        project_id=_id("project", "P1"),
+        asset_id=_id("asset", title),
+        asset_type="design",
+        title=title,
+        content=content,
+    )
+
+
+@given(
+    r'engine asset "(?P<copy>[^"]+)" follows "(?P<parent>[^"]+)"'
+    r'(?: from a row of "(?P<table>[^"]+)")?'
+)
+def given_follow_copy(context, copy, parent, table=None):
+    _seed(
+        context,
+        "copy_asset",
+        asset_id=_id("asset", parent),
+        copy_asset_id=_id("asset", copy),
+        target_table_id=_id("table", table) if table else None,
+    )
+
+
+# ---------------------------------------------------------------------------
+# When
+# ---------------------------------------------------------------------------
+@when(r'the actor adds row "(?P<row>[^"]+)" to "(?P<table>[^"]+)"')
+def when_add_row(context, table, row):
+    cells = {item["column"]: _value(item["value"]) for item in context.table or []}
+    _send(
+        context,
+        "add_row",
+        table_id=_id("table", table),
+        row_id=_id("row", row),
+        cells=cells,
+    )
+
+
+@when(r'the actor upserts rows into "(?P<table>[^"]+)"')
+def when_upsert_rows(context, table):
+    rows = [
+        {
+            "row_id": _id("row", item["row"]),
+            "cells": {
+                heading: _value(item[heading])
+                for heading in context.table.headings
+                if heading != "row" and item[heading]
+            },
+        }
+        for item in context.table
+    ]
+    _send(context, "batch_upsert_rows", table_id=_id("table", table), rows=rows)
+
+
+@when(
+    r'the actor sets "(?P<column>[^"]+)" of row "(?P<row>[^"]+)" in "(?P<table>[^"]+)" to (?P<value>.+?)'
+    r"(?: expecting (?P<scope>table|row) version (?P<version>\d+))?"
+)
+def when_set_cell(context, column, row, table, value, scope=None, version=None):
+    payload = {"table_id": _id("table", table), "row_id": _id("row", row)}
+    if scope is not None:
+        payload[f"expected_{'' if scope == 'table' else 'row_'}version"] = int(version)
+    _send(context, "update_row", cells={column: _value(value)}, **payload)
+
+
+@when(r'the actor deletes row "(?P<row>[^"]+)" from "(?P<table>[^"]+)"')
+def when_delete_row(context, row, table):
+    _send(context, "delete_row", table_id=_id("table", table), row_id=_id("row", row))
+
+
+@when(r'the actor deletes column "(?P<column>[^"]+)" from "(?P<table>[^"]+)"')
+def when_delete_column(context, column, table):
+    _send(context, "delete_column", table_id=_id("table", table), column_key=column)
+
+
+@when(
+    r'the actor adds formula column "(?P<column>[^"]+)" to "(?P<table>[^"]+)" as (?P<formula>.+)'
+)
+def when_add_formula_column(context, column, table, formula):
+    _send(
+        context,
+        "add_column",
+        table_id=_id("table", table),
+        key=column,
+        data_type="number",
+        formula=formula,
+    )
+
+
+@when(
+    r'the actor changes the formula of "(?P<column>[^"]+)" in "(?P<table>[^"]+)" to (?P<formula>.+)'
+)
+def when_change_formula(context, column, table, formula):
+    _send(
+        context,
+        "update_column",
+        table_id=_id("table", table),
+        column_key=column,
+        formula=formula,
+    )
+
+
+@when(
+    r'the actor submits an? (?P<mode>atomic|non-atomic|dry-run) batch to "(?P<table>[^"]+)"'
+    r'(?: with key "(?P<key>[^"]+)")?(?P<validated> expecting the validated version)?'
+)
+def when_submit_batch(context, mode, table, key=None, validated=None):
+    state = _state(context)
+    operations = []
+    for item in context.table:
+        payload = {"row_id": _id("row", item["row"])}
+        if item["column"]:
+            payload["column_key"] = item["column"]
+            payload["value"] = _value(item["value"])
+        operations.append(
+            {
+                "operation_id": item["operation_id"],
+                "operation_type": item["operation_type"],
+                "payload": payload,
+            }
+        )
+    result = _send(
+        context,
+        "batch_table_operations",
+        table_id=_id("table", table),
+        operations=operations,
+        atomic=mode == "atomic",
+        dry_run=mode == "dry-run",
+        idempotency_key=key,
+        expected_version=state["dry_runs"][-1]["validated_version"] if validated else None,
+    )
+    if mode == "dry-run" and result is not None:
+        state["dry_runs"].append(result)
+
+
+@when(
+    r'the actor pages through(?: view "(?P<view>[^"]+)" of)? "(?P<table>[^"]+)"'
+    r" (?P<limit>\d+) rows? at a time"
+)
+def when_page_through(context, table, limit, view=None):
+    state = _state(context)
+    state["paged"], cursor = [], None
+    while True:
+        page = _send(
+            context,
+            "get_table_view",
+            limit=int(limit),
+            cursor=cursor,
+            **_view_payload(table, view),
+        )
+        assert context.engine_status == HTTPStatus.OK, context.engine_error
+        state["paged"].append([row["id"] for row in page["rows"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return
+
+
+@when(
+    r'the actor reads the first (?P<limit>\d+) rows? of'
+    r'(?: view "(?P<view>[^"]+)" of)? "(?P<table>[^"]+)"'
+)
+def when_read_first_page(context, limit, table, view=None):
+    page = _send(
+        context, "get_table_view", limit=int(limit), **_view_payload(table, view)
+    )
+    _state(context)["cursor"] = page["next_cursor"] if page is not None else None
+
+
+@when(
+    r'the actor reads "(?P<table>[^"]+)" with limit (?P<limit>-?\d+) and offset (?P<offset>-?\d+)'
+)
+def when_read_window(context, table, limit, offset):
+    _send(
+        context,
+        "get_table_view",
+        table_id=_id("table", table),
+        limit=int(limit),
+        offset=int(offset),
+    )
+
+
+@when(r'the actor reads the next page of(?: view "(?P<view>[^"]+)" of)? "(?P<table>[^"]+)"')
+def when_read_next_page(context, table, view=None):
+    _send(
+        context,
+        "get_table_view",
+        cursor=_state(context)["cursor"],
+        **_view_payload(table, view),
+    )
+
+
+@when(
+    r'the actor creates view "(?P<view>[^"]+)" of "(?P<table>[^"]+)" with filters (?P<filters>.+)'
+)
+def when_create_view(context, view, table, filters):
+    _send(
+        context,
+        "create_view",
+        table_id=_id("table", table),
+        view_id=_id("view", view),
+        name=view,
+        filters=json.loads(filters),
+    )
+
+
+@when(r'the actor changes the filter of view "(?P<view>[^"]+)" to "(?P<expr>[^"]+)"')
+def when_change_view_filter(context, view, expr):
+    _send(
+        context,
+        "update_view",
+        view_id=_id("view", view),
+        filters={"expr": expr},
+        update_mask=["filters"],
+    )
+
+
+@when(r'the actor reads "(?P<table>[^"]+)" with cursor "(?P<cursor>[^"]*)"')
+def when_read_with_cursor(context, table, cursor):
+    _send(context, "get_table_view", table_id=_id("table", table), cursor=cursor)
+
+
+@when(r'the actor reads "(?P<table>[^"]+)" with a cursor encoding (?P<raw>.+)')
+def when_read_with_encoded_cursor(context, table, raw):
+    """*raw* is the JSON a well-formed cursor carries, e.g. ``[1, 2, 3]``."""
+    cursor = base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    _send(context, "get_table_view", table_id=_id("table", table), cursor=cursor)
+
+
+@when(
+    r'the actor starts uploading "(?P<title>[^"]+)"'
+    r'(?: with key "(?P<key>[^"]+)")?(?: announcing (?P<size>\d+) bytes)?'
+)
+def when_start_upload(context, title, key=None, size=None):
+    result = _send(
+        context,
+        "start_asset_upload",
+        project_id=_id("project", "P1"),
+        idempotency_key=key,
+        asset_type="design",
+        title=title,
+        size=int(size) if size else None,
+    )
+    if result is not None:
+        _state(context)["uploads"][title] = result["upload_id"]
+
+
+@when(
+    r'the actor uploads "(?P<data>[^"]*)" to "(?P<title>[^"]+)" at offset (?P<offset>-?\d+)'
+)
+def when_upload_chunk(context, data, title, offset):
+    _send(
+        context,
+        "upload_asset_chunk",
+        upload_id=_state(context)["uploads"][title],
+        offset=int(offset),
+        data=data,
+    )
+
+
+@when(
+    r'the actor uploads bytes (?P<hex>[0-9a-f ]+) to "(?P<title>[^"]+)" at offset (?P<offset>-?\d+)'
+)
+def when_upload_bytes(context, hex, title, offset):
+    _send(
+        context,
+        "upload_asset_chunk",
+        upload_id=_state(context)["uploads"][title],
+        offset=int(offset),
+        data=bytes.fromhex(hex),
+    )
+
+
+@when(r'the actor completes the upload of "(?P<title>[^"]+)"')
+def when_complete_upload(context, title):
+    _send(context, "complete_asset_upload", upload_id=_state(context)["uploads"][title])
+
+
+@when(
+    r'the actor reads the changes to "(?P<table>[^"]+)" since'
+    r" (?:the start|(?P<back>\d+) versions? ago)"
+)
+def when_read_changes(context, table, back=None):
+    """"The start" is the version the scenario's first request saw."""
+    if back is None:
+        since = _state(context)["baseline"][_id("table", table)]
+    else:
+        since = _table(context, table).version - int(back)
+    _send(context, "get_table_changes", table_id=_id("table", table), since_version=since)
+
+
+@when(r'the actor uploads asset "(?P<title>[^"]+)" holding "(?P<content>[^"]*)"')
+def when_upload_asset(context, title, content):
+    _send(
+        context,
+        "upload_asset",
+        project_id=_id("project", "P1"),
+        asset_id=_id("asset", title),
+        asset_type="design",
+        title=title,
+        content=content,
+    )
+
+
+@when(r'the actor changes the content of asset "(?P<title>[^"]+)" to "(?P<content>[^"]*)"')
+def when_change_asset_content(context, title, content):
+    result = _send(
+        context, "update_asset_content", asset_id=_id("asset", title), content=content
+    )
+    if result is not None:
+        _state(context)["jobs"].append(result["job_id"])
+
+
+@when(r'the actor detaches asset "(?P<title>[^"]+)" from its parent')
+def when_detach_asset(context, title):
+    _send(
+        context,
+        "update_asset_follow_mode",
+        asset_id=_id("asset", title),
+        follow_mode="detached",
+    )
+
+
+@when(r'the actor reads the stats of "(?P<table>[^"]+)"')
+def when_read_stats(context, table):
+    _send(context, "get_table_stats", table_id=_id("table", table))
+
+
+@when(r"the actor looks up the propagation job")
+def when_get_propagation_job(context):
+    _send(context, "get_propagation_job", job_id=_state(context)["jobs"][-1])
+
+
+@when(
+    r'the actor exports "(?P<table>[^"]+)" as (?P<fmt>ndjson|csv)'
+    r"(?: (?P<rows>\d+) rows? per chunk)?"
+)
+def when_export(context, table, fmt, rows=None):
+    payload = {"table_id": _id("table", table), "format": fmt}
+    if rows is not None:
+        payload["chunk_rows"] = int(rows)
+    result = _send(context, "export_table", **payload)
+    if result is not None:
+        _state(context)["export"] = {
+            "media_type": result["media_type"],
+            "chunks": result["chunks"],
+            "read": [],
+        }
+
+
+@when(r"the actor reads (?:(?P<count>\d+) chunks?|the rest) of the export")
+def when_read_export(context, count=None):
+    """Consume the stream the way a streaming response would, after the request."""
+    export = _state(context)["export"]
+    context.engine_status = HTTPStatus.OK
+    try:
+        for index, chunk in enumerate(export["chunks"], start=1):
+            export["read"].append(chunk)
+            if count is not None and index == int(count):
+                return
+    except SpreadsheetEngineError as exc:
+        context.engine_status = http_status(exc)
+        context.engine_error = str(exc)
+
+
+# ---------------------------------------------------------------------------
+# Then
+# ---------------------------------------------------------------------------
+@then(r"the engine accepts the request")
+def then_accepted(context):
+    assert context.engine_status == HTTPStatus.OK, (
+        f"Expected success, got {context.engine_status}: {context.engine_error}"
+    )
+
+
+@then(r"the engine rejects the request with status (?P<status>\d+)")
+def then_rejected(context, status):
+    assert context.engine_status == int(status), (
+        f"Expected {status}, got {context.engine_status}: {context.engine_result}"
+    )
+
+
+@then(
+    r'row "(?P<row>[^"]+)" of "(?P<table>[^"]+)" has "(?P<column>[^"]+)" = (?P<value>.+)'
+)
+def then_cell(context, row, table, column, value):
+    actual, expected = _cell(context, table, row, column), _value(value)
+    # -- Typed: a formula cell recomputed from 5 to 5.0 must read 5.0.
+    assert actual == expected and type(actual) is type(expected), (
+        f"{column} of {row}: expected {value}, got {actual!r}"
+    )
+
+
+@then(r'"(?P<table>[^"]+)" has rows (?P<rows>.+)')
+def then_rows(context, table, rows):
+    engine_table = _table(context, table)
+    actual = [engine_table.row_ids[slot] for slot in engine_table.live_slots()]
+    assert actual == [_id("row", row) for row in _quoted(rows)], actual
+
+
+@then(r'"(?P<table>[^"]+)" has no rows')
+def then_no_rows(context, table):
+    assert _table(context, table).row_count == 0
+
+
+@then(r'"(?P<table>[^"]+)" has no column "(?P<column>[^"]+)"')
+def then_no_column(context, table, column):
+    assert column not in _table(context, table).columns
+
+
+@then(r'the version of "(?P<table>[^"]+)" (?:is unchanged|advanced by (?P<delta>\d+))')
+def then_version(context, table, delta=None):
+    before = _state(context)["baseline"][_id("table", table)]
+    actual = _table(context, table).version
+    assert actual == before + int(delta or 0), f"version {before} -> {actual}"
+
+
+@then(r"the engine applied the batch (?P<mode>sequentially|through the planner)")
+def then_batch_mode(context, mode):
+    planned = context.mocks.engine.plan_batches
+    assert planned == (mode == "through the planner"), f"plan_batches={planned}"
+
+
+@then(r"the batch results are (?P<verdicts>.+)")
+def then_batch_results(context, verdicts):
+    results = context.engine_result["results"]
+    actual = ["ok" if result["success"] else "failed" for result in results]
+    assert actual == _quoted(verdicts), results
+
+
+@then(r'the pages read hold rows (?P<pages>.+)')
+def then_pages(context, pages):
+    expected = [[_id("row", row) for row in page.split()] for page in pages.split(" | ")]
+    assert _state(context)["paged"] == expected, _state(context)["paged"]
+
+
+@then(r'the upload of "(?P<title>[^"]+)" has received (?P<size>\d+) bytes')
+def then_upload_received(context, title, size):
+    assert context.engine_result["received_bytes"] == int(size), context.engine_result
+
+
+@then(r'asset "(?P<title>[^"]+)" holds "(?P<content>[^"]*)"')
+def then_asset_content(context, title, content):
+    asset = _send(context, "get_asset", asset_id=context.engine_result["asset_id"])
+    assert asset["title"] == title
+    assert asset["content"] == content, asset["content"]
+
+
+def _export_rows(context) -> dict[UUID, dict]:
+    """Rows read from the export so far, by id; the header is checked too."""
+    export = _state(context)["export"]
+    text = "".join(export["read"])
+    if export["media_type"] == "text/csv":
+        records = list(csv.DictReader(io.StringIO(text)))
+        return {UUID(record.pop("id")): record for record in records}
+    lines = [json.loads(line) for line in text.splitlines()]
+    assert lines and lines[0]["type"] == "header", lines[:1]
+    return {UUID(line["id"]): line["cells"] for line in lines[1:]}
+
+
+@then(r'the export is served as "(?P<media_type>[^"]+)" with rows (?P<rows>.+)')
+def then_export_rows(context, media_type, rows):
+    assert _state(context)["export"]["media_type"] == media_type
+    actual = list(_export_rows(context))
+    assert actual == [_id("row", row) for row in _quoted(rows)], actual
+
+
+@then(r'row "(?P<row>[^"]+)" of the export has "(?P<column>[^"]+)" = (?P<value>.+)')
+def then_export_cell(context, row, column, value):
+    actual, expected = _export_rows(context)[_id("row", row)][column], _value(value)
+    if _state(context)["export"]["media_type"] == "text/csv":
+        expected = "" if expected is None else str(expected)
+    assert actual == expected, f"{column} of {row}: expected {value}, got {actual!r}"
+
+
+@then(r"the export was read in (?P<count>\d+) chunks?")
+def then_export_chunks(context, count):
+    assert len(_state(context)["export"]["read"]) == int(count)
+
+
+@then(r"the changes (?P<kind>insert|update|delete) rows? (?P<rows>.+)")
+def then_changed_rows(context, kind, rows):
+    result = context.engine_result
+    if kind == "delete":
+        actual = result["deleted_row_ids"]
+    else:
+        actual = [row["id"] for row in result[f"{kind}ed_rows"]]
+    assert actual == [_id("row", row) for row in _quoted(rows)], actual
+
+
+@then(r'the changes set "(?P<column>[^"]+)" of row "(?P<row>[^"]+)" to (?P<value>.+)')
+def then_changed_cell(context, column, row, value):
+    matches = [
+        cell["value"]
+        for cell in context.engine_result["cells"]
+        if cell["row_id"] == _id("row", row) and cell["column_key"] == column
+    ]
+    assert matches == [_value(value)], context.engine_result["cells"]
+
+
+@then(r'the dry run reports the current version and schema version of "(?P<table>[^"]+)"')
+def then_dry_run_versions(context, table):
+    result, engine_table = context.engine_result, _table(context, table)
+    assert result["validated_version"] == engine_table.version, result
+    assert result["schema_version"] == engine_table.schema_version, result
+
+
+@then(
+    r"the (?P<field>validated|schema) version (?:is unchanged|advanced by (?P<delta>\d+))"
+    r" since the previous dry run"
+)
+def then_dry_run_delta(context, field, delta=None):
+    previous, latest = _state(context)["dry_runs"][-2:]
+    key = f"{field}_version"
+    assert latest[key] == previous[key] + int(delta or 0), (previous[key], latest[key])
+
+
+def _page_cell(context, row: str, column: str) -> dict:
+    for page_row in context.engine_result["rows"]:
+        if page_row["id"] == _id("row", row):
+            cells = {cell["column_key"]: cell for cell in page_row["cells"]}
+            assert column in cells, f"{row} has no {column!r} cell: {list(cells)}"
+            return cells[column]
+    raise AssertionError(f"{row} is not on the page")
+
+
+@then(r'row "(?P<row>[^"]+)" of the page shows "(?P<column>[^"]+)" as "(?P<shown>[^"]*)"')
+def then_page_display(context, row, column, shown):
+    cell = _page_cell(context, row, column)
+    assert cell["display_value"] == shown, cell
+
+
+@then(r'row "(?P<row>[^"]+)" of the page has "(?P<column>[^"]+)" = (?P<value>.+)')
+def then_page_value(context, row, column, value):
+    cell = _page_cell(context, row, column)
+    assert cell["value"] == _value(value), cell
+
+
+@then(r"the link cache has answered (?P<hits>\d+) target rows? and fetched (?P<misses>\d+)")
+def then_link_cache(context, hits, misses):
+    links = context.mocks.engine.links
+    assert (links.hits, links.misses) == (int(hits), int(misses)), (links.hits, links.misses)
+
+
+@then(r"the edits share one propagation job")
+def then_one_job(context):
+    jobs = _state(context)["jobs"]
+    assert jobs and jobs[0] is not None and set(jobs) == {jobs[0]}, jobs
+
+
+@then(
+    r'the propagation job is "(?P<status>[^"]+)" with (?P<coalesced>\d+) coalesced updates?'
+    r" and (?P<synced>\d+) of (?P<total>\d+) followers synced"
+)
+def then_job_progress(context, status, coalesced, synced, total):
+    job = context.engine_result
+    actual = (job["status"], job["coalesced_updates"], job["followers_synced"])
+    assert actual == (status, int(coalesced), int(synced)), job
+    assert job["followers_total"] == int(total), job
+
+
+@then(r'engine asset "(?P<title>[^"]+)" reads "(?P<content>[^"]*)"')
+def then_asset_reads(context, title, content):
+    """Through ``get_asset``, which like any read runs queued propagation first."""
+    asset = _send(context, "get_asset", asset_id=_id("asset", title))
+    assert asset["content"] == content, asset
+
+
+@then(r'engine asset "(?P<title>[^"]+)" still stores "(?P<content>[^"]*)"')
+def then_asset_stores(context, title, content):
+    """The stored body, read without a request (nothing is drained)."""
+    engine = context.mocks.engine
+    actual = engine.blobs.get(engine.assets[_id("asset", title)].content_digest)
+    assert actual == content, actual
+
+
+@then(
+    r"the stats count (?P<linked>\d+) design assets? in the table"
+    r" and (?P<unlinked>\d+) outside any table"
+)
+def then_stats(context, linked, unlinked):
+    stats = context.engine_result
+    actual = (stats["design_asset_count"], stats["unlinked_design_asset_count"])
+    assert actual == (int(linked), int(unlinked)), stats
+
+
+@then(r'assets (?P<titles>"[^"]+"(?:, "[^"]+")*) (?P<verb>share|do not share) one stored body')
+def then_shared_body(context, titles, verb):
+    assets = context.mocks.engine.assets
+    digests = {assets[_id("asset", title)].content_digest for title in _quoted(titles)}
+    assert (len(digests) == 1) == (verb == "share"), digests
+
+
+@then(r"the blob store holds (?P<blobs>\d+) (?:body|bodies) with (?P<references>\d+) references?")
+def then_blob_store(context, blobs, references):
+    metrics = context.mocks.engine.blobs.metrics()
+    actual = (metrics["blobs"], metrics["references"])
+    assert actual == (int(blobs), int(references)), metrics
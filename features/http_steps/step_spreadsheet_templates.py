@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 from http import HTTPStatus
+from types import SimpleNamespace
 from uuid import NAMESPACE_URL, UUID, uuid5
 
 from behave import given, then, use_step_matcher, when
@@ -120,29 +121,21 @@ def _assert_expected_dispatch_called(context):
     interactor_name = (
         "spreadsheet_query" if expected["kind"] == "query" else "spreadsheet_command"
     )
-    interactor = getattr(mocks, interactor_name, None)
-    assert interactor is not None, f"Missing mock interactor: {interactor_name}"
-
-    execute = getattr(interactor, "execute", None)
-    assert execute is not None, f"Mock interactor has no execute(): {interactor_name}"
-    assert execute.await_count > 0, (
+    recorder = mocks.dispatches
+    assert recorder.count(expected["kind"]) > 0, (
         f"Expected {interactor_name}.execute to be awaited at least once."
     )
 
-    matched_request = None
-    for await_call in execute.await_args_list:
-        if not await_call.args:
-            continue
-        request_data = await_call.args[0]
-        if getattr(request_data, "operation", None) == expected["operation"]:
-            matched_request = request_data
-            break
-
-    assert matched_request is not None, (
+    assert recorder.count(expected["kind"], expected["operation"]) > 0, (
         f"Expected dispatched operation '{expected['operation']}' on {interactor_name}."
     )
 
-    payload = getattr(matched_request, "payload", {})
+    if recorder.find(
+        expected["kind"], expected["operation"], expected["payload_subset"]
+    ):
+        return
+    first = recorder.find(expected["kind"], expected["operation"])
+    payload = getattr(first, "payload", {})
     for key, value in expected["payload_subset"].items():
         assert payload.get(key) == value, (
             f"Expected payload[{key!r}]={value!r}, got {payload.get(key)!r}"
@@ -176,6 +169,48 @@ def _state(context):
     return context.sheet_state
 
 
+def _engine(context):
+    """The scenario's in-memory engine (``@engine`` / ``BDD_HTTP_BACKEND=engine``)."""
+    return getattr(getattr(context, "mocks", None), "engine", None)
+
+
+def _seed(context, operation: str, **payload):
+    """Apply *operation* straight to the engine, if the scenario runs on one.
+
+    Bypasses the interactor mocks, so seeding records neither a dispatch nor
+    an await that a Then step could mistake for the request under test.
+    """
+    engine = _engine(context)
+    if engine is None:
+        return None
+    return engine.execute(SimpleNamespace(operation=operation, payload=payload))
+
+
+def _seed_table(context, table_id: str, project_id: str = "P1") -> None:
+    engine = _engine(context)
+    if engine is not None and _table_id(table_id) not in engine.tables:
+        _seed(
+            context,
+            "create_plain_table",
+            project_id=_project_id(project_id),
+            table_id=_table_id(table_id),
+            table_name=table_id,
+        )
+
+
+def _seed_asset(context, asset_id: str, project_id: str = "P1") -> None:
+    engine = _engine(context)
+    if engine is not None and _asset_id(asset_id) not in engine.assets:
+        _seed(
+            context,
+            "upload_asset",
+            project_id=_project_id(project_id),
+            asset_id=_asset_id(asset_id),
+            asset_type="design",
+            title=asset_id,
+        )
+
+
 def _table_key(project_id: str, table_id: str) -> str:
     return f"{project_id}:{table_id}"
 
@@ -218,6 +253,7 @@ def given_spreadsheet_table_exists(context, table_id, project_id):
         _table_key(project_id, table_id),
         {"project_id": project_id, "table_id": table_id, "columns": [], "version": 0},
     )
+    _seed_table(context, table_id, project_id)
 
 
 @given(r'project "(?P<project_id>[^"]+)" has uploaded assets with no table binding')
@@ -244,6 +280,10 @@ def given_table_current_version(context, table_id, version):
             "version": int(version),
         }
     state["tables"][key]["version"] = int(version)
+    _seed_table(context, table_id, state["tables"][key]["project_id"])
+    engine = _engine(context)
+    if engine is not None:
+        engine.fast_forward(_table_id(table_id), int(version))
 
 
 @given(r'no request has used idempotency key "(?P<idem_key>[^"]+)"')
@@ -260,12 +300,20 @@ def given_table_has_columns(context, table_id, columns):
         key, {"project_id": "P1", "table_id": table_id, "version": 0}
     )
     state["tables"][key]["columns"] = values
+    _seed_table(context, table_id)
+    engine = _engine(context)
+    existing = engine.tables[_table_id(table_id)].columns if engine is not None else {}
+    for value in values:
+        if value not in existing:
+            _seed(context, "add_column", table_id=_table_id(table_id), key=value)
 
 
 @given(r'table "(?P<table_id>[^"]+)" has a row "(?P<row_id>[^"]+)"')
 def given_table_has_row(context, table_id, row_id):
     state = _state(context)
     state["rows"].setdefault((table_id, row_id), {})
+    _seed_table(context, table_id)
+    _seed(context, "add_row", table_id=_table_id(table_id), row_id=_row_id(row_id))
 
 
 @given(r'table "(?P<table_id>[^"]+)" has an existing grid view "(?P<view_id>[^"]+)"')
@@ -278,6 +326,15 @@ def given_table_has_grid_view(context, table_id, view_id):
         "sort": None,
         "hidden": set(),
     }
+    _seed_table(context, table_id)
+    _seed(
+        context,
+        "create_view",
+        table_id=_table_id(table_id),
+        view_id=_view_id(view_id),
+        name=view_id,
+        type="grid",
+    )
 
 
 @given(r'project "(?P<project_id>[^"]+)" sets hierarchy levels as (?P<levels>.+)')
@@ -396,6 +453,7 @@ def given_product_requirement_has_asset_file(context, pr_id, filename):
     state = _state(context)
     state["assets"].setdefault(filename, {"project_id": "P1", "labels": set()})
     state["asset_bindings"].add((filename, pr_id))
+    _seed_asset(context, filename)
 
 
 @given(r'project "(?P<project_id>[^"]+)" defines labels (?P<labels>.+)')
@@ -411,6 +469,7 @@ def given_asset_exists_in_project(context, asset_id, project_id):
         "follow": None,
         "detached": False,
     }
+    _seed_asset(context, asset_id, project_id)
 
 
 @given(r'asset "(?P<asset_id>[^"]+)" already exists in project "(?P<project_id>[^"]+)"')
@@ -428,6 +487,7 @@ def given_parent_asset_exists(context, asset_id, project_id=None):
         "follow": None,
         "detached": False,
     }
+    _seed_asset(context, asset_id, project_id or "P1")
 
 
 @given(
@@ -445,6 +505,16 @@ def given_parent_and_follow_in_scope(context, parent, child, cr_id):
         "detached": False,
     }
     state["response"][f"count_scope:{cr_id}"] = {"dedup": True}
+    _seed_asset(context, parent)
+    engine = _engine(context)
+    if engine is not None and _asset_id(child) not in engine.assets:
+        _seed(
+            context,
+            "copy_asset",
+            asset_id=_asset_id(parent),
+            copy_asset_id=_asset_id(child),
+            follow_mode="follow",
+        )
 
 
 @given(
@@ -458,6 +528,7 @@ def given_detached_branch_in_scope(context, asset_id, cr_id):
         "follow": None,
         "detached": True,
     }
+    _seed_asset(context, asset_id)
     state["response"].setdefault(f"count_scope:{cr_id}", {})["branch"] = True
 
 
@@ -12,7 +12,8 @@ Only presentation-layer dependencies are needed:
 
 from __future__ import annotations
 
-from unittest.mock import AsyncMock
+from typing import Any
+from unittest.mock import DEFAULT, AsyncMock
 
 from dishka import Provider, Scope, make_async_container, provide
 from dishka.integrations.fastapi import setup_dishka
@@ -36,6 +37,9 @@ from app.infrastructure.auth.handlers.sign_up import SignUpHandler
 from app.presentation.http.auth.asgi_middleware import ASGIAuthMiddleware
 from app.presentation.http.controllers.root_router import create_root_router
 
+from dispatch_recorder import COMMAND, QUERY, DispatchRecorder, RecordingInteractor
+from spreadsheet_engine import EngineInteractor, SpreadsheetEngine
+
 
 class MockRegistry:
     """Holds ``AsyncMock`` instances for every Dishka-provided type.
@@ -44,9 +48,19 @@ class MockRegistry:
     so reassigning an attribute here immediately affects subsequent requests.
 
     Call :meth:`reset_all` in ``before_scenario`` to recreate every mock.
+
+    Requests dispatched into the spreadsheet interactors are additionally
+    indexed in :attr:`dispatches` (see :mod:`dispatch_recorder`).
+
+    With ``use_engine=True`` the spreadsheet command / query slots are
+    backed by a fresh in-memory :class:`SpreadsheetEngine` on every reset
+    instead of bare mocks; ``plan_batches=True`` builds it with the batch
+    planner on.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, *, use_engine: bool = False, plan_batches: bool = False) -> None:
+        self.use_engine = use_engine
+        self.plan_batches = plan_batches
         self._init_mocks()
 
     # noinspection PyAttributeOutsideInit
@@ -70,10 +84,52 @@ class MockRegistry:
         self.change_password: AsyncMock = AsyncMock()
         self.log_out: AsyncMock = AsyncMock()
 
+        # Indexed record of spreadsheet command / query dispatches
+        self.dispatches: DispatchRecorder = DispatchRecorder()
+
+        # Stateful in-memory backend for the spreadsheet interactors
+        self.engine: SpreadsheetEngine | None = None
+        if self.use_engine:
+            self.engine = SpreadsheetEngine(plan_batches=self.plan_batches)
+            self.spreadsheet_command = EngineInteractor(self.engine)  # type: ignore[assignment]
+            self.spreadsheet_query = EngineInteractor(self.engine)  # type: ignore[assignment]
+
     def reset_all(self) -> None:
         """Recreate every mock to a pristine state."""
+        self.close()
         self._init_mocks()
 
+    def close(self) -> None:
+        """Release the engine's on-disk state (blobs), if any."""
+        if self.engine is not None:
+            self.engine.close()
+
+    def assert_pristine(self) -> None:
+        """Fail if any mock was called or configured since the last reset.
+
+        Used by the session-scoped client mode to prove that no state leaks
+        from one scenario into the next: calls / awaits, a configured
+        ``return_value`` or ``side_effect`` on a mock or its ``execute``,
+        recorded dispatches and engine state all count.
+        """
+        for name, mock in vars(self).items():
+            if isinstance(mock, EngineInteractor):
+                _assert_untouched(f"{name}.execute", mock.execute, mock.run)
+            elif isinstance(mock, AsyncMock):
+                _assert_untouched(name, mock)
+                _assert_untouched(f"{name}.execute", mock.execute)
+        assert not self.dispatches, "Dispatch recorder leaked recorded requests"
+        assert self.engine is None or self.engine.is_empty(), "Engine leaked state"
+
+
+def _assert_untouched(name: str, mock: AsyncMock, side_effect: Any = None) -> None:
+    assert not mock.mock_calls, f"Mock {name!r} leaked calls: {mock.mock_calls}"
+    assert not mock.await_args_list, (
+        f"Mock {name!r} leaked awaits: {mock.await_args_list}"
+    )
+    assert mock._mock_return_value is DEFAULT, f"Mock {name!r} leaked a return_value"
+    assert mock.side_effect == side_effect, f"Mock {name!r} leaked a side_effect"
+
 
 class _MockProvider(Provider):
     """Dishka provider that resolves each interactor / handler type to a mock."""
@@ -110,7 +166,9 @@ class _MockProvider(Provider):
 
     @provide
     def spreadsheet_command_interactor(self) -> SpreadsheetCommandInteractor:
-        return self._r.spreadsheet_command  # type: ignore[return-value]
+        return RecordingInteractor(  # type: ignore[return-value]
+            self._r.spreadsheet_command, self._r.dispatches, COMMAND
+        )
 
     @provide
     def list_users_query_service(self) -> ListUsersQueryService:
@@ -118,7 +176,9 @@ class _MockProvider(Provider):
 
     @provide
     def spreadsheet_query_service(self) -> SpreadsheetQueryService:
-        return self._r.spreadsheet_query  # type: ignore[return-value]
+        return RecordingInteractor(  # type: ignore[return-value]
+            self._r.spreadsheet_query, self._r.dispatches, QUERY
+        )
 
     @provide
     def sign_up_handler(self) -> SignUpHandler:
@@ -8,6 +8,7 @@ from __future__ import annotations
 
 from playwright.sync_api import Page, expect
 from test_config import DEFAULT_TIMEOUT_MS, SHORT_TIMEOUT_MS
+from timing import measure_wait
 
 
 class NotificationsPage:
@@ -19,6 +20,9 @@ class NotificationsPage:
     updated if the frontend chooses a different attribute.
     """
 
+    # Set on toasts already on screen by `mark_seen`.
+    SEEN_ATTR = "data-bdd-seen"
+
     def __init__(self, page: Page) -> None:
         self._page = page
 
@@ -54,11 +58,44 @@ class NotificationsPage:
         that contains that text; otherwise wait for any toast with the given
         role to appear.
         """
+        loc = self.locator(role)
         if text:
-            loc = self.locator(role).filter(has_text=text)
+            loc = loc.filter(has_text=text)
+        with measure_wait(f"toast.{role or 'any'}"):
             loc.first.wait_for(state="visible", timeout=timeout)
+
+    def mark_seen(self) -> None:
+        """Mark the toasts currently shown so `wait_for_outcome` ignores them.
+
+        Call before the action whose outcome is awaited: an error toast left
+        over from an earlier step (e.g. a duplicate-user 409) would otherwise
+        win the race against the success toast.
+        """
+        self.locator().evaluate_all(
+            f"toasts => toasts.forEach(t => t.setAttribute('{self.SEEN_ATTR}', ''))"
+        )
+
+    def wait_for_outcome(
+        self, text: str | None = None, timeout: int = DEFAULT_TIMEOUT_MS
+    ) -> tuple[str, str]:
+        """Race the success toast (containing *text*, if given) against an error toast.
+
+        Returns ``("success" | "error", toast_text)`` as soon as either one is
+        visible instead of waiting out the timeout on the losing side.  Toasts
+        marked by `mark_seen` take no part in the race.
+        """
+        fresh = self._page.locator(f":not([{self.SEEN_ATTR}])")
+        if text:
+            success = self.locator(role="status").filter(has_text=text)
         else:
-            self.locator(role).first.wait_for(state="visible", timeout=timeout)
+            success = self.locator(role="status", toast_type="success")
+        success = success.and_(fresh).first
+        error = self.locator(role="alert", toast_type="error").and_(fresh).first
+        with measure_wait("toast.outcome"):
+            success.or_(error).first.wait_for(state="visible", timeout=timeout)
+        if error.is_visible():
+            return "error", error.inner_text()
+        return "success", success.inner_text()
 
     def expect_toast(
         self, text: str, role: str | None = None, timeout: int = SHORT_TIMEOUT_MS
@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
-from playwright.sync_api import Page, expect
-from test_config import SHORT_TIMEOUT_MS
+from playwright.sync_api import Page, Response, expect
+from test_config import DEFAULT_TIMEOUT_MS, SHORT_TIMEOUT_MS
+from timing import measure_wait
 from pages.notifications_page import NotificationsPage
 
 
@@ -39,11 +40,32 @@ class SignInPage:
     def navigate(self) -> None:
         self._page.goto(f"{self._base_url}{self.URL_PATH}")
 
-    def login(self, username: str, password: str) -> None:
-        """Fill credentials and submit the sign-in form."""
+    def login(
+        self,
+        username: str,
+        password: str,
+        timeout: int = DEFAULT_TIMEOUT_MS,
+        expect_request: bool = True,
+    ) -> Response | None:
+        """Fill credentials, submit, and return the backend's sign-in response.
+
+        Pass ``expect_request=False`` when the form is expected to fail
+        client-side validation (e.g. an empty field): nothing is posted then,
+        so the form is only submitted and ``None`` is returned.
+        """
         self.username_input.fill(username)
         self.password_input.fill(password)
-        self.submit_button.click()
+        if not expect_request:
+            self.submit_button.click()
+            return None
+        with measure_wait("POST sign-in"):
+            with self._page.expect_response(
+                lambda response: response.request.method == "POST"
+                and "/api/" in response.url,
+                timeout=timeout,
+            ) as response_info:
+                self.submit_button.click()
+        return response_info.value
 
     # -- Assertions --
 
@@ -2,8 +2,11 @@
 
 from __future__ import annotations
 
-from playwright.sync_api import Page, expect
-from test_config import SHORT_TIMEOUT_MS
+from urllib.parse import urlsplit
+
+from playwright.sync_api import Page, Response, expect
+from test_config import DEFAULT_TIMEOUT_MS, SHORT_TIMEOUT_MS
+from timing import measure_wait
 from pages.notifications_page import NotificationsPage
 
 
@@ -11,6 +14,8 @@ class UsersPage:
     """``/users`` page — user management table."""
 
     URL_PATH = "/users"
+    # Backend collection the Add User dialog posts to (``POST /api/v1/users/``).
+    API_PATH = "/users"
 
     def __init__(self, page: Page, base_url: str) -> None:
         self._page = page
@@ -72,14 +77,32 @@ class UsersPage:
         password_fields.nth(0).fill(password)
         password_fields.nth(1).fill(password)
 
-    def submit_add_user(self) -> None:
-        self.user_form_submit.click()
-
-    def create_user(self, username: str, password: str, role: str = "user") -> None:
-        """Full flow: open dialog → fill → submit."""
+    def submit_add_user(self, timeout: int = DEFAULT_TIMEOUT_MS) -> Response:
+        """Submit the dialog and return the backend's response to it."""
+        with measure_wait("POST users"):
+            with self._page.expect_response(
+                self._is_create_user_response, timeout=timeout
+            ) as response_info:
+                self.user_form_submit.click()
+        return response_info.value
+
+    def create_user(self, username: str, password: str, role: str = "user") -> Response:
+        """Full flow: open dialog → fill → submit; returns the API response."""
         self.open_add_user_dialog()
         self.fill_add_user(username, password, role)
-        self.submit_add_user()
+        return self.submit_add_user()
+
+    def close_dialog(self) -> None:
+        dialog_close = self._page.locator("[data-slot='dialog-close']")
+        if dialog_close.first.is_visible():
+            dialog_close.first.click()
+
+    @classmethod
+    def _is_create_user_response(cls, response: Response) -> bool:
+        return (
+            response.request.method == "POST"
+            and urlsplit(response.url).path.rstrip("/").endswith(cls.API_PATH)
+        )
 
     # -- Row actions --
 
@@ -89,7 +112,12 @@ class UsersPage:
         row.get_by_role("button").filter(has_text="Open menu").click()
 
     def click_row_action(self, action_name: str) -> None:
-        """Click an action from the currently-open row menu."""
+        """Click an action from the currently-open row menu.
+
+        Toasts already on screen are marked seen first, so the action's
+        outcome is read from the toast it raises.
+        """
+        NotificationsPage(self._page).mark_seen()
         self._page.get_by_role("menuitem", name=action_name).click()
 
     # -- Assertions --
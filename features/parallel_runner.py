@@ -0,0 +1,418 @@
+"""
+Parallel sharded runner for Behave stages.
+
+Splits the feature corpus into shards and runs each shard in its own
+``behave`` **worker process**.  Every worker executes its stage's
+``before_all`` hook, so it owns a private ``MockRegistry`` +
+``create_test_app()`` pair (HTTP stage) — nothing is shared between
+workers.
+
+After all workers finish, the per-worker JUnit XML and JSON reports are
+merged into a single report directory and the exit codes are folded into
+one (non-zero if any worker failed).  With ``BDD_TIMING_REPORT`` /
+``BDD_HTTP_OVERHEAD_REPORT`` set, the workers' timing and hook-overhead
+files are merged the same way, and the timing baseline
+(``BDD_TIMING_BASELINE``) is compared against the whole run.  Reports a
+previous run left in the report directory are removed before the workers
+start, so only this run's files are merged.
+
+Usage from workspace root::
+
+    uv run python features/parallel_runner.py --workers 4
+    uv run python features/parallel_runner.py --shard-by feature \\
+        ./features/spreadsheet_platform -- --tags=@smoke
+    uv run python features/parallel_runner.py --stage ui --max-workers 4 \\
+        ./features/user.feature
+
+``--max-workers`` (or ``BDD_MAX_WORKERS``) caps concurrency regardless of
+``--workers``; the UI stage needs it because every worker drives its own
+browser against the same frontend.
+
+Arguments after ``--`` are forwarded verbatim to every worker.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from behave.parser import parse_file
+
+import timing
+
+_FEATURES_DIR = Path(__file__).resolve().parent
+_WORKSPACE_DIR = _FEATURES_DIR.parent
+
+DEFAULT_REPORT_DIR = _WORKSPACE_DIR / "reports" / "parallel"
+
+# Environment variable every worker receives, so stage hooks can derive
+# per-worker resources (ports, screenshot folders, ...).
+WORKER_ID_ENV = "BEHAVE_WORKER_ID"
+
+MAX_WORKERS = int(os.environ.get("BDD_MAX_WORKERS", "0"))
+
+
+# ---------------------------------------------------------------------------
+# Sharding
+# ---------------------------------------------------------------------------
+@dataclass(slots=True)
+class WorkUnit:
+    """A runnable location (``file`` or ``file:line``) and its weight."""
+
+    location: str
+    weight: int
+
+
+@dataclass(slots=True)
+class Shard:
+    index: int
+    units: list[WorkUnit] = field(default_factory=list)
+    weight: int = 0
+
+
+def _iter_feature_files(paths: list[str]) -> list[Path]:
+    files: list[Path] = []
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            files.extend(sorted(path.rglob("*.feature")))
+        elif path.suffix == ".feature":
+            files.append(path)
+    return files
+
+
+def collect_units(paths: list[str], shard_by: str) -> list[WorkUnit]:
+    """Parse feature files and turn them into weighted work units.
+
+    The weight of a scenario is its step count (including background
+    steps), which tracks wall-clock time far better than "1 per scenario".
+    """
+    units: list[WorkUnit] = []
+    for feature_file in _iter_feature_files(paths):
+        feature = parse_file(str(feature_file))
+        if feature is None:
+            continue
+        background_steps = len(feature.background.steps) if feature.background else 0
+        scenario_units = [
+            WorkUnit(
+                location=f"{feature_file}:{scenario.line}",
+                weight=background_steps + len(scenario.steps),
+            )
+            # -- Outline rows are yielded as their own scenarios; the outline
+            # itself is skipped so its examples do not run twice.
+            for scenario in feature.walk_scenarios()
+        ]
+        if not scenario_units:
+            continue
+        if shard_by == "scenario":
+            units.extend(scenario_units)
+        else:
+            units.append(
+                WorkUnit(
+                    location=str(feature_file),
+                    weight=sum(unit.weight for unit in scenario_units),
+                )
+            )
+    return units
+
+
+def build_shards(units: list[WorkUnit], workers: int) -> list[Shard]:
+    """Greedy longest-processing-time assignment onto *workers* shards."""
+    shards = [Shard(index=i) for i in range(max(1, min(workers, len(units))))]
+    for unit in sorted(units, key=lambda u: u.weight, reverse=True):
+        target = min(shards, key=lambda s: s.weight)
+        target.units.append(unit)
+        target.weight += unit.weight
+    return [shard for shard in shards if shard.units]
+
+
+# ---------------------------------------------------------------------------
+# Workers
+# ---------------------------------------------------------------------------
+@dataclass(slots=True)
+class WorkerResult:
+    shard: Shard
+    returncode: int
+    duration: float
+    output_dir: Path
+
+
+def _run_shard(
+    shard: Shard,
+    stage: str,
+    report_dir: Path,
+    extra_args: list[str],
+) -> WorkerResult:
+    output_dir = report_dir / f"worker-{shard.index}"
+    junit_dir = output_dir / "junit"
+    junit_dir.mkdir(parents=True, exist_ok=True)
+
+    command = [
+        sys.executable,
+        "-m",
+        "behave",
+        "--stage",
+        stage,
+        "--no-skipped",
+        "--junit",
+        "--junit-directory",
+        str(junit_dir),
+        "--format",
+        "json",
+        "--outfile",
+        str(output_dir / "report.json"),
+        "--format",
+        "progress",
+        "--outfile",
+        str(output_dir / "behave.log"),
+        *extra_args,
+        *(unit.location for unit in shard.units),
+    ]
+    env = {**os.environ, WORKER_ID_ENV: str(shard.index)}
+
+    started = time.perf_counter()
+    with open(output_dir / "stderr.log", "w", encoding="utf-8") as stderr:
+        completed = subprocess.run(
+            command,
+            cwd=_WORKSPACE_DIR,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=stderr,
+            check=False,
+        )
+    return WorkerResult(
+        shard=shard,
+        returncode=completed.returncode,
+        duration=time.perf_counter() - started,
+        output_dir=output_dir,
+    )
+
+
+def clear_reports(report_dir: Path, shards: list[Shard]) -> None:
+    """Remove what an earlier run left in *report_dir* before the workers start.
+
+    Worker directories (also those of shards this run does not have), the
+    merged reports and the per-worker timing / overhead files go, so a
+    worker that crashes or writes fewer suites cannot have stale files
+    merged into this run's results.
+    """
+    for worker_dir in report_dir.glob("worker-*"):
+        shutil.rmtree(worker_dir, ignore_errors=True)
+    shutil.rmtree(report_dir / "junit", ignore_errors=True)
+    (report_dir / "report.json").unlink(missing_ok=True)
+    for path in (timing.REPORT_PATH, os.environ.get("BDD_HTTP_OVERHEAD_REPORT")):
+        if path:
+            stem, ext = os.path.splitext(path)
+            for shard in shards:
+                Path(f"{stem}.worker-{shard.index}{ext}").unlink(missing_ok=True)
+
+
+# ---------------------------------------------------------------------------
+# Report merging
+# ---------------------------------------------------------------------------
+_SUITE_COUNTERS = ("tests", "errors", "failures", "skipped")
+
+
+def merge_junit(results: list[WorkerResult], target_dir: Path) -> None:
+    """Merge per-worker JUnit files; suites split across workers are joined."""
+    suites: dict[str, ET.Element] = {}
+    for result in results:
+        for xml_file in sorted((result.output_dir / "junit").glob("*.xml")):
+            root = ET.parse(xml_file).getroot()
+            merged = suites.get(xml_file.name)
+            if merged is None:
+                suites[xml_file.name] = root
+                continue
+            for counter in _SUITE_COUNTERS:
+                total = int(merged.get(counter, "0")) + int(root.get(counter, "0"))
+                merged.set(counter, str(total))
+            total_time = float(merged.get("time", "0")) + float(root.get("time", "0"))
+            merged.set("time", f"{total_time:.6f}")
+            merged.extend(root.findall("testcase"))
+
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for name, suite in suites.items():
+        ET.ElementTree(suite).write(
+            target_dir / name, encoding="utf-8", xml_declaration=True
+        )
+
+
+def _scenario_groups(elements: list[dict]) -> list[list[dict]]:
+    """Pair each scenario with the background element emitted right before it."""
+    groups: list[list[dict]] = []
+    pending: list[dict] = []
+    for element in elements:
+        pending.append(element)
+        if element.get("type") != "background":
+            groups.append(pending)
+            pending = []
+    return groups
+
+
+def _location_line(element: dict) -> int:
+    return int(element.get("location", ":0").rsplit(":", 1)[1])
+
+
+def merge_json(results: list[WorkerResult], target_file: Path) -> None:
+    """Concatenate per-worker JSON reports, regrouping split features."""
+    features: dict[str, dict] = {}
+    for result in results:
+        report_file = result.output_dir / "report.json"
+        if not report_file.exists() or report_file.stat().st_size == 0:
+            continue
+        for feature in json.loads(report_file.read_text(encoding="utf-8")):
+            key = feature.get("location", "").rsplit(":", 1)[0]
+            merged = features.get(key)
+            if merged is None:
+                features[key] = feature
+                continue
+            merged.setdefault("elements", []).extend(feature.get("elements", []))
+            if feature.get("status") == "failed":
+                merged["status"] = "failed"
+
+    for feature in features.values():
+        groups = _scenario_groups(feature.get("elements", []))
+        groups.sort(key=lambda group: _location_line(group[-1]))
+        feature["elements"] = [element for group in groups for element in group]
+    ordered = sorted(features.values(), key=lambda f: f.get("location", ""))
+    target_file.write_text(
+        json.dumps(ordered, ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+
+
+def _worker_files(path: str, results: list[WorkerResult]) -> list[Path]:
+    stem, ext = os.path.splitext(path)
+    files = (Path(f"{stem}.worker-{result.shard.index}{ext}") for result in results)
+    return [file for file in files if file.exists()]
+
+
+def merge_timing(results: list[WorkerResult], path: str) -> dict | None:
+    """Merge the workers' timing reports into *path*, compared with the baseline."""
+    reports = [
+        json.loads(file.read_text(encoding="utf-8")) for file in _worker_files(path, results)
+    ]
+    if not reports:
+        return None
+    return timing.save_report(timing.merge_reports(reports), path, timing.BASELINE_PATH)
+
+
+def merge_overhead(results: list[WorkerResult], path: str) -> None:
+    """Sum the workers' per-scenario hook overhead, per client mode, into *path*."""
+    modes: dict[str, dict[str, float]] = {}
+    for file in _worker_files(path, results):
+        for mode, stats in json.loads(file.read_text(encoding="utf-8")).items():
+            total = modes.setdefault(mode, {"scenarios": 0, "total_ms": 0.0})
+            total["scenarios"] += stats["scenarios"]
+            total["total_ms"] += stats["total_ms"]
+    for mode, stats in modes.items():
+        stats["mean_ms"] = stats["total_ms"] / stats["scenarios"]
+        print(
+            f"[http-stage] {mode}: {stats['scenarios']} scenario(s), "
+            f"hook overhead {stats['mean_ms']:.3f} ms/scenario"
+        )
+        timing.accumulate_overhead(path, mode, stats)
+
+
+def fold_exit_codes(results: list[WorkerResult]) -> int:
+    """``0`` only if every worker passed, otherwise the worst exit code."""
+    return max((result.returncode for result in results), default=0)
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+def _parse_args(argv: list[str]) -> tuple[argparse.Namespace, list[str]]:
+    extra: list[str] = []
+    if "--" in argv:
+        split = argv.index("--")
+        argv, extra = argv[:split], argv[split + 1 :]
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("paths", nargs="*", default=[str(_FEATURES_DIR)])
+    parser.add_argument("--stage", default="http")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Number of worker processes (0 = one per CPU core).",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=MAX_WORKERS,
+        help="Upper bound on concurrent workers (0 = no limit).",
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=("scenario", "feature"),
+        default="scenario",
+    )
+    parser.add_argument("--report-dir", type=Path, default=DEFAULT_REPORT_DIR)
+    return parser.parse_args(argv), extra
+
+
+def main(argv: list[str] | None = None) -> int:
+    args, extra_args = _parse_args(sys.argv[1:] if argv is None else argv)
+    workers = args.workers or os.cpu_count() or 1
+    if args.max_workers > 0:
+        workers = min(workers, args.max_workers)
+
+    units = collect_units(args.paths, args.shard_by)
+    if not units:
+        print("No scenarios found.", file=sys.stderr)
+        return 0
+    shards = build_shards(units, workers)
+    print(
+        f"Running {len(units)} {args.shard_by}(s) of stage '{args.stage}' "
+        f"across {len(shards)} worker(s)..."
+    )
+
+    report_dir: Path = args.report_dir
+    clear_reports(report_dir, shards)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        results = list(
+            pool.map(
+                lambda shard: _run_shard(shard, args.stage, report_dir, extra_args),
+                shards,
+            )
+        )
+
+    merge_junit(results, report_dir / "junit")
+    merge_json(results, report_dir / "report.json")
+    if timing.REPORT_PATH:
+        merged = merge_timing(results, timing.REPORT_PATH)
+        if merged is not None:
+            timing.print_summary(merged)
+    overhead_report = os.environ.get("BDD_HTTP_OVERHEAD_REPORT")
+    if overhead_report:
+        merge_overhead(results, overhead_report)
+
+    for result in results:
+        status = "ok" if result.returncode == 0 else f"FAILED ({result.returncode})"
+        print(
+            f"  worker-{result.shard.index}: {len(result.shard.units)} unit(s), "
+            f"{result.duration:.2f}s, {status}"
+        )
+        if result.returncode != 0:
+            log = result.output_dir / "behave.log"
+            if log.exists():
+                print(log.read_text(encoding="utf-8"))
+    print(
+        f"Finished in {time.perf_counter() - started:.2f}s; "
+        f"reports in {report_dir}"
+    )
+    return fold_exit_codes(results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
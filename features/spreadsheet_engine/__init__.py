@@ -0,0 +1,44 @@
+"""
+In-memory reference implementation of the spreadsheet command / query side.
+
+Plugged into ``mock_app._MockProvider`` when the HTTP stage runs with
+``BDD_HTTP_BACKEND=engine`` (or for scenarios tagged ``@engine``), giving a
+DB-free integration stage.  The engine doubles as a benchmark baseline for
+the SQL implementation.
+"""
+
+from spreadsheet_engine.engine import SpreadsheetEngine
+from spreadsheet_engine.errors import (
+    AssetUploadError,
+    CellValidationError,
+    ChangeLogCompactedError,
+    EntityNotFoundError,
+    FormulaError,
+    IdempotencyKeyReusedError,
+    InvalidCursorError,
+    InvalidPageError,
+    InvalidViewSpecError,
+    SpreadsheetEngineError,
+    StaleEntityError,
+    UnsupportedOperationError,
+    VersionConflictError,
+)
+from spreadsheet_engine.interactors import EngineInteractor
+
+__all__ = [
+    "AssetUploadError",
+    "CellValidationError",
+    "ChangeLogCompactedError",
+    "EngineInteractor",
+    "EntityNotFoundError",
+    "FormulaError",
+    "IdempotencyKeyReusedError",
+    "InvalidCursorError",
+    "InvalidPageError",
+    "InvalidViewSpecError",
+    "SpreadsheetEngine",
+    "SpreadsheetEngineError",
+    "StaleEntityError",
+    "UnsupportedOperationError",
+    "VersionConflictError",
+]
@@ -0,0 +1,322 @@
+"""
+Planner and bulk executors for ``POST /tables/{table_id}:batch``.
+
+Used by engines built with ``plan_batches=True`` (and by every ``dry_run``,
+which stops after the validation pass).
+
+A batch is handled in three passes instead of one write per operation:
+
+1. **Validate** — every operation, cell values included, is checked against
+   the cached schema snapshot (:mod:`.schema`) plus an overlay of the rows
+   created / deleted and columns added / updated / dropped by *earlier*
+   operations of the same batch, and ``expected_row_version`` /
+   ``expected_column_version`` against the versions the batch started
+   from.  Formulas are parsed and checked for cycles, column titles are
+   resolved to keys and row ids / default row orders are assigned here.
+   ``dry_run`` batches end after this pass.
+2. **Plan** — each operation reads and writes a set of resources
+   (``("row", id)``, ``("cell", id, key)``, ``("col", key)``,
+   ``("schema",)``, ``("asset", id)``).  An operation is placed one layer
+   after the last conflicting operation, so layers form a topological order
+   of the dependency graph (a row is created before its cells are written;
+   ``upsert_cell`` *reads* its row, so deleting the row waits for it).
+   Inside a layer, operations are grouped by ``BatchOperationType``.
+3. **Execute** — ``add_row`` and ``upsert_cell`` groups are applied in bulk
+   (one array extension, one pass per column); other types run one by one.
+
+Results are returned in the original operation order.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID, uuid4
+
+from spreadsheet_engine import changes as change_kinds
+from spreadsheet_engine.errors import (
+    EntityNotFoundError,
+    SpreadsheetEngineError,
+    UnsupportedOperationError,
+)
+from spreadsheet_engine.formulas import check_formulas
+from spreadsheet_engine.model import Column, Table, column_changes
+from spreadsheet_engine.schema import SchemaSnapshot
+
+Resource = tuple
+
+
+@dataclass(slots=True)
+class PlannedOperation:
+    index: int
+    operation_id: str
+    operation_type: str
+    payload: dict[str, Any]
+    reads: tuple[Resource, ...] = ()
+    writes: tuple[Resource, ...] = ()
+    error: str | None = None
+    layer: int = 0
+
+
+@dataclass(slots=True)
+class BatchPlan:
+    operations: list[PlannedOperation]
+    groups: list[tuple[str, list[PlannedOperation]]]
+    schema_version: int
+
+    @property
+    def layers(self) -> int:
+        return 1 + max((op.layer for op in self.operations), default=-1)
+
+
+# ---------------------------------------------------------------------------
+# Validation
+# ---------------------------------------------------------------------------
+class _Overlay:
+    """The table as earlier operations of the batch will have left it."""
+
+    def __init__(self, table: Table, schema: SchemaSnapshot) -> None:
+        self.table = table
+        self.columns = dict(schema.columns)
+        self.created: set[UUID] = set()
+        self.deleted: set[UUID] = set()
+        self.next_row_order = table.next_row_order
+
+    def row_exists(self, row_id: UUID) -> bool:
+        if row_id in self.created:
+            return True
+        return row_id in self.table.row_slots and row_id not in self.deleted
+
+    def require_row(self, row_id: UUID) -> None:
+        if not self.row_exists(row_id):
+            raise EntityNotFoundError("Row", row_id)
+
+    def column_key(self, key_or_title: str) -> str:
+        if key_or_title in self.columns:
+            return key_or_title
+        for key, column in self.columns.items():
+            if column.title == key_or_title:
+                return key
+        raise EntityNotFoundError("Column", key_or_title)
+
+    def reserve_order(self, order: int | None) -> int:
+        order = order if order is not None else self.next_row_order
+        self.next_row_order = max(self.next_row_order, order) + 1
+        return order
+
+
+def _resolve_cells(overlay: _Overlay, cells: dict[str, Any]) -> dict[str, Any]:
+    resolved = {}
+    for key_or_title, value in cells.items():
+        key = overlay.column_key(key_or_title)
+        overlay.columns[key].validate(value)
+        resolved[key] = value
+    return resolved
+
+
+def _validate(
+    overlay: _Overlay,
+    op: PlannedOperation,
+    as_uuid: Callable[[Any], UUID],
+) -> None:
+    """Check *op* against the overlay, normalize its payload, record resources."""
+    payload = op.payload
+    kind = op.operation_type
+
+    if kind == "upsert_cell":
+        key = overlay.column_key(payload["column_key"])
+        overlay.columns[key].validate(payload.get("value"))
+        row_id = as_uuid(payload["row_id"])
+        overlay.require_row(row_id)
+        overlay.table.check_row_version(row_id, payload.get("expected_row_version"))
+        payload.update(row_id=row_id, column_key=key)
+        op.reads = (("row", row_id.int), ("col", key))
+        op.writes = (("cell", row_id.int, key),)
+
+    elif kind == "add_column":
+        key = payload["key"]
+        if key in overlay.columns:
+            raise SpreadsheetEngineError(f"Column already exists: {key!r}")
+        payload["column_key"] = key
+        column = Column.from_payload(overlay.table.id, payload, len(overlay.columns) + 1)
+        if column.formula:
+            check_formulas({**overlay.columns, key: column})
+        overlay.columns[key] = column
+        op.writes = (("schema",), ("col", key))
+
+    elif kind in ("update_column", "delete_column"):
+        key = overlay.column_key(payload.get("column_key") or payload["key"])
+        payload["column_key"] = key
+        overlay.columns[key].check_version(payload.get("expected_column_version"))
+        if kind == "delete_column":
+            del overlay.columns[key]
+        else:
+            column = overlay.columns[key].copy(with_values=False)
+            for name, value in column_changes(payload).items():
+                setattr(column, name, value)
+            if column.formula:
+                check_formulas({**overlay.columns, key: column})
+            overlay.columns[key] = column
+        op.writes = (("schema",), ("col", key))
+
+    elif kind == "add_row":
+        payload["cells"] = _resolve_cells(overlay, payload.get("cells") or {})
+        row_id = as_uuid(payload["row_id"]) if payload.get("row_id") else uuid4()
+        if overlay.row_exists(row_id):
+            raise SpreadsheetEngineError(f"Row already exists: {row_id}")
+        parent = payload.get("parent_row_id")
+        payload["parent_row_id"] = as_uuid(parent) if parent else None
+        payload["row_id"] = row_id
+        payload["order"] = overlay.reserve_order(payload.get("order"))
+        overlay.created.add(row_id)
+        overlay.deleted.discard(row_id)
+        op.writes = (("row", row_id.int),)
+        op.reads = tuple(("col", key) for key in payload["cells"])
+
+    elif kind == "update_row":
+        row_id = as_uuid(payload["row_id"])
+        overlay.require_row(row_id)
+        overlay.table.check_row_version(row_id, payload.get("expected_row_version"))
+        payload["row_id"] = row_id
+        payload["cells"] = _resolve_cells(overlay, payload.get("cells") or {})
+        mask = payload.get("update_mask") or []
+        if "order" in mask and payload.get("order") is not None:
+            overlay.reserve_order(payload["order"])
+        op.writes = (("row", row_id.int),)
+        op.reads = tuple(("col", key) for key in payload["cells"])
+
+    elif kind == "delete_row":
+        row_id = as_uuid(payload["row_id"])
+        overlay.require_row(row_id)
+        overlay.table.check_row_version(row_id, payload.get("expected_row_version"))
+        payload["row_id"] = row_id
+        overlay.created.discard(row_id)
+        overlay.deleted.add(row_id)
+        op.writes = (("row", row_id.int),)
+
+    elif kind == "bind_asset":
+        op.writes = (("asset", str(payload["asset_id"])),)
+
+    else:
+        raise UnsupportedOperationError(kind)
+
+
+# ---------------------------------------------------------------------------
+# Planning
+# ---------------------------------------------------------------------------
+def plan_batch(
+    table: Table,
+    operations: list[dict[str, Any]],
+    as_uuid: Callable[[Any], UUID],
+    schema: SchemaSnapshot | None = None,
+    *,
+    layered: bool = True,
+) -> BatchPlan:
+    """Validate and layer *operations*; the table itself is only read.
+
+    ``layered=False`` (dry runs) stops after validation: no layers, no groups.
+    """
+    schema = schema or SchemaSnapshot.of(table)
+    overlay = _Overlay(table, schema)
+    planned: list[PlannedOperation] = []
+    last_write: dict[Resource, int] = {}
+    last_read: dict[Resource, int] = {}
+
+    for index, operation in enumerate(operations):
+        op = PlannedOperation(
+            index=index,
+            operation_id=operation.get("operation_id", ""),
+            operation_type=operation.get("operation_type", ""),
+            payload=dict(operation.get("payload") or {}),
+        )
+        planned.append(op)
+        try:
+            _validate(overlay, op, as_uuid)
+        except (SpreadsheetEngineError, KeyError) as exc:
+            op.error = str(exc)
+            continue
+        if not layered:
+            continue
+
+        layer = 0
+        for resource in op.writes:
+            seen = last_write.get(resource, -1)
+            read = last_read.get(resource, -1)
+            if read > seen:
+                seen = read
+            if seen >= layer:
+                layer = seen + 1
+        for resource in op.reads:
+            seen = last_write.get(resource, -1)
+            if seen >= layer:
+                layer = seen + 1
+        op.layer = layer
+        for resource in op.writes:
+            last_write[resource] = layer
+        for resource in op.reads:
+            if last_read.get(resource, -1) < layer:
+                last_read[resource] = layer
+
+    grouped: dict[tuple[int, str], list[PlannedOperation]] = {}
+    for op in planned if layered else ():
+        if op.error is None:
+            grouped.setdefault((op.layer, op.operation_type), []).append(op)
+    ordered = sorted(grouped.items(), key=lambda item: (item[0][0], item[1][0].index))
+    groups = [(kind, ops) for (_, kind), ops in ordered]
+    return BatchPlan(
+        operations=planned, groups=groups, schema_version=schema.schema_version
+    )
+
+
+# ---------------------------------------------------------------------------
+# Bulk executors
+# ---------------------------------------------------------------------------
+def bulk_add_rows(
+    table: Table,
+    ops: list[PlannedOperation],
+    results: dict[int, tuple[bool, str | None, dict[str, Any]]],
+    changes: list[tuple],
+) -> None:
+    first_slot = table.add_rows(
+        [
+            (op.payload["row_id"], op.payload["parent_row_id"], op.payload["order"])
+            for op in ops
+        ]
+    )
+    per_column: dict[str, list[tuple[int, Any]]] = defaultdict(list)
+    for offset, op in enumerate(ops):
+        for key, value in op.payload["cells"].items():
+            per_column[key].append((first_slot + offset, value))
+        results[op.index] = (True, None, {"row_id": op.payload["row_id"]})
+        changes.append((change_kinds.ROW_INSERTED, op.payload["row_id"]))
+    for key, writes in per_column.items():
+        table.write_column(key, writes)
+
+
+def bulk_upsert_cells(
+    table: Table,
+    ops: list[PlannedOperation],
+    results: dict[int, tuple[bool, str | None, dict[str, Any]]],
+    changes: list[tuple],
+) -> None:
+    per_column: dict[str, list[tuple[int, Any]]] = defaultdict(list)
+    for op in ops:
+        row_id, key = op.payload["row_id"], op.payload["column_key"]
+        try:
+            slot = table.slot_of(row_id)
+        except SpreadsheetEngineError as exc:
+            results[op.index] = (False, str(exc), {})
+            continue
+        per_column[key].append((slot, op.payload.get("value")))
+        results[op.index] = (True, None, {"row_id": row_id, "column_key": key})
+        changes.append((change_kinds.CELL_CHANGED, row_id, key))
+    for key, writes in per_column.items():
+        table.write_column(key, writes)
+
+
+BULK_EXECUTORS = {
+    "add_row": bulk_add_rows,
+    "upsert_cell": bulk_upsert_cells,
+}
@@ -0,0 +1,433 @@
+"""
+Micro-benchmarks for the in-memory engine.
+
+Usage from ``features/``::
+
+    uv run --group bdd python -m spreadsheet_engine.bench      # every benchmark
+    uv run --group bdd python -m spreadsheet_engine.bench batch --ops 10000 --repeat 5
+
+``batch`` runs one mixed ``:batch`` request (``add_row`` → ``upsert_cell``
+on the new rows → ``update_row`` → ``delete_row``) through the planned and
+the sequential batch paths and prints throughput per path plus the number of
+bulk groups the plan issued — the statements a SQL backend would send.
+
+``dry_run`` validates the same batch against a table already holding
+``--rows`` rows, via the schema-snapshot fast path and via the old
+copy-and-apply path.
+
+``vector`` runs whole-column work on a ``--rows`` table (use
+``--rows 100000``) with NumPy column arrays and per cell: recomputing two
+new formula columns, one filtered view and a set of aggregates.  Column
+arrays are loaded once per column epoch, so repeats measure warm arrays.
+
+``vector_diff`` is the differential check behind it: on ``--repeat`` random
+``--rows`` tables it computes formula columns (including errors, ``IF`` and
+calls), view filters and aggregates on both paths and fails on the first
+value the NumPy path returns differently from the per-cell one.
+
+``follow`` builds a project of ``--rows`` assets (uploads, follow copies,
+copies of copies, some detached) and times ``get_table_stats`` read from
+the follow-group index against walking every asset's follow chain.
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import random
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from types import SimpleNamespace
+from typing import Any
+from uuid import UUID
+
+from spreadsheet_engine import vector
+from spreadsheet_engine.batch import plan_batch
+from spreadsheet_engine.engine import SpreadsheetEngine, as_uuid, plain
+
+PROJECT_ID = UUID(int=1)
+
+
+def _request(operation: str, **payload: Any) -> SimpleNamespace:
+    return SimpleNamespace(operation=operation, payload=payload)
+
+
+def _engine_with_table(width: int, plan_batches: bool) -> tuple[SpreadsheetEngine, UUID]:
+    engine = SpreadsheetEngine(plan_batches=plan_batches)
+    table_id = engine.execute(
+        _request("create_plain_table", project_id=PROJECT_ID, table_name="bench")
+    )["table_id"]
+    for index in range(width):
+        engine.execute(
+            _request("add_column", table_id=table_id, key=f"c{index}", data_type="text")
+        )
+    return engine, table_id
+
+
+def mixed_batch(ops: int, width: int, seed: int = 0) -> list[dict[str, Any]]:
+    """``ops`` operations: 40 % add_row, 40 % upsert_cell, 15 % update, 5 % delete."""
+    rng = random.Random(seed)
+    rows = [UUID(int=rng.getrandbits(128), version=4) for _ in range(int(ops * 0.4))]
+
+    def op(kind: str, **payload: Any) -> dict[str, Any]:
+        index = str(len(operations))
+        return {"operation_id": index, "operation_type": kind, "payload": payload}
+
+    operations: list[dict[str, Any]] = []
+    for row_id in rows:
+        operations.append(op("add_row", row_id=str(row_id), cells={"c0": "new"}))
+    for _ in range(int(ops * 0.4)):
+        row_id, key = rng.choice(rows), f"c{rng.randrange(width)}"
+        operations.append(op("upsert_cell", row_id=str(row_id), column_key=key, value="v"))
+    for row_id in rng.sample(rows, int(ops * 0.15)):
+        operations.append(op("update_row", row_id=str(row_id), cells={"c1": "u"}))
+    for row_id in rng.sample(rows, ops - len(operations)):
+        operations.append(op("delete_row", row_id=str(row_id)))
+    return operations
+
+
+def bench_batch(args: argparse.Namespace) -> list[dict[str, Any]]:
+    operations = mixed_batch(args.ops, args.width)
+    results = []
+    for label, planned in (("planned", True), ("sequential", False)):
+        samples = []
+        for _ in range(args.repeat):
+            engine, table_id = _engine_with_table(args.width, planned)
+            started = time.perf_counter()
+            response = engine.execute(
+                _request("batch_table_operations", table_id=table_id, operations=operations)
+            )
+            samples.append(time.perf_counter() - started)
+            assert all(result["success"] for result in response["results"]), label
+        results.append(_row(f"batch[{label}]", args.ops, samples))
+
+    engine, table_id = _engine_with_table(args.width, True)
+    plan = plan_batch(engine.tables[table_id], operations, as_uuid)
+    results[0]["groups"] = len(plan.groups)
+    return results
+
+
+def bench_dry_run(args: argparse.Namespace) -> list[dict[str, Any]]:
+    operations = mixed_batch(args.ops, args.width)
+    existing = [
+        {"row_id": str(UUID(int=index + 1)), "cells": {"c0": "seed"}}
+        for index in range(args.rows)
+    ]
+    engine, table_id = _engine_with_table(args.width, False)
+    engine.execute(_request("batch_upsert_rows", table_id=table_id, rows=existing))
+
+    def snapshot() -> None:
+        engine.execute(
+            _request(
+                "batch_table_operations",
+                table_id=table_id,
+                operations=operations,
+                dry_run=True,
+            )
+        )
+
+    def copy() -> None:
+        # -- What dry runs did before the validation pass: apply to a clone
+        # -- (after the same payload normalization ``execute`` does).
+        with engine.lock:
+            target = engine.tables[table_id].clone()
+            engine._apply_sequential(target, plain(operations), True, [], [])
+
+    results = []
+    for label, run in (("snapshot", snapshot), ("copy", copy)):
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            run()
+            samples.append(time.perf_counter() - started)
+        results.append(_row(f"dry_run[{label}]", args.ops, samples))
+    return results
+
+
+def _vector_rows(count: int, seed: int = 0) -> list[dict[str, Any]]:
+    rng = random.Random(seed)
+    return [
+        {
+            "row_id": str(UUID(int=index + 1)),
+            "cells": {
+                "n": rng.choice([None, rng.randint(-100, 100), rng.uniform(-100, 100)]),
+                "status": rng.choice([None, "todo", "doing", "done"]),
+                "start": f"2024-{rng.randint(1, 6):02d}-{rng.randint(1, 28):02d}",
+                "end": f"2024-{rng.randint(7, 12):02d}-{rng.randint(1, 28):02d}",
+            },
+        }
+        for index in range(count)
+    ]
+
+
+def _vector_engine(rows: list[dict[str, Any]]) -> tuple[SpreadsheetEngine, UUID]:
+    engine, table_id = _engine_with_table(0, True)
+    for key, data_type in (
+        ("n", "number"), ("status", "select"), ("start", "date"), ("end", "date")
+    ):
+        engine.execute(_request("add_column", table_id=table_id, key=key, data_type=data_type))
+    engine.execute(_request("batch_upsert_rows", table_id=table_id, rows=rows))
+    return engine, table_id
+
+
+VECTOR_AGGREGATES = [
+    {"column_key": key, "function": function}
+    for key, functions in (("n", ("sum", "avg", "min", "max")), ("end", ("min", "max")))
+    for function in functions
+]
+
+
+def bench_vector(args: argparse.Namespace) -> list[dict[str, Any]]:
+    if vector.np is None:
+        print("vector: NumPy is not installed, skipped", file=sys.stderr)
+        return []
+    rows = _vector_rows(args.rows)
+    results = []
+    enabled = vector.ENABLED
+    try:
+        for label, vectorized in (("numpy", True), ("per_cell", False)):
+            vector.ENABLED = vectorized
+            engine, table_id = _vector_engine(rows)
+            table = engine.tables[table_id]
+            view_id = engine.execute(
+                _request(
+                    "create_view",
+                    table_id=table_id,
+                    name="bench",
+                    filters={"expr": "n > 0 and status != done"},
+                )
+            )["view_id"]
+            view = engine.views[view_id]
+
+            formula, filtered, aggregated = [], [], []
+            for attempt in range(args.repeat):
+                started = time.perf_counter()
+                for key, text in (("span", "DAYS({end}, {start})"), ("score", "{n} * 2 + 1")):
+                    engine.execute(
+                        _request(
+                            "add_column",
+                            table_id=table_id,
+                            key=f"{key}{attempt}",
+                            data_type="formula",
+                            formula=text,
+                        )
+                    )
+                formula.append(time.perf_counter() - started)
+
+                engine.view_planner.forget(view_id)
+                started = time.perf_counter()
+                slots = engine.view_planner.rows(view, table)
+                filtered.append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                engine.view_planner.aggregate(table, table.live_slots(), VECTOR_AGGREGATES)
+                aggregated.append(time.perf_counter() - started)
+            results += [
+                _row(f"formula[{label}]", 2 * args.rows, formula),
+                _row(f"filter[{label}]", args.rows, filtered),
+                _row(f"aggregate[{label}]", len(VECTOR_AGGREGATES) * args.rows, aggregated),
+            ]
+            assert slots, label
+    finally:
+        vector.ENABLED = enabled
+    return results
+
+
+# Formulas / filters of the differential check: errors, IF, calls, mixed types.
+DIFF_FORMULAS = {
+    "span": "DAYS({end}, {start})",
+    "score": "{n} * 2 + 1",
+    "ratio": "{n} / ({n} - 1)",
+    "pick": "IF({n} > 0, ROUND({n}), -{n})",
+    "mean": "AVERAGE({n}, 1.5)",
+}
+DIFF_FILTERS = ["n > 0 and status != done", "status = todo or n < -50"]
+
+
+def _vector_outcome(rows: list[dict[str, Any]]) -> dict[str, Any]:
+    """Every whole-column result the vectorized path covers, on one table."""
+    engine, table_id = _vector_engine(rows)
+    for key, text in DIFF_FORMULAS.items():
+        engine.execute(
+            _request("add_column", table_id=table_id, key=key, data_type="formula", formula=text)
+        )
+    table = engine.tables[table_id]
+    slots = table.live_slots()
+    outcome: dict[str, Any] = {
+        f"formula {key}": [table.columns[key].values[slot] for slot in slots]
+        for key in DIFF_FORMULAS
+    }
+    for expr in DIFF_FILTERS:
+        view_id = engine.execute(
+            _request("create_view", table_id=table_id, name=expr, filters={"expr": expr})
+        )["view_id"]
+        outcome[f"filter {expr}"] = engine.view_planner.rows(engine.views[view_id], table)
+    for result in engine.view_planner.aggregate(table, slots, VECTOR_AGGREGATES):
+        outcome[f"{result['function']}({result['column_key']})"] = [result["value"]]
+    return outcome
+
+
+def _same(left: Any, right: Any) -> bool:
+    """Equal and of one type; floats may differ in the last bits (vectorized sums)."""
+    if type(left) is not type(right):
+        return False
+    if isinstance(left, float):
+        return math.isclose(left, right, rel_tol=1e-9, abs_tol=1e-9)
+    return left == right
+
+
+def bench_vector_diff(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """Differential check: NumPy results against the per-cell reference.
+
+    Builds ``--repeat`` random ``--rows`` tables (seeds 0, 1, ...) and fails
+    on the first result the two paths disagree on.  Timings are of the
+    NumPy pass (table load included).
+    """
+    if vector.np is None:
+        print("vector_diff: NumPy is not installed, skipped", file=sys.stderr)
+        return []
+    samples = []
+    enabled, min_rows = vector.ENABLED, vector.MIN_ROWS
+    try:
+        for seed in range(args.repeat):
+            rows = _vector_rows(args.rows, seed)
+            vector.ENABLED, vector.MIN_ROWS = True, 0
+            started = time.perf_counter()
+            vectorized = _vector_outcome(rows)
+            samples.append(time.perf_counter() - started)
+            vector.ENABLED = False
+            reference = _vector_outcome(rows)
+            for name, expected in reference.items():
+                actual = vectorized[name]
+                mismatches = [
+                    (index, want, got)
+                    for index, (want, got) in enumerate(zip(expected, actual))
+                    if not _same(want, got)
+                ]
+                assert len(actual) == len(expected) and not mismatches, (
+                    f"seed {seed}, {name}: {len(actual)} vs {len(expected)} results, "
+                    f"(position, per-cell, numpy) {mismatches[:5]}"
+                )
+    finally:
+        vector.ENABLED, vector.MIN_ROWS = enabled, min_rows
+    return [_row("vector_diff[numpy]", args.rows, samples)]
+
+
+def bench_follow(args: argparse.Namespace) -> list[dict[str, Any]]:
+    rng = random.Random(0)
+    engine, table_id = _engine_with_table(0, True)
+    other_id = engine.execute(
+        _request("create_plain_table", project_id=PROJECT_ID, table_name="other")
+    )["table_id"]
+    asset_ids: list[UUID] = []
+    while len(asset_ids) < args.rows:
+        if not asset_ids or rng.random() < 0.3:
+            asset_id = engine.execute(
+                _request(
+                    "upload_asset",
+                    project_id=PROJECT_ID,
+                    asset_type=rng.choice(["design", "test"]),
+                    title="bench",
+                )
+            )["asset_id"]
+            if rng.random() < 0.5:
+                engine.execute(
+                    _request("bind_asset_to_cells", asset_id=asset_id, table_id=table_id)
+                )
+        else:
+            asset_id = engine.execute(
+                _request(
+                    "copy_asset",
+                    asset_id=rng.choice(asset_ids),
+                    target_table_id=rng.choice([table_id, other_id]),
+                    follow_mode="detached" if rng.random() < 0.05 else "follow",
+                )
+            )["asset_id"]
+        asset_ids.append(asset_id)
+
+    def walk_stats() -> dict[str, int]:
+        """The pre-index computation: one follow-chain walk per asset."""
+        table = engine.tables[table_id]
+        linked: dict[str, set[UUID]] = {"design": set(), "test": set()}
+        unlinked: dict[str, set[UUID]] = {"design": set(), "test": set()}
+        for asset in engine.assets.values():
+            if asset.project_id != table.project_id:
+                continue
+            root = asset
+            while root.follow_mode == "follow" and root.follow_parent_id in engine.assets:
+                root = engine.assets[root.follow_parent_id]
+            if any(bound == table.id for bound, _ in asset.bindings):
+                linked[asset.asset_type].add(root.id)
+            elif not asset.bindings:
+                unlinked[asset.asset_type].add(root.id)
+        return {
+            "design_asset_count": len(linked["design"]),
+            "test_asset_count": len(linked["test"]),
+            "unlinked_design_asset_count": len(unlinked["design"]),
+            "unlinked_test_asset_count": len(unlinked["test"]),
+        }
+
+    def indexed_stats() -> dict[str, int]:
+        stats = engine.execute(_request("get_table_stats", table_id=table_id))
+        return {key: stats[key] for key in expected}
+
+    expected = walk_stats()
+    results = []
+    for label, stats in (("index", indexed_stats), ("walk", walk_stats)):
+        samples = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            counts = stats()
+            samples.append(time.perf_counter() - started)
+        assert counts == expected, label
+        results.append(_row(f"follow[{label}]", args.rows, samples))
+    return results
+
+
+def _row(name: str, ops: int, samples: list[float]) -> dict[str, Any]:
+    median = statistics.median(samples)
+    return {"name": name, "ops": ops, "median_ms": median * 1000, "ops_per_s": ops / median}
+
+
+BENCHMARKS: dict[str, Callable[[argparse.Namespace], list[dict[str, Any]]]] = {
+    "batch": bench_batch,
+    "dry_run": bench_dry_run,
+    "follow": bench_follow,
+    "vector": bench_vector,
+    "vector_diff": bench_vector_diff,
+}
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+def _parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("names", nargs="*", metavar="name", help=", ".join(BENCHMARKS))
+    parser.add_argument("--ops", type=int, default=10_000)
+    parser.add_argument("--width", type=int, default=8, help="Columns per table.")
+    parser.add_argument("--rows", type=int, default=50_000, help="Rows already stored.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    unknown = sorted(set(args.names) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _parse_args(sys.argv[1:] if argv is None else argv)
+    for name in args.names or list(BENCHMARKS):
+        for row in BENCHMARKS[name](args):
+            extra = f"  groups={row['groups']}" if "groups" in row else ""
+            print(
+                f"{row['name']:<24} {row['ops']:>8} ops  {row['median_ms']:9.1f} ms  "
+                f"{row['ops_per_s']:>10.0f} ops/s{extra}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Content-addressed store for asset bodies.
+
+An asset keeps the SHA-256 ``content_digest`` of its body instead of the
+body itself; the bytes are stored once in a :class:`BlobStore` however many
+assets, copies and followers point at them.  Copying an asset or syncing a
+follower only moves a digest, and editing an asset writes a new blob while
+its copies keep sharing the old one (copy-on-write).  Identical uploads —
+retries under the same ``idempotency_key`` included — resolve to the blob
+already stored.
+
+Blobs are reference counted in memory by the assets pointing at them and
+deleted when the last reference goes, so a blob directory belongs to one
+store: :meth:`BlobStore.from_env` gives every store (every engine) its own
+subdirectory of ``BDD_ASSET_BLOB_DIR``, removed again by
+:meth:`BlobStore.close`.  Callers serialize access (the engine lock).
+
+Two backends implement :class:`BlobBackend`:
+
+* :class:`MemoryBlobBackend` — in-process ``dict`` (default);
+* :class:`DiskBlobBackend` — one file per blob under a directory, fanned
+  out by the first two hex digits of the digest and written atomically.
+
+Configuration::
+
+    BDD_ASSET_BLOB_DIR=<path>   # use DiskBlobBackend under <path>/store-*
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Protocol
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+BLOB_DIR = os.environ.get("BDD_ASSET_BLOB_DIR")
+
+# Bytes read per step when a staged upload is copied into memory.
+READ_CHUNK = 1024 * 1024
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+class BlobBackend(Protocol):
+    """Digest -> bytes storage; blobs are immutable once written."""
+
+    def get(self, digest: str) -> bytes: ...
+
+    def put(self, digest: str, data: bytes) -> bool:
+        """Store a blob; return ``False`` when it was already stored."""
+        ...
+
+    def put_file(self, digest: str, path: Path) -> bool:
+        """Store the file at *path* (consumed); ``False`` when already stored."""
+        ...
+
+    def delete(self, digest: str) -> None: ...
+
+    def close(self) -> None:
+        """Drop every blob; the store is discarded."""
+        ...
+
+
+class MemoryBlobBackend:
+    def __init__(self) -> None:
+        self._blobs: dict[str, bytes | bytearray] = {}
+
+    def get(self, digest: str) -> bytes:
+        return bytes(self._blobs[digest])
+
+    def put(self, digest: str, data: bytes) -> bool:
+        if digest in self._blobs:
+            return False
+        self._blobs[digest] = data
+        return True
+
+    def put_file(self, digest: str, path: Path) -> bool:
+        try:
+            if digest in self._blobs:
+                return False
+            # -- Read into one preallocated buffer, READ_CHUNK bytes at a time:
+            # -- the blob itself is the only full-size copy ever held.
+            data = bytearray(path.stat().st_size)
+            with path.open("rb", buffering=0) as handle:
+                view = memoryview(data)
+                while view:
+                    read = handle.readinto(view[:READ_CHUNK])
+                    if not read:
+                        raise OSError(f"{path} shrank while it was stored")
+                    view = view[read:]
+            self._blobs[digest] = data
+            return True
+        finally:
+            path.unlink(missing_ok=True)
+
+    def delete(self, digest: str) -> None:
+        self._blobs.pop(digest, None)
+
+    def close(self) -> None:
+        self._blobs.clear()
+
+
+class DiskBlobBackend:
+    """Blobs as ``<root>/<digest[:2]>/<digest[2:]>`` files."""
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:]
+
+    def get(self, digest: str) -> bytes:
+        return self._path(digest).read_bytes()
+
+    def put(self, digest: str, data: bytes) -> bool:
+        path = self._path(digest)
+        if path.exists():
+            return False
+        path.parent.mkdir(exist_ok=True)
+        # -- Write-then-rename: a reader never sees a partial blob.
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return True
+
+    def put_file(self, digest: str, path: Path) -> bool:
+        target = self._path(digest)
+        if target.exists():
+            path.unlink(missing_ok=True)
+            return False
+        target.parent.mkdir(exist_ok=True)
+        try:
+            os.replace(path, target)
+        except OSError:
+            # -- Staged on another filesystem: copy next to the target first.
+            fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+            os.close(fd)
+            shutil.move(path, tmp)
+            os.replace(tmp, target)
+        return True
+
+    def delete(self, digest: str) -> None:
+        self._path(digest).unlink(missing_ok=True)
+
+    def close(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+class BlobStore:
+    def __init__(self, backend: BlobBackend | None = None) -> None:
+        self.backend = backend if backend is not None else MemoryBlobBackend()
+        self.refs: Counter[str] = Counter()
+        self._metrics = dict.fromkeys(("stored", "deduplicated", "deleted"), 0)
+
+    @classmethod
+    def from_env(cls) -> BlobStore:
+        if not BLOB_DIR:
+            return cls(MemoryBlobBackend())
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        return cls(DiskBlobBackend(tempfile.mkdtemp(prefix="store-", dir=BLOB_DIR)))
+
+    def close(self) -> None:
+        """Delete every blob of this store (its directory included)."""
+        self.backend.close()
+        self.refs.clear()
+
+    def __len__(self) -> int:
+        return len(self.refs)
+
+    def metrics(self) -> dict[str, int]:
+        return {**self._metrics, "blobs": len(self.refs), "references": self.refs.total()}
+
+    def put(self, content: str) -> str:
+        """Store *content* (once) and take a reference to it; return its digest."""
+        data = content.encode()
+        digest = content_digest(data)
+        if digest in self.refs or not self.backend.put(digest, data):
+            self._metrics["deduplicated"] += 1
+        else:
+            self._metrics["stored"] += 1
+        self.refs[digest] += 1
+        return digest
+
+    def put_file(self, path: Path, digest: str) -> str:
+        """Like :meth:`put` for a staged file already hashed to *digest*."""
+        if digest in self.refs:
+            path.unlink(missing_ok=True)
+            self._metrics["deduplicated"] += 1
+        elif self.backend.put_file(digest, path):
+            self._metrics["stored"] += 1
+        else:
+            self._metrics["deduplicated"] += 1
+        self.refs[digest] += 1
+        return digest
+
+    def get(self, digest: str) -> str:
+        return self.backend.get(digest).decode()
+
+    def retain(self, digest: str) -> str:
+        """Take one more reference to a stored blob (an O(1) copy)."""
+        self.refs[digest] += 1
+        return digest
+
+    def release(self, digest: str) -> None:
+        self.refs[digest] -= 1
+        if self.refs[digest] <= 0:
+            del self.refs[digest]
+            self.backend.delete(digest)
+            self._metrics["deleted"] += 1
+
+    def relink(self, old: str, new: str) -> str:
+        """Move one reference from *old* to *new*; return *new*."""
+        self.retain(new)
+        self.release(old)
+        return new
@@ -0,0 +1,75 @@
+"""
+Opaque keyset cursors for paging through a table view.
+
+A cursor pins the table ``version`` it was issued for plus the ``(order,
+id)`` key of the last row on the page.  The next page starts strictly
+after that key, so it costs the same at any depth and rows inserted or
+deleted elsewhere cannot shift page boundaries.  A cursor from an older
+version is rejected with :class:`VersionConflictError`, matching the
+``expected_version`` model of the write side.
+
+Pages of a filtered / sorted view follow the view's order instead, so their
+cursors also pin the view: ``view_id`` and ``view_version``.  Such a cursor
+is only valid for the same view at the same version.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from typing import NamedTuple
+from uuid import UUID
+
+from spreadsheet_engine.errors import InvalidCursorError
+
+
+class PageCursor(NamedTuple):
+    version: int
+    order: int
+    row_id: str
+    view_id: str | None = None
+    view_version: int | None = None
+
+
+def encode_cursor(
+    version: int,
+    order: int,
+    row_id: UUID | str,
+    view_id: UUID | None = None,
+    view_version: int | None = None,
+) -> str:
+    fields: list = [version, order, str(row_id)]
+    if view_id is not None:
+        fields += [str(view_id), view_version]
+    raw = json.dumps(fields, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _is_int(value: object) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor: str) -> PageCursor:
+    """Decode *cursor*: ``[int, int, uuid-str]``, plus ``[uuid-str, int]``
+    for a view cursor; anything else is invalid.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        fields = json.loads(raw)
+        version, order, row_id, *view = fields
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursorError(cursor) from None
+    if not (_is_int(version) and _is_int(order) and isinstance(row_id, str)):
+        raise InvalidCursorError(cursor)
+    if view and not (
+        len(view) == 2 and isinstance(view[0], str) and _is_int(view[1])
+    ):
+        raise InvalidCursorError(cursor)
+    try:
+        UUID(row_id)
+        if view:
+            UUID(view[0])
+    except ValueError:
+        raise InvalidCursorError(cursor) from None
+    return PageCursor(version, order, row_id, *view)
@@ -0,0 +1,1149 @@
+"""
+Stateful in-memory implementation of the spreadsheet command / query side.
+
+:class:`SpreadsheetEngine` consumes the same ``request.operation`` +
+``request.payload`` objects the controllers dispatch into
+``SpreadsheetCommandInteractor`` / ``SpreadsheetQueryService`` and answers
+with plain dicts shaped like the presentation-layer response schemas.
+
+Payload convention: path parameters (``project_id``, ``table_id``,
+``view_id``, ``asset_id``, ``row_id``, ``column_key``) plus the fields of
+the request body.  Pydantic models and enums inside the payload are
+normalized to plain Python values first.  Create payloads may pin the new
+entity's id (``table_id``, ``row_id``, ``view_id``, ``asset_id`` for an
+upload, ``copy_asset_id`` for a copy) so Given steps can seed the engine
+under the ids later steps address.
+
+Implemented semantics:
+
+* table version bumped once per successful write, ``expected_version``
+  checked before any mutation;
+* per-row and per-column-definition versions: a write carrying
+  ``expected_row_version`` / ``expected_column_version`` conflicts only
+  when the rows / columns it touches moved on;
+* ``idempotency_key`` replay for ``:batch`` and asset upload through a TTL /
+  LRU bounded :class:`.IdempotencyStore`; a key reused with another body is
+  rejected;
+* ``atomic`` batches applied to a copy-on-write snapshot, ``dry_run``
+  batches never committed;
+* with ``plan_batches=True``, batches validated up front and applied in
+  dependency-ordered bulk groups of one operation type (:mod:`.batch`),
+  results kept in request order.  That models the statements a SQL backend
+  would send; in memory the extra pass costs more than the bulk writes
+  save, so batches apply operation by operation by default;
+* ``dry_run`` batches answered from that validation pass against a cached
+  schema snapshot (:mod:`.schema`), reporting ``validated_version`` (usable
+  as ``expected_version``) and ``schema_version``;
+* asset bodies stored once in a content-addressed blob store (:mod:`.blobs`):
+  copies and follower syncs share blobs, identical uploads dedupe;
+* resumable chunked asset uploads streamed to a staging file, hashed and
+  size-checked per chunk (:mod:`.uploads`);
+* asset content edits answered with a propagation ``job_id``; follow copies
+  are refreshed in bulk by a coalescing job queue (:mod:`.propagation`);
+* table statistics where a parent asset and its follow copies count once,
+  read from an incrementally maintained follow-group index (:mod:`.follow`);
+* keyset pagination of ``get_table_view`` via opaque ``cursor`` /
+  ``next_cursor`` values pinned to the table version (``offset`` paging is
+  kept for compatibility);
+* chunked NDJSON / CSV ``export_table`` streams pinned to ``as_of_version``;
+* ``get_table_changes`` delta sync from a bounded per-table change log;
+* ``view_id`` reads filtered / sorted through compiled, cached view plans
+  and lazily built select / date column indexes (:mod:`.views`), plus
+  optional ``aggregates`` over the view's rows;
+* ``link`` / ``lookup`` cells of a page resolved with one batched fetch per
+  target table, cached per target table version (:mod:`.links`);
+* whole-column filters, aggregates and formula recomputes vectorized on
+  NumPy column arrays when NumPy is installed (:mod:`.vector`);
+* formula columns recomputed incrementally at commit time along their
+  dependency graph, cycles rejected up front (:mod:`.formulas`).
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import functools
+import threading
+from collections import defaultdict
+from collections.abc import Callable, Mapping
+from datetime import UTC, datetime
+from enum import Enum
+from typing import Any
+from uuid import UUID, uuid4, uuid5
+
+from spreadsheet_engine import changes as change_kinds
+from spreadsheet_engine.batch import BULK_EXECUTORS, BatchPlan, plan_batch
+from spreadsheet_engine.blobs import BlobStore
+from spreadsheet_engine.changes import ChangeLog
+from spreadsheet_engine.cursor import PageCursor, decode_cursor, encode_cursor
+from spreadsheet_engine.errors import (
+    EntityNotFoundError,
+    InvalidCursorError,
+    InvalidPageError,
+    SpreadsheetEngineError,
+    UnsupportedOperationError,
+    VersionConflictError,
+)
+from spreadsheet_engine.export import DEFAULT_CHUNK_ROWS, MEDIA_TYPES, export_chunks
+from spreadsheet_engine.follow import FollowIndex
+from spreadsheet_engine.formulas import FormulaCache, check_formulas
+from spreadsheet_engine.idempotency import IdempotencyStore
+from spreadsheet_engine.links import LINK_TYPES, LinkResolver
+from spreadsheet_engine.model import Asset, Column, Table, View, column_changes
+from spreadsheet_engine.propagation import PropagationQueue
+from spreadsheet_engine.schema import SchemaCache
+from spreadsheet_engine.uploads import AssetUploads
+from spreadsheet_engine.views import ViewPlanner, check_view_spec
+
+NIL_OPERATOR = UUID(int=0)
+
+_ROW_CHANGES = frozenset(
+    {change_kinds.ROW_INSERTED, change_kinds.ROW_UPDATED, change_kinds.CELL_CHANGED}
+)
+
+# Requests that leave queued follow-mode propagations queued: further edits
+# (so bursts coalesce) and progress queries.  Everything else drains first.
+_KEEPS_PROPAGATION_QUEUED = frozenset({"update_asset_content", "get_propagation_job"})
+
+DEFAULT_STATUS_OPTIONS = ["待确认", "内部已确认", "待外部确认"]
+DEFAULT_LEVEL_NAMES = ["L1", "L2", "L3"]
+
+# key -> (name, description, [(column_key, title, data_type), ...])
+TEMPLATES: dict[str, tuple[str, str, list[tuple[str, str, str]]]] = {
+    "project_tracking_view": (
+        "项目跟踪视图",
+        "Track customer requirements with their design and test assets.",
+        [
+            ("customer_requirement", "客户需求", "text"),
+            ("status", "状态", "select"),
+            ("design_assets", "设计资产", "asset"),
+            ("test_assets", "测试资产", "asset"),
+            ("planned_start", "预计开始", "date"),
+            ("planned_end", "预计结束", "date"),
+        ],
+    ),
+    "product_requirement_list": (
+        "产品需求列表",
+        "Product requirements organized by module and hierarchy levels.",
+        [
+            ("module", "产品模块", "text"),
+            ("sub_module", "子模块", "text"),
+        ],
+    ),
+}
+
+
+_SCALARS = frozenset({str, int, float, bool, type(None), UUID})
+
+
+def plain(value: Any) -> Any:
+    """Recursively turn Pydantic models, dataclasses and enums into builtins."""
+    kind = type(value)
+    if kind in _SCALARS:
+        return value
+    if kind is dict:
+        return {key: plain(item) for key, item in value.items()}
+    if kind is list:
+        return [plain(item) for item in value]
+    if hasattr(value, "model_dump"):
+        return plain(value.model_dump())
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return plain(dataclasses.asdict(value))
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Mapping):
+        return {key: plain(item) for key, item in value.items()}
+    if isinstance(value, list | tuple):
+        return [plain(item) for item in value]
+    return value
+
+
+def as_uuid(value: Any) -> UUID:
+    if isinstance(value, UUID):
+        return value
+    try:
+        return UUID(str(value))
+    except ValueError:
+        raise SpreadsheetEngineError(f"Invalid identifier: {value!r}") from None
+
+
+def _page_bounds(payload: dict[str, Any], default_limit: int) -> tuple[int, int]:
+    """``(limit, offset)`` of a paged read; ``limit >= 1``, ``offset >= 0``."""
+    limit, offset = payload.get("limit"), payload.get("offset")
+    limit = default_limit if limit is None else limit
+    offset = 0 if offset is None else offset
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+        raise InvalidPageError("limit", limit)
+    if not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+        raise InvalidPageError("offset", offset)
+    return limit, offset
+
+
+class SpreadsheetEngine:
+    """In-memory tables, views and assets behind the spreadsheet interactors."""
+
+    def __init__(
+        self,
+        plan_batches: bool = False,
+        idempotency: IdempotencyStore | None = None,
+        blobs: BlobStore | None = None,
+    ) -> None:
+        self.plan_batches = plan_batches
+        self.tables: dict[UUID, Table] = {}
+        self.views: dict[UUID, View] = {}
+        self.assets: dict[UUID, Asset] = {}
+        self.activity: dict[UUID, list[dict[str, Any]]] = defaultdict(list)
+        self.change_logs: dict[UUID, ChangeLog] = {}
+        self.view_planner = ViewPlanner()
+        self.schemas = SchemaCache()
+        self.formulas = FormulaCache()
+        self.links = LinkResolver()
+        self.lock = threading.RLock()
+        self.follow = FollowIndex(self.assets)
+        self.blobs = blobs if blobs is not None else BlobStore.from_env()
+        self.propagation = PropagationQueue(self.follow, self.blobs, self.lock)
+        self.uploads = AssetUploads()
+        self.idempotency = (
+            idempotency if idempotency is not None else IdempotencyStore.from_env()
+        )
+        self._handlers: dict[str, Callable[[dict[str, Any]], Any]] = {
+            # Commands
+            "create_table_from_template": self._create_table_from_template,
+            "create_plain_table": self._create_plain_table,
+            "add_column": self._single_write("add_column"),
+            "update_column": self._single_write("update_column"),
+            "delete_column": self._single_write("delete_column"),
+            "reorder_columns": self._reorder_columns,
+            "add_row": self._single_write("add_row"),
+            "update_row": self._single_write("update_row"),
+            "delete_row": self._single_write("delete_row"),
+            "batch_upsert_rows": self._batch_upsert_rows,
+            "batch_upsert_cells": self._batch_upsert_cells,
+            "batch_table_operations": self._batch_table_operations,
+            "create_view": self._create_view,
+            "update_view": self._update_view,
+            "delete_view": self._delete_view,
+            "upload_asset": self._upload_asset,
+            "start_asset_upload": self._start_asset_upload,
+            "upload_asset_chunk": self._upload_asset_chunk,
+            "complete_asset_upload": self._complete_asset_upload,
+            "bind_asset_to_cells": self._bind_asset_to_cells,
+            "update_asset_content": self._update_asset_content,
+            "copy_asset": self._copy_asset,
+            "update_asset_follow_mode": self._update_asset_follow_mode,
+            "sync_asset_from_parent": self._sync_asset_from_parent,
+            # Queries
+            "list_table_templates": self._list_table_templates,
+            "list_project_tables": self._list_project_tables,
+            "get_table_view": self._get_table_view,
+            "get_table_changes": self._get_table_changes,
+            "export_table": self._export_table,
+            "list_table_views": self._list_table_views,
+            "get_table_stats": self._get_table_stats,
+            "list_activity_logs": self._list_activity_logs,
+            "get_propagation_job": self._get_propagation_job,
+            "get_asset": self._get_asset,
+        }
+
+    # ------------------------------------------------------------------
+    # Entry point
+    # ------------------------------------------------------------------
+    def execute(self, request: Any) -> Any:
+        """Apply one dispatched command / query request."""
+        operation = plain(request.operation)
+        handler = self._handlers.get(operation)
+        if handler is None:
+            raise UnsupportedOperationError(operation)
+        payload = plain(getattr(request, "payload", None) or {})
+        # -- Drain before taking the lock: the queue holds it one chunk at a
+        # -- time, so other requests interleave with a large propagation.
+        if operation not in _KEEPS_PROPAGATION_QUEUED:
+            self.propagation.drain()
+        with self.lock:
+            return handler(payload)
+
+    def close(self) -> None:
+        """Release what the engine keeps outside process memory."""
+        with self.lock:
+            self.uploads.close()
+            self.blobs.close()
+
+    def is_empty(self) -> bool:
+        return not (
+            self.tables
+            or self.views
+            or self.assets
+            or self.propagation.jobs
+            or self.uploads.sessions
+        )
+
+    def fast_forward(self, table_id: Any, version: int) -> None:
+        """Move a table to *version* without writes (scenario seeding).
+
+        The change log restarts at *version*: delta sync from any older
+        version answers "reload the full table", as after compaction.
+        """
+        with self.lock:
+            table = self._table(table_id)
+            table.version = version
+            self.change_logs[table.id] = ChangeLog(floor=version)
+
+    # ------------------------------------------------------------------
+    # Lookups / bookkeeping
+    # ------------------------------------------------------------------
+    def _table(self, table_id: Any) -> Table:
+        table = self.tables.get(as_uuid(table_id))
+        if table is None:
+            raise EntityNotFoundError("Table", table_id)
+        return table
+
+    def _view(self, view_id: Any) -> View:
+        view = self.views.get(as_uuid(view_id))
+        if view is None:
+            raise EntityNotFoundError("View", view_id)
+        return view
+
+    def _asset(self, asset_id: Any) -> Asset:
+        asset = self.assets.get(as_uuid(asset_id))
+        if asset is None:
+            raise EntityNotFoundError("Asset", asset_id)
+        return asset
+
+    @staticmethod
+    def _check_cursor_view(cursor: PageCursor, raw: str, view: View | None) -> None:
+        """*view* orders the page (``None``: table order); the cursor must match it."""
+        if cursor.view_id != (str(view.id) if view is not None else None):
+            raise InvalidCursorError(raw)
+        if view is not None and cursor.view_version != view.version:
+            raise VersionConflictError(cursor.view_version, view.version)
+
+    @staticmethod
+    def _check_version(table: Table, expected: int | None) -> None:
+        if expected is not None and expected != table.version:
+            raise VersionConflictError(expected, table.version)
+
+    def _commit(
+        self,
+        table: Table,
+        action: str,
+        payload: dict[str, Any],
+        changes: list[tuple] = (),
+    ) -> None:
+        """Bump the table version, log its changes and an activity entry.
+
+        Formula cells downstream of *changes* are recomputed first and logged
+        with them.  Rows and column definitions named in *changes* are
+        stamped with the new version (their row- / column-level version).
+        """
+        changes = [*changes, *self.formulas.recompute(table, changes)]
+        table.version += 1
+        for change in changes:
+            if change[0] in _ROW_CHANGES:
+                table.stamp_row(change[1], table.version)
+            elif change[0] == change_kinds.COLUMN_CHANGED and change[1] in table.columns:
+                table.columns[change[1]].version = table.version
+        self.change_logs[table.id].record(table.version, changes)
+        self.activity[table.id].append(
+            {
+                "at": datetime.now(UTC).isoformat(),
+                "operator_id": as_uuid(payload.get("operator_id", NIL_OPERATOR)),
+                "action": action,
+                "payload": {"version": table.version},
+            }
+        )
+
+    @staticmethod
+    def _accepted(table: Table, **data: Any) -> dict[str, Any]:
+        return {"message": "accepted", "table_id": table.id, "version": table.version, **data}
+
+    # ------------------------------------------------------------------
+    # Tables
+    # ------------------------------------------------------------------
+    def _new_table(
+        self,
+        payload: dict[str, Any],
+        template_key: str | None,
+        columns: list[tuple[str, str, str]],
+    ) -> Table:
+        project_id = as_uuid(payload["project_id"])
+        table_id = (
+            as_uuid(payload["table_id"])
+            if payload.get("table_id")
+            else uuid5(project_id, f"table:{payload['table_name']}")
+        )
+        if table_id in self.tables:
+            raise SpreadsheetEngineError(f"Table already exists: {table_id}")
+        table = Table(
+            id=table_id,
+            project_id=project_id,
+            template_key=template_key,
+            table_name=payload["table_name"],
+        )
+        for order, (key, title, data_type) in enumerate(columns, start=1):
+            table.add_column(
+                Column(
+                    id=uuid5(table_id, f"column:{key}"),
+                    key=key,
+                    title=title,
+                    data_type=data_type,
+                    order=order,
+                    is_fixed=template_key is not None,
+                    options=(
+                        [{"key": s, "label": s} for s in DEFAULT_STATUS_OPTIONS]
+                        if data_type == "select"
+                        else []
+                    ),
+                )
+            )
+        self.tables[table_id] = table
+        self.change_logs[table_id] = ChangeLog(floor=table.version)
+        return table
+
+    def _create_table_from_template(self, payload: dict[str, Any]) -> dict[str, Any]:
+        template_key = payload["template_key"]
+        if template_key not in TEMPLATES:
+            raise EntityNotFoundError("Template", template_key)
+        columns = list(TEMPLATES[template_key][2])
+        if template_key == "product_requirement_list":
+            levels = payload.get("level_names") or DEFAULT_LEVEL_NAMES
+            columns += [(f"level_{i}", name, "text") for i, name in enumerate(levels, 1)]
+        table = self._new_table(payload, template_key, columns)
+        return self._accepted(table)
+
+    def _create_plain_table(self, payload: dict[str, Any]) -> dict[str, Any]:
+        columns = [(name, name, "text") for name in payload.get("columns", [])]
+        table = self._new_table(payload, None, columns)
+        return {"message": "created", "table_id": table.id, "table_name": table.table_name}
+
+    def _list_table_templates(self, payload: dict[str, Any]) -> list[dict[str, Any]]:
+        return [
+            {
+                "key": key,
+                "name": name,
+                "description": description,
+                "fixed_columns": [title for _, title, _ in columns]
+                + (DEFAULT_LEVEL_NAMES if key == "product_requirement_list" else []),
+            }
+            for key, (name, description, columns) in TEMPLATES.items()
+        ]
+
+    def _list_project_tables(self, payload: dict[str, Any]) -> list[dict[str, Any]]:
+        project_id = as_uuid(payload["project_id"])
+        tables = sorted(
+            (t for t in self.tables.values() if t.project_id == project_id),
+            key=lambda t: (t.table_name, str(t.id)),
+        )
+        limit, offset = _page_bounds(payload, 50)
+        return [t.summary() for t in tables[offset : offset + limit]]
+
+    def _get_table_view(self, payload: dict[str, Any]) -> dict[str, Any]:
+        table = self._table(payload["table_id"])
+        view = self._view(payload["view_id"]) if payload.get("view_id") else None
+        hidden = set(view.hidden_column_keys) if view is not None else set()
+
+        columns = []
+        for column in table.ordered_columns():
+            summary = column.summary()
+            summary["hidden"] = column.hidden or column.key in hidden
+            columns.append(summary)
+
+        limit, offset = _page_bounds(payload, 200)
+        cursor = decode_cursor(payload["cursor"]) if payload.get("cursor") else None
+        if cursor is not None:
+            self._check_version(table, cursor.version)
+        ordered = None
+        paged_view = view if view is not None and (view.filters or view.sorts) else None
+        if cursor is not None:
+            self._check_cursor_view(cursor, payload["cursor"], paged_view)
+        if paged_view is not None:
+            ordered = self.view_planner.rows(view, table)
+            start = offset
+            if cursor is not None:
+                # -- Pinned table and view versions => the cached order is unchanged.
+                slot = table.slot_of(as_uuid(cursor.row_id))
+                position = self.view_planner.position(view, table, slot)
+                if position is None:
+                    raise InvalidCursorError(payload["cursor"])
+                start = position + 1
+            slots = ordered[start : start + limit + 1]
+        elif cursor is not None:
+            slots = table.slots_after(cursor.order, cursor.row_id, limit + 1)
+        else:
+            slots = table.live_slots()[offset : offset + limit + 1]
+
+        next_cursor = None
+        if len(slots) > limit:
+            slots = slots[:limit]
+            last = slots[-1]
+            next_cursor = encode_cursor(
+                table.version,
+                table.row_orders[last],
+                table.row_ids[last],
+                *((paged_view.id, paged_view.version) if paged_view is not None else ()),
+            )
+        rows = [table.row_view(slot) for slot in slots]
+        if any(column.data_type in LINK_TYPES for column in table.columns.values()):
+            self.links.resolve(table, rows, self.tables)
+        response = {
+            "table": table.summary(),
+            "columns": columns,
+            "rows": rows,
+            "next_cursor": next_cursor,
+        }
+        if payload.get("aggregates"):
+            # -- Over every row of the view, not just this page.
+            response["aggregates"] = self.view_planner.aggregate(
+                table,
+                ordered if ordered is not None else table.live_slots(),
+                payload["aggregates"],
+            )
+        return response
+
+    def _get_table_changes(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Rows, cells and columns changed after ``since_version``.
+
+        Raises :class:`ChangeLogCompactedError` when the log no longer
+        reaches back that far; the client must reload the full view.
+        """
+        table = self._table(payload["table_id"])
+        since = payload["since_version"]
+        delta = self.change_logs[table.id].since(since)
+
+        column_keys = (
+            set(table.columns) if delta.columns_reordered else delta.columns
+        )
+        live_inserted = [
+            row_id for row_id in delta.inserted_rows if row_id in table.row_slots
+        ]
+        cells = [
+            {
+                "row_id": row_id,
+                "column_key": key,
+                "value": table.columns[key].values[table.row_slots[row_id]],
+            }
+            for row_id, key in delta.cells
+            if row_id in table.row_slots
+            and key in table.columns
+            and row_id not in delta.inserted_rows
+        ]
+        updated_rows = []
+        for row_id in delta.updated_rows - delta.inserted_rows:
+            slot = table.row_slots.get(row_id)
+            if slot is not None:
+                updated_rows.append(
+                    {
+                        "id": row_id,
+                        "parent_row_id": table.parent_row_ids[slot],
+                        "order": table.row_orders[slot],
+                    }
+                )
+        return {
+            "table_id": table.id,
+            "since_version": since,
+            "version": table.version,
+            "columns": [
+                column.summary()
+                for column in table.ordered_columns()
+                if column.key in column_keys
+            ],
+            "deleted_column_keys": sorted(delta.deleted_columns),
+            "inserted_rows": [
+                table.row_view(table.row_slots[row_id])
+                for row_id in sorted(
+                    live_inserted, key=lambda r: table.row_orders[table.row_slots[r]]
+                )
+            ],
+            "updated_rows": updated_rows,
+            "deleted_row_ids": sorted(delta.deleted_rows, key=str),
+            "cells": cells,
+        }
+
+    def _export_table(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Lazily serialized export; ``chunks`` feeds a streaming response."""
+        table = self._table(payload["table_id"])
+        fmt = payload.get("format", "ndjson")
+        chunks = export_chunks(
+            lambda: self._table(table.id),
+            self.lock,
+            fmt,
+            payload.get("chunk_rows", DEFAULT_CHUNK_ROWS),
+        )
+        return {
+            "table_id": table.id,
+            "as_of_version": table.version,
+            "media_type": MEDIA_TYPES[fmt],
+            "chunks": chunks,
+        }
+
+    # ------------------------------------------------------------------
+    # Structure / row / cell writes
+    # ------------------------------------------------------------------
+    def _apply_operation(
+        self,
+        table: Table,
+        operation_type: str,
+        payload: dict[str, Any],
+        bindings: list[tuple[Asset, UUID, str]],
+        changes: list[tuple],
+    ) -> dict[str, Any]:
+        """Apply one write to *table*; validation happens before mutation.
+
+        Touched rows / cells / columns are appended to *changes* only after
+        the mutation succeeded.
+        """
+        if operation_type == "add_column":
+            key = payload["key"]
+            if key in table.columns:
+                raise SpreadsheetEngineError(f"Column already exists: {key!r}")
+            column = Column.from_payload(table.id, payload, len(table.columns) + 1)
+            if column.formula:
+                check_formulas({**table.columns, key: column})
+            table.add_column(column)
+            changes.append((change_kinds.COLUMN_CHANGED, key))
+            return {"column_key": key}
+
+        if operation_type == "update_column":
+            column = table.column(payload.get("column_key") or payload["key"])
+            column.check_version(payload.get("expected_column_version"))
+            updates = column_changes(payload)
+            if updates.get("formula"):
+                updated = column.copy(with_values=False)
+                updated.formula = updates["formula"]
+                check_formulas({**table.columns, column.key: updated})
+            table.update_column(column.key, updates)
+            changes.append((change_kinds.COLUMN_CHANGED, column.key))
+            return {"column_key": column.key}
+
+        if operation_type == "delete_column":
+            column = table.column(payload.get("column_key") or payload["key"])
+            column.check_version(payload.get("expected_column_version"))
+            table.remove_column(column.key)
+            changes.append((change_kinds.COLUMN_DELETED, column.key))
+            return {"column_key": column.key}
+
+        if operation_type == "add_row":
+            cells = payload.get("cells") or {}
+            for key, value in cells.items():
+                table.column(key).validate(value)
+            row_id = as_uuid(payload["row_id"]) if payload.get("row_id") else uuid4()
+            if row_id in table.row_slots:
+                raise SpreadsheetEngineError(f"Row already exists: {row_id}")
+            parent = payload.get("parent_row_id")
+            table.add_row(row_id, as_uuid(parent) if parent else None, payload.get("order"))
+            for key, value in cells.items():
+                table.set_cell(row_id, key, value)
+            changes.append((change_kinds.ROW_INSERTED, row_id))
+            return {"row_id": row_id}
+
+        if operation_type == "update_row":
+            row_id = as_uuid(payload["row_id"])
+            slot = table.slot_of(row_id)
+            table.check_row_version(row_id, payload.get("expected_row_version"))
+            cells = payload.get("cells") or {}
+            for key, value in cells.items():
+                table.column(key).validate(value)
+            mask = payload.get("update_mask") or []
+            if "parent_row_id" in mask:
+                parent = payload.get("parent_row_id")
+                table.set_row_parent(slot, as_uuid(parent) if parent else None)
+            if "order" in mask and payload.get("order") is not None:
+                table.set_row_order(slot, payload["order"])
+            if "parent_row_id" in mask or "order" in mask:
+                changes.append((change_kinds.ROW_UPDATED, row_id))
+            for key, value in cells.items():
+                column = table.set_cell(row_id, key, value)
+                changes.append((change_kinds.CELL_CHANGED, row_id, column.key))
+            return {"row_id": row_id}
+
+        if operation_type == "delete_row":
+            row_id = as_uuid(payload["row_id"])
+            table.check_row_version(row_id, payload.get("expected_row_version"))
+            table.delete_row(row_id)
+            changes.append((change_kinds.ROW_DELETED, row_id))
+            return {"row_id": row_id}
+
+        if operation_type == "upsert_cell":
+            row_id = as_uuid(payload["row_id"])
+            table.check_row_version(row_id, payload.get("expected_row_version"))
+            column = table.set_cell(row_id, payload["column_key"], payload.get("value"))
+            changes.append((change_kinds.CELL_CHANGED, row_id, column.key))
+            return {"row_id": row_id, "column_key": column.key}
+
+        if operation_type == "bind_asset":
+            asset = self._asset(payload["asset_id"])
+            refs = payload.get("cell_refs") or [
+                f"{payload.get('row_id', '')}:{payload.get('column_key', '')}"
+            ]
+            bindings.extend((asset, table.id, ref) for ref in refs)
+            return {"asset_id": asset.id, "bound": len(refs)}
+
+        raise UnsupportedOperationError(operation_type)
+
+    def _single_write(self, operation_type: str) -> Callable[[dict[str, Any]], Any]:
+        def handler(payload: dict[str, Any]) -> dict[str, Any]:
+            table = self._table(payload["table_id"])
+            self._check_version(table, payload.get("expected_version"))
+            changes: list[tuple] = []
+            data = self._apply_operation(table, operation_type, payload, [], changes)
+            self._commit(table, operation_type, payload, changes)
+            return self._accepted(table, **data)
+
+        return handler
+
+    def _reorder_columns(self, payload: dict[str, Any]) -> dict[str, Any]:
+        table = self._table(payload["table_id"])
+        table.reorder_columns(payload["column_keys"])
+        self._commit(
+            table, "reorder_columns", payload, [(change_kinds.COLUMNS_REORDERED,)]
+        )
+        return self._accepted(table)
+
+    def _batch_upsert_rows(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """``update_row`` for rows that exist (or come earlier in the request),
+        ``add_row`` for the rest.
+        """
+        table = self._table(payload["table_id"])
+        seen: set[UUID] = set()
+        operations = []
+        for i, row in enumerate(payload.get("rows", [])):
+            operation_type = "add_row"
+            if row.get("row_id"):
+                row_id = as_uuid(row["row_id"])
+                if row_id in table.row_slots or row_id in seen:
+                    operation_type = "update_row"
+                    row = {
+                        "update_mask": [
+                            name for name in ("parent_row_id", "order") if name in row
+                        ],
+                        **row,
+                    }
+                seen.add(row_id)
+            operations.append(
+                {"operation_id": str(i), "operation_type": operation_type, "payload": row}
+            )
+        return self._run_batch(payload, operations, atomic=True, dry_run=False)
+
+    def _batch_upsert_cells(self, payload: dict[str, Any]) -> dict[str, Any]:
+        operations = [
+            {"operation_id": str(i), "operation_type": "upsert_cell", "payload": cell}
+            for i, cell in enumerate(payload.get("cells", []))
+        ]
+        return self._run_batch(payload, operations, atomic=True, dry_run=False)
+
+    def _batch_table_operations(self, payload: dict[str, Any]) -> dict[str, Any]:
+        table = self._table(payload["table_id"])
+        dry_run = payload.get("dry_run", False)
+
+        def run() -> dict[str, Any]:
+            return self._run_batch(
+                payload,
+                payload.get("operations", []),
+                atomic=payload.get("atomic", True),
+                dry_run=dry_run,
+            )
+
+        # -- Dry runs change nothing, so there is nothing to replay.
+        key = None if dry_run else payload.get("idempotency_key")
+        return self.idempotency.run(f"table:{table.id}", key, payload, run)
+
+    def _run_batch(
+        self,
+        payload: dict[str, Any],
+        operations: list[dict[str, Any]],
+        *,
+        atomic: bool,
+        dry_run: bool,
+    ) -> dict[str, Any]:
+        table = self._table(payload["table_id"])
+        self._check_version(table, payload.get("expected_version"))
+        plan = None
+        if self.plan_batches or dry_run:
+            schema = self.schemas.get(table)
+            plan = plan_batch(table, operations, as_uuid, schema, layered=not dry_run)
+            if dry_run:
+                return self._dry_run_result(table, plan, atomic)
+
+        bindings: list[tuple[Asset, UUID, str]] = []
+        changes: list[tuple] = []
+        if plan is not None and atomic and any(op.error for op in plan.operations):
+            # -- Rejected by validation: nothing to copy or apply.
+            target = table
+            results = [
+                _result(op.operation_id, op.error is None, op.error) for op in plan.operations
+            ]
+        else:
+            target = table.clone() if atomic or dry_run else table
+            if plan is not None:
+                results = self._apply_planned(target, plan, bindings, changes)
+            else:
+                results = self._apply_sequential(
+                    target, operations, atomic, bindings, changes
+                )
+
+        if atomic:
+            _abort_after_first_failure(results)
+        applied = not dry_run and any(result["success"] for result in results)
+        if applied:
+            self.tables[table.id] = target
+            for asset, table_id, ref in bindings:
+                self.follow.bind(asset, table_id, ref)
+            self._commit(target, "batch", payload, changes)
+        return {
+            "table_id": table.id,
+            "applied_version": target.version if applied else table.version,
+            "results": results,
+        }
+
+    def _apply_planned(
+        self,
+        target: Table,
+        plan: BatchPlan,
+        bindings: list[tuple[Asset, UUID, str]],
+        changes: list[tuple],
+    ) -> list[dict[str, Any]]:
+        """Apply a validated plan group by group (:mod:`.batch`)."""
+        outcomes: dict[int, tuple[bool, str | None, dict[str, Any]]] = {
+            op.index: (False, op.error, {}) for op in plan.operations if op.error
+        }
+        for operation_type, ops in plan.groups:
+            bulk = BULK_EXECUTORS.get(operation_type)
+            if bulk is not None:
+                bulk(target, ops, outcomes, changes)
+                continue
+            for op in ops:
+                try:
+                    data = self._apply_operation(
+                        target, operation_type, op.payload, bindings, changes
+                    )
+                except (SpreadsheetEngineError, KeyError) as exc:
+                    outcomes[op.index] = (False, str(exc), {})
+                else:
+                    outcomes[op.index] = (True, None, data)
+        return [_result(op.operation_id, *outcomes[op.index]) for op in plan.operations]
+
+    def _dry_run_result(self, table: Table, plan: BatchPlan, atomic: bool) -> dict[str, Any]:
+        """Verdicts from the validation pass alone: no snapshot copy, no writes."""
+        results = []
+        for op in plan.operations:
+            error = op.error
+            if error is None and op.operation_type == "bind_asset":
+                try:
+                    self._asset(op.payload["asset_id"])
+                except SpreadsheetEngineError as exc:
+                    error = str(exc)
+            data = {
+                name: op.payload[name]
+                for name in ("row_id", "column_key", "asset_id")
+                if op.payload.get(name) is not None
+            }
+            results.append(_result(op.operation_id, error is None, error, data))
+        if atomic:
+            _abort_after_first_failure(results)
+        return {
+            "table_id": table.id,
+            "applied_version": table.version,
+            "validated_version": table.version,
+            "schema_version": plan.schema_version,
+            "results": results,
+        }
+
+    def _apply_sequential(
+        self,
+        target: Table,
+        operations: list[dict[str, Any]],
+        atomic: bool,
+        bindings: list[tuple[Asset, UUID, str]],
+        changes: list[tuple],
+    ) -> list[dict[str, Any]]:
+        """One ``_apply_operation`` per operation, in request order."""
+        results: list[dict[str, Any]] = []
+        failed = False
+        for operation in operations:
+            operation_id = operation.get("operation_id", "")
+            if failed and atomic:
+                results.append(_result(operation_id, False, "not applied: batch aborted"))
+                continue
+            try:
+                data = self._apply_operation(
+                    target,
+                    operation["operation_type"],
+                    operation.get("payload") or {},
+                    bindings,
+                    changes,
+                )
+            except (SpreadsheetEngineError, KeyError) as exc:
+                failed = True
+                results.append(_result(operation_id, False, str(exc)))
+            else:
+                results.append(_result(operation_id, True, None, data))
+        return results
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+    def _create_view(self, payload: dict[str, Any]) -> dict[str, Any]:
+        table = self._table(payload["table_id"])
+        view_id = (
+            as_uuid(payload["view_id"])
+            if payload.get("view_id")
+            else uuid5(table.id, f"view:{payload['name']}")
+        )
+        view = View(
+            id=view_id,
+            table_id=table.id,
+            name=payload["name"],
+            type=payload.get("type", "grid"),
+            frozen_columns=payload.get("frozen_columns", 0),
+            hidden_column_keys=list(payload.get("hidden_column_keys") or []),
+            filters=dict(payload.get("filters") or {}),
+            sorts=list(payload.get("sorts") or []),
+        )
+        check_view_spec(view.filters, view.sorts)
+        self.views[view_id] = view
+        return {"message": "accepted", "view_id": view_id}
+
+    def _update_view(self, payload: dict[str, Any]) -> dict[str, Any]:
+        view = self._view(payload["view_id"])
+        mask = payload.get("update_mask") or [
+            name
+            for name in ("name", "frozen_columns", "hidden_column_keys", "filters", "sorts")
+            if payload.get(name) is not None
+        ]
+        changes = {name: payload.get(name) for name in mask}
+        check_view_spec(
+            changes.get("filters", view.filters) or {},
+            changes.get("sorts", view.sorts) or [],
+        )
+        for name, value in changes.items():
+            setattr(view, name, value)
+        view.version += 1
+        return {"message": "accepted", "view_id": view.id}
+
+    def _delete_view(self, payload: dict[str, Any]) -> dict[str, Any]:
+        view = self._view(payload["view_id"])
+        del self.views[view.id]
+        self.view_planner.forget(view.id)
+        return {"message": "accepted", "view_id": view.id}
+
+    def _list_table_views(self, payload: dict[str, Any]) -> list[dict[str, Any]]:
+        table_id = as_uuid(payload["table_id"])
+        return [view.summary() for view in self.views.values() if view.table_id == table_id]
+
+    # ------------------------------------------------------------------
+    # Assets
+    # ------------------------------------------------------------------
+    def _upload_asset(self, payload: dict[str, Any]) -> dict[str, Any]:
+        project_id = as_uuid(payload["project_id"])
+
+        def upload() -> dict[str, Any]:
+            asset = self._store_asset(
+                project_id,
+                payload["asset_type"],
+                payload["title"],
+                list(payload.get("tags") or []),
+                self.blobs.put(payload.get("content") or ""),
+                as_uuid(payload["asset_id"]) if payload.get("asset_id") else None,
+            )
+            return {"message": "accepted", "asset_id": asset.id}
+
+        return self.idempotency.run(
+            f"project:{project_id}", payload.get("idempotency_key"), payload, upload
+        )
+
+    def _store_asset(
+        self,
+        project_id: UUID,
+        asset_type: str,
+        title: str,
+        tags: list[str],
+        digest: str,
+        asset_id: UUID | None = None,
+    ) -> Asset:
+        if asset_id in self.assets:
+            self.blobs.release(digest)
+            raise SpreadsheetEngineError(f"Asset already exists: {asset_id}")
+        asset = Asset(
+            id=asset_id or uuid4(),
+            project_id=project_id,
+            asset_type=asset_type,
+            title=title,
+            content_digest=digest,
+            tags=tags,
+        )
+        self.assets[asset.id] = asset
+        self.follow.add(asset)
+        return asset
+
+    def _start_asset_upload(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Open (or resume, by ``idempotency_key``) a chunked upload."""
+        session = self.uploads.start(
+            as_uuid(payload["project_id"]),
+            payload.get("idempotency_key"),
+            payload["asset_type"],
+            payload["title"],
+            list(payload.get("tags") or []),
+            payload.get("size"),
+        )
+        return session.summary()
+
+    def _upload_asset_chunk(self, payload: dict[str, Any]) -> dict[str, Any]:
+        data = payload["data"]
+        session = self.uploads.write(
+            as_uuid(payload["upload_id"]),
+            int(payload["offset"]),
+            data.encode() if isinstance(data, str) else bytes(data),
+        )
+        return session.summary()
+
+    def _complete_asset_upload(self, payload: dict[str, Any]) -> dict[str, Any]:
+        session = self.uploads.finish(as_uuid(payload["upload_id"]))
+        if session.asset_id is None:
+            digest = self.blobs.put_file(session.path, session.digest)
+            session.asset_id = self._store_asset(
+                session.project_id, session.asset_type, session.title, session.tags, digest
+            ).id
+        return {"message": "accepted", **session.summary()}
+
+    def _bind_asset_to_cells(self, payload: dict[str, Any]) -> dict[str, Any]:
+        asset = self._asset(payload["asset_id"])
+        table = self._table(payload["table_id"])
+        for ref in payload.get("cell_refs") or [""]:
+            self.follow.bind(asset, table.id, ref)
+        return {"message": "accepted", "asset_id": asset.id}
+
+    def _update_asset_content(self, payload: dict[str, Any]) -> dict[str, Any]:
+        """Edit an asset; its follow copies are refreshed by a queued job."""
+        asset = self._asset(payload["asset_id"])
+        if payload.get("title") is not None:
+            asset.title = payload["title"]
+        if payload.get("tags") is not None:
+            asset.tags = list(payload["tags"])
+        job = None
+        if payload.get("content") is not None:
+            digest = self.blobs.put(payload["content"])
+            self.blobs.release(asset.content_digest)
+            if digest != asset.content_digest:
+                asset.content_digest = digest
+                asset.content_version += 1
+                job = self.propagation.enqueue(asset)
+        return {
+            "message": "accepted",
+            "asset_id": asset.id,
+            "content_version": asset.content_version,
+            "job_id": job.id if job is not None else None,
+        }
+
+    def _get_propagation_job(self, payload: dict[str, Any]) -> dict[str, Any]:
+        job = self.propagation.jobs.get(as_uuid(payload["job_id"]))
+        if job is None:
+            raise EntityNotFoundError("Propagation job", payload["job_id"])
+        return job.summary()
+
+    def _get_asset(self, payload: dict[str, Any]) -> dict[str, Any]:
+        asset = self._asset(payload["asset_id"])
+        return {
+            "asset_id": asset.id,
+            "project_id": asset.project_id,
+            "asset_type": asset.asset_type,
+            "title": asset.title,
+            "tags": list(asset.tags),
+            "content": self.blobs.get(asset.content_digest),
+            "content_digest": asset.content_digest,
+            "content_version": asset.content_version,
+            "follow_parent_id": asset.follow_parent_id,
+            "follow_mode": asset.follow_mode,
+            "synced_version": asset.synced_version,
+        }
+
+    def _copy_asset(self, payload: dict[str, Any]) -> dict[str, Any]:
+        parent = self._asset(payload["asset_id"])
+        table = (
+            self._table(payload["target_table_id"])
+            if payload.get("target_table_id")
+            else None
+        )
+        copy_id = as_uuid(payload["copy_asset_id"]) if payload.get("copy_asset_id") else uuid4()
+        if copy_id in self.assets:
+            raise SpreadsheetEngineError(f"Asset already exists: {copy_id}")
+        follow_mode = payload.get("follow_mode", "follow")
+        copy = Asset(
+            id=copy_id,
+            project_id=table.project_id if table is not None else parent.project_id,
+            asset_type=parent.asset_type,
+            title=parent.title,
+            content_digest=self.blobs.retain(parent.content_digest),
+            tags=list(parent.tags),
+            follow_parent_id=parent.id,
+            follow_mode=follow_mode,
+            synced_version=parent.content_version,
+        )
+        if table is not None:
+            row = payload.get("target_row_id")
+            copy.bindings.add((table.id, f"{row}:" if row else ""))
+        self.assets[copy.id] = copy
+        self.follow.add(copy)
+        return {"message": "accepted", "asset_id": copy.id}
+
+    def _update_asset_follow_mode(self, payload: dict[str, Any]) -> dict[str, Any]:
+        asset = self._asset(payload["asset_id"])
+        if asset.follow_parent_id is None:
+            raise SpreadsheetEngineError(f"Asset {asset.id} is not a copy")
+        self.follow.set_follow_mode(asset, payload["follow_mode"])
+        return {"message": "accepted", "asset_id": asset.id}
+
+    def _sync_asset_from_parent(self, payload: dict[str, Any]) -> dict[str, Any]:
+        asset = self._asset(payload["asset_id"])
+        if asset.follow_parent_id is None or asset.follow_mode != "follow":
+            raise SpreadsheetEngineError(f"Asset {asset.id} does not follow a parent")
+        parent = self._asset(asset.follow_parent_id)
+        asset.content_digest = self.blobs.relink(asset.content_digest, parent.content_digest)
+        asset.synced_version = parent.content_version
+        return {"message": "accepted", "asset_id": asset.id}
+
+    # ------------------------------------------------------------------
+    # Statistics / activity
+    # ------------------------------------------------------------------
+    def _get_table_stats(self, payload: dict[str, Any]) -> dict[str, Any]:
+        table = self._table(payload["table_id"])
+        linked = functools.partial(self.follow.linked_groups, table.id, table.project_id)
+        unlinked = functools.partial(self.follow.unlinked_groups, table.project_id)
+        return {
+            "table_id": table.id,
+            "row_count": table.row_count,
+            "design_asset_count": linked("design"),
+            "test_asset_count": linked("test"),
+            "unlinked_design_asset_count": unlinked("design"),
+            "unlinked_test_asset_count": unlinked("test"),
+            "as_of_version": table.version,
+        }
+
+    def _list_activity_logs(self, payload: dict[str, Any]) -> dict[str, Any]:
+        table = self._table(payload["table_id"])
+        offset = payload.get("offset", 0)
+        logs = self.activity[table.id][offset : offset + payload.get("limit", 100)]
+        return {"table_id": table.id, "logs": list(logs)}
+
+
+def _abort_after_first_failure(results: list[dict[str, Any]]) -> None:
+    """Atomic outcome: as if execution stopped at the first failure in order."""
+    failed_at = next((i for i, r in enumerate(results) if not r["success"]), None)
+    if failed_at is None:
+        return
+    for index, result in enumerate(results):
+        if index < failed_at:
+            result.update(success=False, message="rolled back")
+        elif index > failed_at:
+            result.update(success=False, message="not applied: batch aborted", data={})
+
+
+def _result(
+    operation_id: str,
+    success: bool,
+    message: str | None,
+    data: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    return {
+        "operation_id": operation_id,
+        "success": success,
+        "message": message,
+        "data": data or {},
+    }
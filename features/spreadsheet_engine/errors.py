@@ -0,0 +1,104 @@
+"""Exceptions raised by the in-memory spreadsheet engine."""
+
+from __future__ import annotations
+
+
+class SpreadsheetEngineError(Exception):
+    """Base class for every engine error."""
+
+
+class UnsupportedOperationError(SpreadsheetEngineError):
+    def __init__(self, operation: str) -> None:
+        super().__init__(f"Unsupported spreadsheet operation: {operation!r}")
+        self.operation = operation
+
+
+class EntityNotFoundError(SpreadsheetEngineError):
+    def __init__(self, entity: str, key: object) -> None:
+        super().__init__(f"{entity} not found: {key}")
+        self.entity = entity
+        self.key = key
+
+
+class VersionConflictError(SpreadsheetEngineError):
+    def __init__(self, expected: int, actual: int) -> None:
+        super().__init__(f"Version conflict: expected {expected}, actual {actual}")
+        self.expected = expected
+        self.actual = actual
+
+
+class StaleEntityError(VersionConflictError):
+    """A row or column changed (or vanished) since the version a write expected."""
+
+    def __init__(self, entity: str, key: object, expected: int, actual: int | None) -> None:
+        SpreadsheetEngineError.__init__(
+            self,
+            f"{entity} {key} version conflict: expected {expected}, "
+            f"actual {'deleted' if actual is None else actual}",
+        )
+        self.entity = entity
+        self.key = key
+        self.expected = expected
+        self.actual = actual
+
+
+class CellValidationError(SpreadsheetEngineError):
+    def __init__(self, column_key: str, message: str) -> None:
+        super().__init__(f"Invalid value for column {column_key!r}: {message}")
+        self.column_key = column_key
+
+
+class FormulaError(SpreadsheetEngineError):
+    """A formula does not parse, or formula columns reference each other in a cycle."""
+
+    def __init__(self, formula: str, message: str) -> None:
+        super().__init__(f"Invalid formula {formula!r}: {message}")
+        self.formula = formula
+
+
+class InvalidCursorError(SpreadsheetEngineError):
+    def __init__(self, cursor: str) -> None:
+        super().__init__(f"Invalid page cursor: {cursor!r}")
+        self.cursor = cursor
+
+
+class InvalidPageError(SpreadsheetEngineError):
+    """``limit`` / ``offset`` outside ``limit >= 1`` and ``offset >= 0``."""
+
+    def __init__(self, name: str, value: object) -> None:
+        super().__init__(f"Invalid page {name}: {value!r}")
+        self.name = name
+        self.value = value
+
+
+class ChangeLogCompactedError(SpreadsheetEngineError):
+    """The requested version is older than the retained change log."""
+
+    def __init__(self, since_version: int, floor: int) -> None:
+        super().__init__(
+            f"Changes since version {since_version} are no longer available "
+            f"(oldest is {floor}); reload the full table"
+        )
+        self.since_version = since_version
+        self.floor = floor
+
+
+class IdempotencyKeyReusedError(SpreadsheetEngineError):
+    """An ``idempotency_key`` was sent again with a different request body."""
+
+    def __init__(self, key: str) -> None:
+        super().__init__(f"Idempotency key {key!r} was already used for another request")
+        self.key = key
+
+
+class AssetUploadError(SpreadsheetEngineError):
+    """A chunked asset upload was rejected (gap, size limit, not UTF-8 text)."""
+
+    def __init__(self, upload_id: object, message: str) -> None:
+        super().__init__(f"Asset upload {upload_id} rejected: {message}")
+        self.upload_id = upload_id
+
+
+class InvalidViewSpecError(SpreadsheetEngineError):
+    def __init__(self, message: str) -> None:
+        super().__init__(f"Invalid view filter/sort: {message}")
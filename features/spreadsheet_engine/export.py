@@ -0,0 +1,139 @@
+"""
+Chunked NDJSON / CSV export of a whole table.
+
+The export pages through the table by keyset — the ``(order, id)`` key of
+the last row written, as :mod:`.cursor` does for ``get_table_view`` — and
+serializes ``chunk_rows`` rows at a time, so memory stays bounded by one
+chunk regardless of table size (the in-memory counterpart of a server-side
+DB cursor).  The stream is consumed after the request returned, so every
+chunk is read under the engine lock and checked against the
+``as_of_version`` the export started from: a write in between aborts the
+stream with :class:`VersionConflictError` instead of mixing versions.  The
+first chunk carries the column header.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+from spreadsheet_engine.errors import SpreadsheetEngineError, VersionConflictError
+from spreadsheet_engine.model import Column, Table
+
+DEFAULT_CHUNK_ROWS = 500
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_line(record: dict[str, Any]) -> str:
+    return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+def _ndjson_header(table: Table, columns: list[Column], version: int) -> str:
+    return _json_line(
+        {
+            "type": "header",
+            "table": table.summary(),
+            "columns": [column.summary() for column in columns],
+            "as_of_version": version,
+        }
+    )
+
+
+def _ndjson_rows(table: Table, columns: list[Column], slots: list[int]) -> str:
+    return "".join(
+        _json_line(
+            {
+                "type": "row",
+                "id": table.row_ids[slot],
+                "parent_row_id": table.parent_row_ids[slot],
+                "order": table.row_orders[slot],
+                "cells": {column.key: column.values[slot] for column in columns},
+            }
+        )
+        for slot in slots
+    )
+
+
+def _csv_text(records: Iterable[list[Any]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(records)
+    return buffer.getvalue()
+
+
+def _csv_header(table: Table, columns: list[Column], version: int) -> str:
+    return _csv_text([["id", "parent_row_id", "order", *(c.key for c in columns)]])
+
+
+def _csv_rows(table: Table, columns: list[Column], slots: list[int]) -> str:
+    return _csv_text(
+        [
+            table.row_ids[slot],
+            table.parent_row_ids[slot] or "",
+            table.row_orders[slot],
+            *("" if c.values[slot] is None else c.values[slot] for c in columns),
+        ]
+        for slot in slots
+    )
+
+
+_WRITERS: dict[
+    str,
+    tuple[
+        Callable[[Table, list[Column], int], str],
+        Callable[[Table, list[Column], list[int]], str],
+    ],
+] = {
+    "ndjson": (_ndjson_header, _ndjson_rows),
+    "csv": (_csv_header, _csv_rows),
+}
+
+
+def export_chunks(
+    current_table: Callable[[], Table],
+    lock: threading.RLock,
+    fmt: str = "ndjson",
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+) -> Iterator[str]:
+    """Serialized chunks of the table as of its current version.
+
+    Call with *lock* held.  *current_table* resolves the live table (an
+    atomic batch replaces the object) whenever a chunk is read; once its
+    version differs from the starting one the stream stops with
+    :class:`VersionConflictError`.
+    """
+    if fmt not in _WRITERS:
+        raise SpreadsheetEngineError(f"Unsupported export format: {fmt!r}")
+    header, rows = _WRITERS[fmt]
+    version = current_table().version
+
+    def pinned() -> Table:
+        table = current_table()
+        if table.version != version:
+            raise VersionConflictError(version, table.version)
+        return table
+
+    def chunks() -> Iterator[str]:
+        with lock:
+            table = pinned()
+            chunk = header(table, table.ordered_columns(), version)
+            slots = table.first_slots(chunk_rows)
+        yield chunk
+        while slots:
+            with lock:
+                table = pinned()
+                chunk = rows(table, table.ordered_columns(), slots)
+                last = slots[-1]
+                slots = table.slots_after(
+                    table.row_orders[last], str(table.row_ids[last]), chunk_rows
+                )
+            yield chunk
+
+    return chunks()
@@ -0,0 +1,109 @@
+"""
+Maintained follow-group index behind the "parent + followers count once" stats.
+
+A follow group is an asset plus every copy that follows it, transitively; a
+detached copy starts a group of its own (with whatever still follows it).
+:class:`FollowIndex` keeps, updated incrementally:
+
+* ``root`` — asset id -> id of its group root (a closure table flattened to
+  the one ancestor the stats need);
+* ``children`` — follow parent id -> copy ids (any follow mode), so a
+  detach / re-follow relabels only the moved subtree;
+* per ``(table_id, project_id, asset_type)`` a counter of bound assets per
+  group, and per ``(project_id, asset_type)`` one of unbound assets.
+
+``get_table_stats`` then reads distinct group counts as ``len()`` of a
+counter instead of walking follow chains for every asset of the project.
+Every asset creation, binding and follow-mode change goes through
+:meth:`FollowIndex.add`, :meth:`FollowIndex.bind` and
+:meth:`FollowIndex.set_follow_mode`.
+"""
+
+from __future__ import annotations
+
+from collections import Counter, defaultdict, deque
+from uuid import UUID
+
+from spreadsheet_engine.model import Asset
+
+
+class FollowIndex:
+    def __init__(self, assets: dict[UUID, Asset]) -> None:
+        self.assets = assets
+        self.root: dict[UUID, UUID] = {}
+        self.children: defaultdict[UUID, set[UUID]] = defaultdict(set)
+        self.linked: defaultdict[tuple[UUID, UUID, str], Counter[UUID]] = defaultdict(Counter)
+        self.unlinked: defaultdict[tuple[UUID, str], Counter[UUID]] = defaultdict(Counter)
+
+    # -- Queries --
+
+    def linked_groups(self, table_id: UUID, project_id: UUID, asset_type: str) -> int:
+        """Follow groups of *project_id* with an asset bound to *table_id*."""
+        return len(self.linked.get((table_id, project_id, asset_type), ()))
+
+    def unlinked_groups(self, project_id: UUID, asset_type: str) -> int:
+        """Follow groups of *project_id* with an asset bound nowhere."""
+        return len(self.unlinked.get((project_id, asset_type), ()))
+
+    def followers(self, asset_id: UUID) -> list[tuple[Asset, Asset]]:
+        """``(follower, parent)`` pairs following *asset_id*, parents first."""
+        pairs = []
+        frontier = deque([asset_id])
+        while frontier:
+            parent_id = frontier.popleft()
+            for child_id in self.children.get(parent_id, ()):
+                child = self.assets[child_id]
+                if child.follow_mode == "follow":
+                    pairs.append((child, self.assets[parent_id]))
+                    frontier.append(child_id)
+        return pairs
+
+    # -- Updates --
+
+    def add(self, asset: Asset) -> None:
+        """Index a new asset (after it was stored in ``assets``)."""
+        if asset.follow_parent_id is not None:
+            self.children[asset.follow_parent_id].add(asset.id)
+        self.root[asset.id] = self._root_of(asset)
+        self._count(asset, 1)
+
+    def bind(self, asset: Asset, table_id: UUID, ref: str) -> None:
+        self._count(asset, -1)
+        asset.bindings.add((table_id, ref))
+        self._count(asset, 1)
+
+    def set_follow_mode(self, asset: Asset, follow_mode: str) -> None:
+        """Change *asset*'s mode; it and its followers move to the new group."""
+        moved = [asset] + [child for child, _ in self.followers(asset.id)]
+        for member in moved:
+            self._count(member, -1)
+        asset.follow_mode = follow_mode
+        root = self._root_of(asset)
+        for member in moved:
+            self.root[member.id] = root
+            self._count(member, 1)
+
+    # -- Internals --
+
+    def _root_of(self, asset: Asset) -> UUID:
+        parent = asset.follow_parent_id
+        if asset.follow_mode == "follow" and parent in self.root:
+            return self.root[parent]
+        return asset.id
+
+    def _count(self, asset: Asset, delta: int) -> None:
+        root = self.root[asset.id]
+        if asset.bindings:
+            keys = [
+                (self.linked, (table_id, asset.project_id, asset.asset_type))
+                for table_id in {table_id for table_id, _ in asset.bindings}
+            ]
+        else:
+            keys = [(self.unlinked, (asset.project_id, asset.asset_type))]
+        for counters, key in keys:
+            counter = counters[key]
+            counter[root] += delta
+            if counter[root] <= 0:
+                del counter[root]
+                if not counter:
+                    del counters[key]
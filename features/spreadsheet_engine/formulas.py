@@ -0,0 +1,456 @@
+"""
+Formula columns: parsing, dependency graph and incremental recompute.
+
+A column with a ``formula`` computes its value per row from other columns of
+the same row, referenced as ``{column_key}``::
+
+    =IF({status} = "内部已确认", DAYS({planned_end}, {planned_start}), 0)
+
+Operators: ``+ - * /``, ``&`` (concatenate), ``= <> < <= > >=``.  Functions:
+``ABS AND AVERAGE CONCAT DAYS IF LEN LOWER MAX MIN NOT OR ROUND SUM UPPER``.
+Evaluation errors become spreadsheet-style values (``#VALUE!``,
+``#DIV/0!``, ``#REF!`` for a deleted column) instead of failing the write.
+
+Each formula text is parsed once into a syntax tree and nested closures
+(:func:`compile_formula`).  :class:`FormulaGraph` holds the column dependency
+graph of one schema version in topological order; cycles and parse errors
+raise :class:`FormulaError` when the column is added / updated.  After a
+commit, :meth:`FormulaCache.recompute` re-evaluates only the formula cells
+downstream of the changed cells (whole columns when a column definition
+changed), stores the results in the formula column's values — the persisted
+``display_value`` — and returns them as extra changes.  Reads never evaluate
+formulas.  Whole-column recomputes run on NumPy arrays when possible
+(:func:`.vector.evaluate_formula`) and fall back to the closures cell by cell.
+"""
+
+from __future__ import annotations
+
+import functools
+import re
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+from uuid import UUID
+
+from spreadsheet_engine import changes as change_kinds
+from spreadsheet_engine import vector
+from spreadsheet_engine.errors import FormulaError
+from spreadsheet_engine.model import Column, Table, display_value
+
+Getter = Callable[[str], Any]
+Compiled = Callable[[Getter], Any]
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<number>\d+(?:\.\d*)?|\.\d+)
+      | "(?P<string>(?:[^"]|"")*)"
+      | \{(?P<ref>[^{}]+)\}
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+      | (?P<op><>|!=|<=|>=|[-+*/&=<>(),])
+    )""",
+    re.VERBOSE,
+)
+
+
+class _EvalError(Exception):
+    def __init__(self, code: str) -> None:
+        super().__init__(code)
+        self.code = code
+
+
+# ---------------------------------------------------------------------------
+# Coercion / display
+# ---------------------------------------------------------------------------
+def _number(value: Any) -> float:
+    if value is None or value == "":
+        return 0
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, int | float):
+        return value
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        raise _EvalError("#VALUE!") from None
+
+
+def _text(value: Any) -> str:
+    return display_value(value)
+
+
+def _date(value: Any) -> date:
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        raise _EvalError("#VALUE!") from None
+
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    if isinstance(left, int | float) and isinstance(right, int | float):
+        a, b = left, right
+    else:
+        a, b = _text(left), _text(right)
+    return {
+        "=": a == b,
+        "<>": a != b,
+        "!=": a != b,
+        "<": a < b,
+        "<=": a <= b,
+        ">": a > b,
+        ">=": a >= b,
+    }[op]
+
+
+def _divide(a: Any, b: Any) -> float:
+    divisor = _number(b)
+    if divisor == 0:
+        raise _EvalError("#DIV/0!")
+    return _number(a) / divisor
+
+
+_BINARY: dict[str, Callable[[Any, Any], Any]] = {
+    "+": lambda a, b: _number(a) + _number(b),
+    "-": lambda a, b: _number(a) - _number(b),
+    "*": lambda a, b: _number(a) * _number(b),
+    "/": _divide,
+    "&": lambda a, b: _text(a) + _text(b),
+}
+
+_FUNCTIONS: dict[str, Callable[..., Any]] = {
+    "ABS": lambda x: abs(_number(x)),
+    "AND": lambda *xs: all(bool(x) for x in xs),
+    "AVERAGE": lambda *xs: sum(map(_number, xs)) / len(xs) if xs else 0,
+    "CONCAT": lambda *xs: "".join(map(_text, xs)),
+    "DAYS": lambda end, start: (_date(end) - _date(start)).days,
+    "LEN": lambda x: len(_text(x)),
+    "LOWER": lambda x: _text(x).lower(),
+    "MAX": lambda *xs: max(map(_number, xs)) if xs else 0,
+    "MIN": lambda *xs: min(map(_number, xs)) if xs else 0,
+    "NOT": lambda x: not x,
+    "OR": lambda *xs: any(bool(x) for x in xs),
+    "ROUND": lambda x, digits=0: round(_number(x), int(_number(digits))),
+    "SUM": lambda *xs: sum(map(_number, xs)),
+    "UPPER": lambda x: _text(x).upper(),
+}
+
+
+# ---------------------------------------------------------------------------
+# Parsing
+# ---------------------------------------------------------------------------
+# Syntax tree nodes are tuples: ("num", n) ("str", s) ("bool", b) ("ref", key)
+# ("neg", x) ("bin", op, a, b) ("cmp", op, a, b) ("if", test, then, else)
+# ("call", NAME, args).  :func:`_compile` turns them into closures; the
+# vectorized evaluator (:mod:`.vector`) walks them directly.
+Node = tuple
+
+
+@dataclass(frozen=True, slots=True)
+class Formula:
+    text: str
+    refs: frozenset[str]
+    tree: Node
+    evaluate: Compiled
+
+    def __call__(self, get: Getter) -> Any:
+        try:
+            return self.evaluate(get)
+        except _EvalError as exc:
+            return exc.code
+        except (TypeError, ValueError, OverflowError):
+            return "#VALUE!"
+
+
+class _Parser:
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.tokens: list[tuple[str, str]] = []
+        position = 0
+        source = text.strip()
+        if source.startswith("="):
+            source = source[1:]
+        while position < len(source):
+            if not source[position:].strip():
+                break
+            match = _TOKEN.match(source, position)
+            if match is None:
+                raise FormulaError(text, f"unexpected input at {source[position:]!r}")
+            kind = match.lastgroup
+            self.tokens.append((kind, match.group(kind)))
+            position = match.end()
+        self.position = 0
+        self.refs: set[str] = set()
+
+    def peek(self) -> tuple[str, str] | None:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self, op: str | None = None) -> tuple[str, str]:
+        token = self.peek()
+        if token is None or (op is not None and token != ("op", op)):
+            raise FormulaError(self.text, f"expected {op or 'a value'}")
+        self.position += 1
+        return token
+
+    def accept(self, *ops: str) -> str | None:
+        token = self.peek()
+        if token is not None and token[0] == "op" and token[1] in ops:
+            self.position += 1
+            return token[1]
+        return None
+
+    def parse(self) -> Formula:
+        tree = self.comparison()
+        if self.peek() is not None:
+            raise FormulaError(self.text, f"unexpected {self.peek()[1]!r}")
+        return Formula(self.text, frozenset(self.refs), tree, _compile(tree))
+
+    def comparison(self) -> Node:
+        left = self.additive()
+        op = self.accept("=", "<>", "!=", "<", "<=", ">", ">=")
+        if op is None:
+            return left
+        return ("cmp", op, left, self.additive())
+
+    def additive(self) -> Node:
+        node = self.term()
+        while op := self.accept("+", "-", "&"):
+            node = ("bin", op, node, self.term())
+        return node
+
+    def term(self) -> Node:
+        node = self.unary()
+        while op := self.accept("*", "/"):
+            node = ("bin", op, node, self.unary())
+        return node
+
+    def unary(self) -> Node:
+        if self.accept("-"):
+            return ("neg", self.unary())
+        return self.primary()
+
+    def primary(self) -> Node:
+        kind, value = self.take()
+        if kind == "number":
+            return ("num", float(value) if "." in value else int(value))
+        if kind == "string":
+            return ("str", value.replace('""', '"'))
+        if kind == "ref":
+            key = value.strip()
+            self.refs.add(key)
+            return ("ref", key)
+        if kind == "name":
+            upper = value.upper()
+            if upper in ("TRUE", "FALSE"):
+                return ("bool", upper == "TRUE")
+            return self.call(upper)
+        if value == "(":
+            node = self.comparison()
+            self.take(")")
+            return node
+        raise FormulaError(self.text, f"unexpected {value!r}")
+
+    def call(self, name: str) -> Node:
+        self.take("(")
+        args: list[Node] = []
+        if not self.accept(")"):
+            args.append(self.comparison())
+            while self.accept(","):
+                args.append(self.comparison())
+            self.take(")")
+        if name == "IF":
+            if len(args) not in (2, 3):
+                raise FormulaError(self.text, "IF takes 2 or 3 arguments")
+            return ("if", args[0], args[1], args[2] if len(args) == 3 else ("none",))
+        if name not in _FUNCTIONS:
+            raise FormulaError(self.text, f"unknown function {name}")
+        return ("call", name, tuple(args))
+
+
+def _compile(node: Node) -> Compiled:
+    kind = node[0]
+    if kind in ("num", "str", "bool"):
+        constant = node[1]
+        return lambda get: constant
+    if kind == "none":
+        return lambda get: None
+    if kind == "ref":
+        key = node[1]
+        return lambda get: get(key)
+    if kind == "neg":
+        operand = _compile(node[1])
+        return lambda get: -_number(operand(get))
+    if kind == "bin":
+        op, left, right = _BINARY[node[1]], _compile(node[2]), _compile(node[3])
+        return lambda get: op(left(get), right(get))
+    if kind == "cmp":
+        op, left, right = node[1], _compile(node[2]), _compile(node[3])
+        return lambda get: _compare(op, left(get), right(get))
+    if kind == "if":
+        test, then, otherwise = map(_compile, node[1:])
+        return lambda get: then(get) if test(get) else otherwise(get)
+    function, args = _FUNCTIONS[node[1]], [_compile(arg) for arg in node[2]]
+    return lambda get: function(*(arg(get) for arg in args))
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_formula(text: str) -> Formula:
+    """Parse *text* once; raises :class:`FormulaError` on syntax errors."""
+    return _Parser(text).parse()
+
+
+# ---------------------------------------------------------------------------
+# Dependency graph
+# ---------------------------------------------------------------------------
+class FormulaGraph:
+    """Formula columns of one schema version, in topological order."""
+
+    def __init__(self, columns: dict[str, Column]) -> None:
+        self.formulas = {
+            key: compile_formula(column.formula)
+            for key, column in columns.items()
+            if column.formula
+        }
+        self.dependents: dict[str, set[str]] = {}
+        for key, formula in self.formulas.items():
+            for ref in formula.refs:
+                self.dependents.setdefault(ref, set()).add(key)
+        self.order = self._topological_order()
+        self.rank = {key: index for index, key in enumerate(self.order)}
+        self._downstream: dict[frozenset[str], tuple[str, ...]] = {}
+
+    def _topological_order(self) -> list[str]:
+        pending = {
+            key: len(formula.refs & self.formulas.keys())
+            for key, formula in self.formulas.items()
+        }
+        ready = sorted(key for key, count in pending.items() if count == 0)
+        order = []
+        while ready:
+            key = ready.pop()
+            order.append(key)
+            for dependent in self.dependents.get(key, ()):
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(self.formulas):
+            cycle = sorted(self.formulas.keys() - set(order))
+            raise FormulaError(
+                self.formulas[cycle[0]].text, f"circular reference among {cycle}"
+            )
+        return order
+
+    def downstream(self, keys: Iterable[str]) -> tuple[str, ...]:
+        """Formula columns that (transitively) read *keys*, in evaluation order."""
+        keys = frozenset(keys)
+        cached = self._downstream.get(keys)
+        if cached is None:
+            seen: set[str] = set()
+            stack = list(keys)
+            while stack:
+                for dependent in self.dependents.get(stack.pop(), ()):
+                    if dependent not in seen:
+                        seen.add(dependent)
+                        stack.append(dependent)
+            cached = self._downstream[keys] = tuple(sorted(seen, key=self.rank.__getitem__))
+        return cached
+
+
+def check_formulas(columns: dict[str, Column]) -> None:
+    """Raise :class:`FormulaError` if any formula is invalid or circular."""
+    FormulaGraph(columns)
+
+
+# ---------------------------------------------------------------------------
+# Recompute
+# ---------------------------------------------------------------------------
+_ERRORS = frozenset({"#VALUE!", "#DIV/0!", "#REF!"})
+
+
+def _getter(table: Table, cursor: list[int]) -> Getter:
+    """Read ``{key}`` of the row at ``cursor[0]``; formula errors propagate."""
+    columns = table.columns
+
+    def get(key: str) -> Any:
+        column = columns.get(key)
+        if column is None:
+            raise _EvalError("#REF!")
+        value = column.values[cursor[0]]
+        if column.formula and isinstance(value, str) and value in _ERRORS:
+            raise _EvalError(value)
+        return value
+
+    return get
+
+
+def _changed(old: Any, new: Any) -> bool:
+    """Whether a recomputed cell must be written (``1`` -> ``1.0`` counts)."""
+    return new != old or type(new) is not type(old)
+
+
+class FormulaCache:
+    """One :class:`FormulaGraph` per table, rebuilt when the schema changes."""
+
+    def __init__(self) -> None:
+        self._graphs: dict[UUID, tuple[int, FormulaGraph]] = {}
+        self.arrays = vector.ArrayCache()
+
+    def graph(self, table: Table) -> FormulaGraph:
+        cached = self._graphs.get(table.id)
+        if cached is None or cached[0] != table.schema_version:
+            graph = FormulaGraph(table.columns)
+            cached = self._graphs[table.id] = (table.schema_version, graph)
+        return cached[1]
+
+    def recompute(self, table: Table, changes: Iterable[tuple]) -> list[tuple]:
+        """Re-evaluate formula cells affected by *changes*; return new changes."""
+        graph = self.graph(table)
+        if not graph.formulas:
+            return []
+        whole: set[str] = set()
+        dirty: dict[UUID, set[str]] = {}
+        for change in changes:
+            kind = change[0]
+            if kind == change_kinds.CELL_CHANGED:
+                dirty.setdefault(change[1], set()).add(change[2])
+            elif kind == change_kinds.ROW_INSERTED:
+                dirty.setdefault(change[1], set()).update(graph.formulas)
+            elif kind in (change_kinds.COLUMN_CHANGED, change_kinds.COLUMN_DELETED):
+                key = change[1]
+                whole.update(graph.downstream([key]))
+                if key in graph.formulas:
+                    whole.add(key)
+                    whole.update(graph.downstream([key]))
+
+        recomputed: list[tuple] = []
+        cursor = [0]
+        get = _getter(table, cursor)
+        slots = table.live_slots() if whole else []
+        for key in sorted(whole, key=graph.rank.__getitem__):
+            formula, values = graph.formulas[key], table.columns[key].values
+            computed = None
+            if vector.enabled(len(slots)):
+                computed = vector.evaluate_formula(formula.tree, table, slots, self.arrays)
+            writes = []
+            for position, slot in enumerate(slots):
+                value = computed[position] if computed is not None else vector.FALLBACK
+                if value is vector.FALLBACK:
+                    cursor[0] = slot
+                    value = formula(get)
+                if _changed(values[slot], value):
+                    writes.append((slot, value))
+                    recomputed.append((change_kinds.CELL_CHANGED, table.row_ids[slot], key))
+            if writes:
+                table.write_column(key, writes)
+
+        for row_id, sources in dirty.items():
+            slot = table.row_slots.get(row_id)
+            if slot is None:
+                continue
+            targets = graph.downstream(sources) + tuple(sources & graph.formulas.keys())
+            cursor[0] = slot
+            for key in sorted(set(targets) - whole, key=graph.rank.__getitem__):
+                value = graph.formulas[key](get)
+                if _changed(table.columns[key].values[slot], value):
+                    table.write_column(key, [(slot, value)])
+                    recomputed.append((change_kinds.CELL_CHANGED, row_id, key))
+        return recomputed
@@ -0,0 +1,267 @@
+"""
+Idempotency-key result store for ``:batch`` and asset upload.
+
+:class:`IdempotencyStore` caches the serialized response of a write under
+``(scope, key)`` — scope being ``table:<id>`` or ``project:<id>`` — so a retry
+with the same ``idempotency_key`` gets the first result back instead of a
+second mutation.  Entries expire after ``ttl_seconds`` and the backend keeps
+at most ``max_entries`` (least recently used evicted first).
+
+Each entry records a SHA-256 fingerprint of the request payload; reusing a
+key with a different payload raises :class:`.IdempotencyKeyReusedError`
+instead of replaying a response to another request.  Failed writes are never
+cached.  The engine applies writes under its lock, so a duplicate never runs
+while the first request is still executing.
+
+Two backends implement :class:`IdempotencyBackend`:
+
+* :class:`MemoryBackend` — in-process ``OrderedDict`` (default);
+* :class:`SqliteBackend` — a SQLite file, keeping the entries out of process
+  memory.  :meth:`IdempotencyStore.from_env` opens one file per parallel
+  worker and empties it, so every engine (i.e. every registry reset) starts
+  without entries of earlier scenarios.
+
+Responses are stored as JSON with UUIDs tagged, so every hit decodes a fresh
+copy.  Hit / miss / eviction / expiry counts are in
+:meth:`IdempotencyStore.metrics`.
+
+Configuration::
+
+    BDD_IDEMPOTENCY_TTL=86400          # seconds an entry is replayed
+    BDD_IDEMPOTENCY_MAX_ENTRIES=10000  # LRU bound
+    BDD_IDEMPOTENCY_DB=<path>          # use SqliteBackend at <path>
+                                       # (<path>.worker-<id> in workers)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any, Protocol, TypeVar
+from uuid import UUID
+
+from spreadsheet_engine.errors import IdempotencyKeyReusedError
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+TTL_SECONDS = float(os.environ.get("BDD_IDEMPOTENCY_TTL", "86400"))
+MAX_ENTRIES = int(os.environ.get("BDD_IDEMPOTENCY_MAX_ENTRIES", "10000"))
+DB_PATH = os.environ.get("BDD_IDEMPOTENCY_DB")
+
+T = TypeVar("T")
+
+
+# ---------------------------------------------------------------------------
+# Serialization
+# ---------------------------------------------------------------------------
+def _encode(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return {"__uuid__": str(value)}
+    return str(value)
+
+
+def _decode(obj: dict[str, Any]) -> Any:
+    if obj.keys() == {"__uuid__"}:
+        return UUID(obj["__uuid__"])
+    return obj
+
+
+def dumps(response: Any) -> str:
+    return json.dumps(response, default=_encode, ensure_ascii=False)
+
+
+def loads(payload: str) -> Any:
+    return json.loads(payload, object_hook=_decode)
+
+
+def fingerprint(request: Any) -> str:
+    """SHA-256 of a request payload, independent of key order."""
+    canonical = json.dumps(request, default=_encode, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _worker_path(path: str) -> str:
+    """``idem.db`` -> ``idem.worker-<id>.db`` inside sharded workers."""
+    worker_id = os.environ.get("BEHAVE_WORKER_ID")
+    if not worker_id:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.worker-{worker_id}{ext}"
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+class IdempotencyBackend(Protocol):
+    """Bounded key -> ``(expires_at, serialized response)`` storage."""
+
+    def get(self, key: str) -> tuple[float, str] | None: ...
+
+    def put(self, key: str, expires_at: float, payload: str) -> int:
+        """Store an entry; return how many entries were evicted for room."""
+        ...
+
+    def delete(self, key: str) -> None: ...
+
+    def clear(self) -> None: ...
+
+    def __len__(self) -> int: ...
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int = MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+    def get(self, key: str) -> tuple[float, str] | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, expires_at: float, payload: str) -> int:
+        self._entries[key] = (expires_at, payload)
+        self._entries.move_to_end(key)
+        evicted = 0
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            evicted += 1
+        return evicted
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteBackend:
+    """Persistent backend; ``used_at`` drives LRU eviction."""
+
+    def __init__(self, path: str, max_entries: int = MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency ("
+            " key TEXT PRIMARY KEY, expires_at REAL, used_at REAL, payload TEXT)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idempotency_used_at ON idempotency (used_at)"
+        )
+
+    def get(self, key: str) -> tuple[float, str] | None:
+        row = self._db.execute(
+            "SELECT expires_at, payload FROM idempotency WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            self._db.execute(
+                "UPDATE idempotency SET used_at = ? WHERE key = ?", (time.time(), key)
+            )
+        return row
+
+    def put(self, key: str, expires_at: float, payload: str) -> int:
+        self._db.execute(
+            "INSERT OR REPLACE INTO idempotency VALUES (?, ?, ?, ?)",
+            (key, expires_at, time.time(), payload),
+        )
+        excess = len(self) - self.max_entries
+        if excess <= 0:
+            return 0
+        self._db.execute(
+            "DELETE FROM idempotency WHERE key IN"
+            " (SELECT key FROM idempotency ORDER BY used_at LIMIT ?)",
+            (excess,),
+        )
+        return excess
+
+    def delete(self, key: str) -> None:
+        self._db.execute("DELETE FROM idempotency WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self._db.execute("DELETE FROM idempotency")
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM idempotency").fetchone()[0]
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+class IdempotencyStore:
+    def __init__(
+        self,
+        backend: IdempotencyBackend | None = None,
+        ttl_seconds: float = TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._metrics = dict.fromkeys(("hits", "misses", "evictions", "expired"), 0)
+
+    @classmethod
+    def from_env(cls) -> IdempotencyStore:
+        if not DB_PATH:
+            return cls(MemoryBackend())
+        backend = SqliteBackend(_worker_path(DB_PATH))
+        backend.clear()
+        return cls(backend)
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
+    def metrics(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._metrics, "entries": len(self.backend)}
+
+    def run(
+        self, scope: str, key: str | None, request: Any, compute: Callable[[], T]
+    ) -> T:
+        """``compute()`` once per ``(scope, key)``; replay its result afterwards.
+
+        Raises :class:`.IdempotencyKeyReusedError` when *key* was first used
+        with a *request* payload that differs from this one.
+        """
+        if not key:
+            return compute()
+        name = f"{scope}:{key}"
+        digest = fingerprint(request)
+        with self._lock:
+            cached = self._lookup(name)
+            if cached is not None:
+                entry = loads(cached)
+                if entry["fingerprint"] != digest:
+                    raise IdempotencyKeyReusedError(key)
+                self._metrics["hits"] += 1
+                return entry["response"]
+            self._metrics["misses"] += 1
+
+        response = compute()
+        payload = dumps({"fingerprint": digest, "response": response})
+        with self._lock:
+            self._metrics["evictions"] += self.backend.put(
+                name, self.clock() + self.ttl_seconds, payload
+            )
+        return response
+
+    def _lookup(self, name: str) -> str | None:
+        entry = self.backend.get(name)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at <= self.clock():
+            self.backend.delete(name)
+            self._metrics["expired"] += 1
+            return None
+        return payload
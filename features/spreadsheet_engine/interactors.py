@@ -0,0 +1,73 @@
+"""Engine-backed stand-ins for the spreadsheet interactor / query service."""
+
+from __future__ import annotations
+
+from http import HTTPStatus
+from typing import Any
+from unittest.mock import AsyncMock
+
+from fastapi import HTTPException
+
+from spreadsheet_engine.engine import SpreadsheetEngine
+from spreadsheet_engine.errors import (
+    AssetUploadError,
+    CellValidationError,
+    ChangeLogCompactedError,
+    EntityNotFoundError,
+    FormulaError,
+    IdempotencyKeyReusedError,
+    InvalidCursorError,
+    InvalidPageError,
+    InvalidViewSpecError,
+    SpreadsheetEngineError,
+    UnsupportedOperationError,
+    VersionConflictError,
+)
+
+# -- First match wins, so subclasses go before their bases.
+ERROR_STATUS: tuple[tuple[type[SpreadsheetEngineError], HTTPStatus], ...] = (
+    (EntityNotFoundError, HTTPStatus.NOT_FOUND),
+    (VersionConflictError, HTTPStatus.CONFLICT),
+    (ChangeLogCompactedError, HTTPStatus.GONE),
+    (CellValidationError, HTTPStatus.UNPROCESSABLE_ENTITY),
+    (FormulaError, HTTPStatus.UNPROCESSABLE_ENTITY),
+    (InvalidCursorError, HTTPStatus.UNPROCESSABLE_ENTITY),
+    (InvalidPageError, HTTPStatus.UNPROCESSABLE_ENTITY),
+    (InvalidViewSpecError, HTTPStatus.UNPROCESSABLE_ENTITY),
+    (AssetUploadError, HTTPStatus.UNPROCESSABLE_ENTITY),
+    (IdempotencyKeyReusedError, HTTPStatus.UNPROCESSABLE_ENTITY),
+    (UnsupportedOperationError, HTTPStatus.NOT_IMPLEMENTED),
+    (SpreadsheetEngineError, HTTPStatus.BAD_REQUEST),
+)
+
+
+def http_status(error: SpreadsheetEngineError) -> HTTPStatus:
+    """HTTP status an engine error is answered with."""
+    for error_type, status in ERROR_STATUS:
+        if isinstance(error, error_type):
+            return status
+    return HTTPStatus.BAD_REQUEST
+
+
+class EngineInteractor:
+    """Drop-in for ``SpreadsheetCommandInteractor`` / ``SpreadsheetQueryService``.
+
+    ``execute`` stays an ``AsyncMock`` (``side_effect`` = :meth:`run`) so
+    await bookkeeping keeps working, while the engine — not a
+    ``return_value`` configured by a step — produces the result.
+
+    The controllers' ``error_map`` only knows the backend's domain
+    exceptions, so engine errors are translated here into
+    ``HTTPException`` (see :data:`ERROR_STATUS`): a missing entity answers
+    404 and a version conflict 409 instead of an unmapped 500.
+    """
+
+    def __init__(self, engine: SpreadsheetEngine) -> None:
+        self.engine = engine
+        self.execute = AsyncMock(side_effect=self.run)
+
+    def run(self, request: Any) -> Any:
+        try:
+            return self.engine.execute(request)
+        except SpreadsheetEngineError as exc:
+            raise HTTPException(status_code=http_status(exc), detail=str(exc)) from exc
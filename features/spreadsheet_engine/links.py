@@ -0,0 +1,164 @@
+"""
+Batched resolution of ``link`` / ``lookup`` cells on table reads.
+
+A ``link`` column stores target row ids (one id or a list) of the table named
+by ``property["target_table_id"]``; its ``display_value`` is the target rows'
+``property["display_column"]`` (default: the target's first column).  A
+``lookup`` column stores nothing: ``property["link_column"]`` names a link
+column of the same table and ``property["target_column"]`` the column read
+from the linked rows.
+
+:meth:`LinkResolver.resolve` decorates one page of ``row_view`` dicts.  It
+first collects every link target on the page, then resolves them with one
+batched fetch per target table instead of one lookup per cell.  Fetched
+target rows are cached per target table and keyed by its ``version``, so
+the whole cache of a target is dropped as soon as that table is written.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any
+from uuid import UUID
+
+from spreadsheet_engine.model import Column, Table, display_value
+
+LINK_TYPES = ("link", "lookup")
+
+
+def link_targets(value: Any) -> list[UUID]:
+    """Row ids stored in a link cell (a single id or a list of ids)."""
+    if value is None or value == "":
+        return []
+    targets = []
+    for item in value if isinstance(value, list | tuple) else [value]:
+        try:
+            targets.append(item if isinstance(item, UUID) else UUID(str(item)))
+        except ValueError:
+            continue
+    return targets
+
+
+def _target_table_id(column: Column) -> UUID | None:
+    target = column.property.get("target_table_id")
+    try:
+        return UUID(str(target)) if target else None
+    except ValueError:
+        return None
+
+
+@dataclass(slots=True)
+class _TargetRows:
+    version: int
+    rows: dict[UUID, dict[str, Any] | None] = field(default_factory=dict)
+
+
+class LinkResolver:
+    def __init__(self) -> None:
+        self._targets: dict[UUID, _TargetRows] = {}
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    def resolve(
+        self, table: Table, rows: list[dict[str, Any]], tables: dict[UUID, Table]
+    ) -> None:
+        """Fill link ``display_value``s and add lookup cells to *rows* in place."""
+        links = {
+            key: (column, _target_table_id(column))
+            for key, column in table.columns.items()
+            if column.data_type == "link"
+        }
+        lookups = [
+            column for column in table.columns.values() if column.data_type == "lookup"
+        ]
+        if not links:
+            return
+
+        # -- 1. Collect every target row id on the page, per target table.
+        wanted: dict[UUID, set[UUID]] = defaultdict(set)
+        page = []
+        for row in rows:
+            cells = {cell["column_key"]: cell for cell in row["cells"]}
+            targets = {}
+            for key, (_, target_id) in links.items():
+                if key in cells and target_id is not None:
+                    targets[key] = link_targets(cells[key]["value"])
+                    wanted[target_id].update(targets[key])
+            page.append((row, cells, targets))
+
+        # -- 2. One batched fetch per target table.
+        fetched = {
+            target_id: self._fetch(tables.get(target_id), row_ids)
+            for target_id, row_ids in wanted.items()
+        }
+        shown = {
+            key: column.property.get("display_column") or _first_column(tables.get(target_id))
+            for key, (column, target_id) in links.items()
+        }
+
+        # -- 3. Decorate the page.
+        for row, cells, targets in page:
+            found = {
+                key: [
+                    target
+                    for row_id in row_ids
+                    if (target := fetched[links[key][1]].get(row_id)) is not None
+                ]
+                for key, row_ids in targets.items()
+            }
+            for key, linked in found.items():
+                cells[key]["display_value"] = ", ".join(
+                    display_value(target.get(shown[key])) for target in linked
+                )
+            added = False
+            for column in lookups:
+                link_key = column.property.get("link_column")
+                if not found.get(link_key):
+                    continue
+                target_key = column.property.get("target_column")
+                values = [target.get(target_key) for target in found[link_key]]
+                single = not isinstance(cells[link_key]["value"], list | tuple)
+                row["cells"].append(
+                    {
+                        "row_id": row["id"],
+                        "column_key": column.key,
+                        "value": values[0] if single else values,
+                        "display_value": ", ".join(map(display_value, values)),
+                        "formula": None,
+                    }
+                )
+                added = True
+            if added:
+                row["cells"].sort(key=lambda cell: table.columns[cell["column_key"]].order)
+
+    def _fetch(
+        self, target: Table | None, row_ids: set[UUID]
+    ) -> dict[UUID, dict[str, Any] | None]:
+        """Cells of *row_ids* in *target* (``None`` for missing rows), cached."""
+        if target is None:
+            return {}
+        cached = self._targets.get(target.id)
+        if cached is None or cached.version != target.version:
+            cached = self._targets[target.id] = _TargetRows(target.version)
+        missing = [row_id for row_id in row_ids if row_id not in cached.rows]
+        self.hits += len(row_ids) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            self.batches += 1
+            columns = list(target.columns.values())
+            for row_id in missing:
+                slot = target.row_slots.get(row_id)
+                cached.rows[row_id] = (
+                    None
+                    if slot is None
+                    else {column.key: column.values[slot] for column in columns}
+                )
+        return cached.rows
+
+
+def _first_column(table: Table | None) -> str | None:
+    if table is None or not table.columns:
+        return None
+    return table.ordered_columns()[0].key
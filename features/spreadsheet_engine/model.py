@@ -0,0 +1,534 @@
+"""
+Slotted, array-backed storage structures of the in-memory engine.
+
+Cells are stored **column-major**: every :class:`Column` owns a ``values``
+list indexed by *row slot*, and a :class:`Table` keeps parallel per-slot
+arrays for row ids, parents and order.  Deleted rows leave a tombstone
+(``row_ids[slot] is None``) until :meth:`Table.compact` reclaims them.
+
+Row order is served from a sorted ``(order, id, slot)`` key list that is
+rebuilt lazily after row inserts, deletes and re-orders, so keyset pages
+(:meth:`Table.slots_after`) cost ``O(log n + limit)``.
+
+``Table.row_versions`` / ``Column.version`` hold the table version of the
+last commit that touched the row / column definition, so writes can expect
+a row- or column-level version instead of the table-wide one.
+
+``Table.schema_version`` counts column adds / updates / removals / reorders;
+schema snapshots (:mod:`.schema`) are keyed by it.
+
+``Column.epoch`` / ``Table.row_epoch`` are stamped from one global counter
+on every cell write / row-set change, so derived structures (view indexes)
+can tell whether they are still current.
+
+:meth:`Table.clone` is copy-on-write: the clone shares every column's
+``values`` list and the per-slot row arrays with its source and copies a
+column on its first cell write, the row arrays on the first row change.
+The source must not be written while a clone of it is in use.
+"""
+
+from __future__ import annotations
+
+import itertools
+import re
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any
+from uuid import UUID, uuid5
+
+from spreadsheet_engine.errors import (
+    CellValidationError,
+    EntityNotFoundError,
+    StaleEntityError,
+)
+
+_next_epoch = itertools.count(1).__next__
+
+
+# ---------------------------------------------------------------------------
+# Columns
+# ---------------------------------------------------------------------------
+@dataclass(slots=True)
+class Column:
+    id: UUID
+    key: str
+    title: str
+    data_type: str
+    order: int
+    is_fixed: bool = False
+    hidden: bool = False
+    formula: str | None = None
+    options: list[dict[str, str]] = field(default_factory=list)
+    validation: dict[str, Any] | None = None
+    property: dict[str, Any] = field(default_factory=dict)
+    values: list[Any] = field(default_factory=list)
+    version: int = 0
+    epoch: int = field(default_factory=_next_epoch, compare=False)
+
+    def validate(self, value: Any) -> None:
+        """Raise :class:`CellValidationError` if *value* does not fit the column."""
+        if self.formula:
+            raise CellValidationError(self.key, "the column is computed by a formula")
+        if self.data_type == "lookup":
+            raise CellValidationError(self.key, "the column is looked up through a link")
+        rules = self.validation or {}
+        if value is None or value == "":
+            if rules.get("required"):
+                raise CellValidationError(self.key, "value is required")
+            return
+
+        if self.data_type == "number":
+            if isinstance(value, bool) or not isinstance(value, int | float):
+                raise CellValidationError(self.key, f"expected a number, got {value!r}")
+            if rules.get("min_value") is not None and value < rules["min_value"]:
+                raise CellValidationError(self.key, f"{value} < {rules['min_value']}")
+            if rules.get("max_value") is not None and value > rules["max_value"]:
+                raise CellValidationError(self.key, f"{value} > {rules['max_value']}")
+        elif self.data_type == "date":
+            try:
+                date.fromisoformat(str(value))
+            except ValueError:
+                raise CellValidationError(
+                    self.key, f"expected an ISO date, got {value!r}"
+                ) from None
+        elif self.data_type == "link":
+            try:
+                for target in value if isinstance(value, list) else [value]:
+                    UUID(str(target))
+            except ValueError:
+                raise CellValidationError(
+                    self.key, f"expected target row id(s), got {value!r}"
+                ) from None
+        elif self.data_type in ("select", "multi_select") and self.options:
+            allowed = {option["key"] for option in self.options}
+            chosen = (
+                [part.strip() for part in str(value).split(",")]
+                if self.data_type == "multi_select"
+                else [value]
+            )
+            unknown = [item for item in chosen if item not in allowed]
+            if unknown:
+                raise CellValidationError(self.key, f"unknown option(s) {unknown}")
+
+        if rules.get("regex") and not re.fullmatch(rules["regex"], str(value)):
+            raise CellValidationError(self.key, f"{value!r} does not match pattern")
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "key": self.key,
+            "title": self.title,
+            "data_type": self.data_type,
+            "is_fixed": self.is_fixed,
+            "order": self.order,
+            "hidden": self.hidden,
+            "formula": self.formula,
+            "options": list(self.options),
+            "validation": self.validation,
+            "property": dict(self.property),
+            "version": self.version,
+        }
+
+    def check_version(self, expected: int | None) -> None:
+        if expected is not None and expected != self.version:
+            raise StaleEntityError("Column", self.key, expected, self.version)
+
+    @classmethod
+    def from_payload(cls, table_id: UUID, payload: dict[str, Any], order: int) -> Column:
+        """A new column as described by an ``add_column`` payload."""
+        key = payload["key"]
+        return cls(
+            id=uuid5(table_id, f"column:{key}"),
+            key=key,
+            title=payload.get("title") or key,
+            data_type=payload.get("data_type", "text"),
+            order=order,
+            formula=payload.get("formula"),
+            options=list(payload.get("options") or []),
+            validation=payload.get("validation"),
+            property=dict(payload.get("property") or {}),
+        )
+
+    def copy(self, *, with_values: bool = True) -> Column:
+        return Column(
+            id=self.id,
+            key=self.key,
+            title=self.title,
+            data_type=self.data_type,
+            order=self.order,
+            is_fixed=self.is_fixed,
+            hidden=self.hidden,
+            formula=self.formula,
+            options=list(self.options),
+            validation=dict(self.validation) if self.validation else None,
+            property=dict(self.property),
+            values=list(self.values) if with_values else [],
+            version=self.version,
+            epoch=self.epoch,
+        )
+
+
+def display_value(value: Any) -> str:
+    """How a (computed) cell value is displayed."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def column_changes(payload: dict[str, Any]) -> dict[str, Any]:
+    """Attributes an ``update_column`` payload sets (its mask, or non-null fields)."""
+    mask = payload.get("update_mask") or [
+        name
+        for name in ("title", "hidden", "formula", "property", "validation", "options")
+        if payload.get(name) is not None
+    ]
+    return {name: payload.get(name) for name in mask}
+
+
+# ---------------------------------------------------------------------------
+# Tables
+# ---------------------------------------------------------------------------
+@dataclass(slots=True)
+class Table:
+    id: UUID
+    project_id: UUID
+    template_key: str | None
+    table_name: str
+    version: int = 1
+    columns: dict[str, Column] = field(default_factory=dict)
+    row_ids: list[UUID | None] = field(default_factory=list)
+    parent_row_ids: list[UUID | None] = field(default_factory=list)
+    row_orders: list[int] = field(default_factory=list)
+    row_versions: list[int] = field(default_factory=list)
+    row_slots: dict[UUID, int] = field(default_factory=dict)
+    next_row_order: int = 1
+    schema_version: int = 1
+    row_epoch: int = field(default_factory=_next_epoch, compare=False)
+    _sorted_keys: list[tuple[int, str, int]] | None = field(
+        default=None, repr=False, compare=False
+    )
+    _shared_columns: set[str] = field(default_factory=set, repr=False, compare=False)
+    _shared_rows: bool = field(default=False, repr=False, compare=False)
+
+    # -- Columns --
+
+    def ordered_columns(self) -> list[Column]:
+        return sorted(self.columns.values(), key=lambda column: column.order)
+
+    def column(self, key_or_title: str) -> Column:
+        """Resolve a column by key, falling back to its display title."""
+        column = self.columns.get(key_or_title)
+        if column is not None:
+            return column
+        for candidate in self.columns.values():
+            if candidate.title == key_or_title:
+                return candidate
+        raise EntityNotFoundError("Column", key_or_title)
+
+    def add_column(self, column: Column) -> None:
+        column.values = [None] * len(self.row_ids)
+        self._shared_columns.discard(column.key)
+        self.columns[column.key] = column
+        self.schema_version += 1
+
+    def update_column(self, key_or_title: str, changes: dict[str, Any]) -> Column:
+        column = self.column(key_or_title)
+        for name, value in changes.items():
+            setattr(column, name, value)
+        self.schema_version += 1
+        return column
+
+    def remove_column(self, key_or_title: str) -> Column:
+        column = self.columns.pop(self.column(key_or_title).key)
+        self._shared_columns.discard(column.key)
+        self.schema_version += 1
+        return column
+
+    def reorder_columns(self, keys: list[str]) -> None:
+        ordered = [self.column(key) for key in keys]
+        rest = [column for column in self.ordered_columns() if column not in ordered]
+        for order, column in enumerate(ordered + rest, start=1):
+            column.order = order
+        self.schema_version += 1
+
+    # -- Rows --
+
+    @property
+    def row_count(self) -> int:
+        return len(self.row_slots)
+
+    def slot_of(self, row_id: UUID) -> int:
+        slot = self.row_slots.get(row_id)
+        if slot is None:
+            raise EntityNotFoundError("Row", row_id)
+        return slot
+
+    def check_row_version(self, row_id: UUID, expected: int | None) -> None:
+        """Raise :class:`StaleEntityError` unless *row_id* is at *expected*."""
+        if expected is None:
+            return
+        slot = self.row_slots.get(row_id)
+        actual = None if slot is None else self.row_versions[slot]
+        if actual != expected:
+            raise StaleEntityError("Row", row_id, expected, actual)
+
+    def stamp_row(self, row_id: UUID, version: int) -> None:
+        slot = self.row_slots.get(row_id)
+        if slot is not None:
+            self._own_rows()
+            self.row_versions[slot] = version
+
+    def add_row(
+        self,
+        row_id: UUID,
+        parent_row_id: UUID | None = None,
+        order: int | None = None,
+    ) -> int:
+        self._own_rows(with_columns=True)
+        slot = len(self.row_ids)
+        self.row_ids.append(row_id)
+        self.parent_row_ids.append(parent_row_id)
+        self.row_orders.append(order if order is not None else self.next_row_order)
+        self.row_versions.append(self.version)
+        self.next_row_order = max(self.next_row_order, self.row_orders[-1]) + 1
+        self.row_slots[row_id] = slot
+        for column in self.columns.values():
+            column.values.append(None)
+        self._sorted_keys = None
+        self.row_epoch = _next_epoch()
+        return slot
+
+    def add_rows(self, rows: list[tuple[UUID, UUID | None, int]]) -> int:
+        """Append ``(row_id, parent_row_id, order)`` rows at once; first slot."""
+        first = len(self.row_ids)
+        if not rows:
+            return first
+        self._own_rows(with_columns=True)
+        for offset, (row_id, _, _) in enumerate(rows):
+            self.row_slots[row_id] = first + offset
+        self.row_ids.extend(row_id for row_id, _, _ in rows)
+        self.parent_row_ids.extend(parent for _, parent, _ in rows)
+        self.row_orders.extend(order for _, _, order in rows)
+        self.row_versions.extend([self.version] * len(rows))
+        self.next_row_order = max(self.next_row_order, max(self.row_orders[first:]) + 1)
+        padding = [None] * len(rows)
+        for column in self.columns.values():
+            column.values.extend(padding)
+        self._sorted_keys = None
+        self.row_epoch = _next_epoch()
+        return first
+
+    def delete_row(self, row_id: UUID) -> None:
+        if row_id not in self.row_slots:
+            raise EntityNotFoundError("Row", row_id)
+        self._own_rows(with_columns=True)
+        slot = self.row_slots.pop(row_id)
+        self.row_ids[slot] = None
+        for column in self.columns.values():
+            column.values[slot] = None
+        self._sorted_keys = None
+        self.row_epoch = _next_epoch()
+        if len(self.row_ids) > 2 * len(self.row_slots) + 64:
+            self.compact()
+
+    def set_row_parent(self, slot: int, parent_row_id: UUID | None) -> None:
+        self._own_rows()
+        self.parent_row_ids[slot] = parent_row_id
+
+    def set_row_order(self, slot: int, order: int) -> None:
+        self._own_rows()
+        self.row_orders[slot] = order
+        self.next_row_order = max(self.next_row_order, order + 1)
+        self._sorted_keys = None
+        self.row_epoch = _next_epoch()
+
+    def sorted_row_keys(self) -> list[tuple[int, str, int]]:
+        """``(order, str(id), slot)`` of every live row, in display order."""
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(
+                (self.row_orders[slot], str(self.row_ids[slot]), slot)
+                for slot in self.row_slots.values()
+            )
+        return self._sorted_keys
+
+    def live_slots(self) -> list[int]:
+        """Live row slots sorted by ``(order, id)``."""
+        return [slot for _, _, slot in self.sorted_row_keys()]
+
+    def first_slots(self, limit: int) -> list[int]:
+        """The first *limit* live slots in display order."""
+        return [slot for _, _, slot in self.sorted_row_keys()[:limit]]
+
+    def slots_after(self, order: int, row_id: str, limit: int) -> list[int]:
+        """Up to *limit* live slots strictly after the ``(order, id)`` key."""
+        keys = self.sorted_row_keys()
+        # -- No slot reaches len(row_ids): this lands just past the exact key.
+        start = bisect_right(keys, (order, row_id, len(self.row_ids)))
+        return [slot for _, _, slot in keys[start : start + limit]]
+
+    def compact(self) -> None:
+        """Drop tombstoned slots from every per-slot array."""
+        keep = [slot for slot, row_id in enumerate(self.row_ids) if row_id is not None]
+        self.row_ids = [self.row_ids[slot] for slot in keep]
+        self.parent_row_ids = [self.parent_row_ids[slot] for slot in keep]
+        self.row_orders = [self.row_orders[slot] for slot in keep]
+        self.row_versions = [self.row_versions[slot] for slot in keep]
+        for column in self.columns.values():
+            column.values = [column.values[slot] for slot in keep]
+        self.row_slots = {row_id: slot for slot, row_id in enumerate(self.row_ids)}
+        self._shared_columns.clear()
+        self._shared_rows = False
+        self._sorted_keys = None
+        self.row_epoch = _next_epoch()
+
+    # -- Cells --
+
+    def set_cell(self, row_id: UUID, key_or_title: str, value: Any) -> Column:
+        column = self.column(key_or_title)
+        column.validate(value)
+        self._own_values(column)[self.slot_of(row_id)] = value
+        column.epoch = _next_epoch()
+        return column
+
+    def write_column(self, key: str, writes: list[tuple[int, Any]]) -> None:
+        """Store already validated ``(slot, value)`` pairs in one column."""
+        values = self._own_values(self.columns[key])
+        for slot, value in writes:
+            values[slot] = value
+        self.columns[key].epoch = _next_epoch()
+
+    def _own_values(self, column: Column) -> list[Any]:
+        """*column*'s ``values``, copied first if still shared with a clone source."""
+        if column.key in self._shared_columns:
+            self._shared_columns.discard(column.key)
+            column.values = list(column.values)
+        return column.values
+
+    def _own_rows(self, *, with_columns: bool = False) -> None:
+        """Copy the shared per-slot arrays (and columns) before changing them."""
+        if self._shared_rows:
+            self._shared_rows = False
+            self.row_ids = list(self.row_ids)
+            self.parent_row_ids = list(self.parent_row_ids)
+            self.row_orders = list(self.row_orders)
+            self.row_versions = list(self.row_versions)
+            self.row_slots = dict(self.row_slots)
+        if with_columns:
+            for column in self.columns.values():
+                self._own_values(column)
+
+    def row_cells(self, slot: int) -> list[dict[str, Any]]:
+        """Cells of one row; formula cells carry their stored computed value."""
+        row_id = self.row_ids[slot]
+        return [
+            {
+                "row_id": row_id,
+                "column_key": column.key,
+                "value": column.values[slot],
+                "display_value": (
+                    display_value(column.values[slot]) if column.formula else None
+                ),
+                "formula": column.formula,
+            }
+            for column in self.ordered_columns()
+            if column.values[slot] is not None or column.formula
+        ]
+
+    def row_view(self, slot: int) -> dict[str, Any]:
+        return {
+            "id": self.row_ids[slot],
+            "parent_row_id": self.parent_row_ids[slot],
+            "order": self.row_orders[slot],
+            "version": self.row_versions[slot],
+            "cells": self.row_cells(slot),
+        }
+
+    # -- Snapshots --
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "project_id": self.project_id,
+            "template_key": self.template_key,
+            "table_name": self.table_name,
+            "version": self.version,
+            "etag": f"v{self.version}",
+        }
+
+    def clone(self) -> Table:
+        """Copy-on-write snapshot used for atomic batches and dry runs.
+
+        Only column definitions are copied up front; cell values and row
+        arrays stay shared until the clone first writes them.
+        """
+        columns = {}
+        for key, column in self.columns.items():
+            columns[key] = column.copy(with_values=False)
+            columns[key].values = column.values
+        return Table(
+            id=self.id,
+            project_id=self.project_id,
+            template_key=self.template_key,
+            table_name=self.table_name,
+            version=self.version,
+            columns=columns,
+            row_ids=self.row_ids,
+            parent_row_ids=self.parent_row_ids,
+            row_orders=self.row_orders,
+            row_versions=self.row_versions,
+            row_slots=self.row_slots,
+            next_row_order=self.next_row_order,
+            schema_version=self.schema_version,
+            row_epoch=self.row_epoch,
+            _sorted_keys=self._sorted_keys,
+            _shared_columns=set(columns),
+            _shared_rows=True,
+        )
+
+
+# ---------------------------------------------------------------------------
+# Views and assets
+# ---------------------------------------------------------------------------
+@dataclass(slots=True)
+class View:
+    id: UUID
+    table_id: UUID
+    name: str
+    type: str = "grid"
+    frozen_columns: int = 0
+    hidden_column_keys: list[str] = field(default_factory=list)
+    filters: dict[str, Any] = field(default_factory=dict)
+    sorts: list[dict[str, str]] = field(default_factory=list)
+    version: int = 1
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "table_id": self.table_id,
+            "name": self.name,
+            "type": self.type,
+            "frozen_columns": self.frozen_columns,
+            "hidden_column_keys": list(self.hidden_column_keys),
+            "filters": dict(self.filters),
+            "sorts": list(self.sorts),
+        }
+
+
+@dataclass(slots=True)
+class Asset:
+    id: UUID
+    project_id: UUID
+    asset_type: str
+    title: str
+    content_digest: str
+    tags: list[str] = field(default_factory=list)
+    follow_parent_id: UUID | None = None
+    follow_mode: str | None = None
+    bindings: set[tuple[UUID, str]] = field(default_factory=set)
+    content_version: int = 1
+    synced_version: int = 1
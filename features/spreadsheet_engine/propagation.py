@@ -0,0 +1,182 @@
+"""
+Fan-out of parent asset edits to their follow copies.
+
+Editing an asset's content enqueues a :class:`PropagationJob` instead of
+syncing followers inside the request.  The job walks the follow tree below
+the asset breadth-first through the :class:`.FollowIndex` (a copy is
+refreshed before its own followers) and updates followers in chunks of
+``chunk`` assets, so the engine lock is released between chunks and large
+trees do not block other requests.  Refreshing a follower moves a blob
+reference (:mod:`.blobs`), it never copies the body.
+
+Edits arriving while a job for the same asset is still queued are coalesced
+into it: a burst of edits yields one propagation that copies the latest
+content.  ``coalesced`` counts the merged edits; progress is reported by
+:meth:`PropagationJob.summary`.
+
+Backends:
+
+* ``inline`` (default) — queued jobs run when :meth:`PropagationQueue.drain`
+  is called; the engine drains, outside its lock, before every request
+  except further content edits and job queries, which keeps BDD runs
+  deterministic;
+* ``thread`` — a local worker thread runs jobs as soon as they are queued.
+
+Configuration::
+
+    BDD_PROPAGATION_BACKEND=inline   # inline | thread
+    BDD_PROPAGATION_CHUNK=500        # followers updated per lock hold
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any
+from uuid import UUID, uuid4
+
+from spreadsheet_engine.blobs import BlobStore
+from spreadsheet_engine.follow import FollowIndex
+from spreadsheet_engine.model import Asset
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+BACKEND = os.environ.get("BDD_PROPAGATION_BACKEND", "inline")
+CHUNK = int(os.environ.get("BDD_PROPAGATION_CHUNK", "500"))
+
+# Finished jobs kept for progress queries.
+MAX_FINISHED_JOBS = 1000
+
+BACKENDS = ("inline", "thread")
+
+
+@dataclass(slots=True)
+class PropagationJob:
+    id: UUID
+    asset_id: UUID
+    content_version: int
+    status: str = "queued"
+    total: int = 0
+    synced: int = 0
+    coalesced: int = 0
+    error: str | None = None
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "asset_id": self.asset_id,
+            "status": self.status,
+            "content_version": self.content_version,
+            "followers_total": self.total,
+            "followers_synced": self.synced,
+            "coalesced_updates": self.coalesced,
+            "error": self.error,
+        }
+
+
+class PropagationQueue:
+    def __init__(
+        self,
+        follow: FollowIndex,
+        blobs: BlobStore,
+        lock: threading.RLock,
+        backend: str = BACKEND,
+        chunk: int = CHUNK,
+    ) -> None:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown propagation backend {backend!r}")
+        self.follow = follow
+        self.blobs = blobs
+        self.lock = lock
+        self.backend = backend
+        self.chunk = chunk
+        self.jobs: OrderedDict[UUID, PropagationJob] = OrderedDict()
+        self._queued: dict[UUID, PropagationJob] = {}
+        self._ready: deque[PropagationJob] = deque()
+        self._wakeup = threading.Condition(lock)
+        self._worker: threading.Thread | None = None
+
+    def enqueue(self, asset: Asset) -> PropagationJob:
+        """Queue (or coalesce into) a propagation of *asset*'s content."""
+        with self.lock:
+            job = self._queued.get(asset.id)
+            if job is not None:
+                job.coalesced += 1
+                job.content_version = asset.content_version
+                return job
+            job = PropagationJob(uuid4(), asset.id, asset.content_version)
+            self.jobs[job.id] = job
+            self._queued[asset.id] = job
+            self._ready.append(job)
+            if self.backend == "thread":
+                self._start_worker()
+                self._wakeup.notify()
+            return job
+
+    def drain(self) -> None:
+        """Run every queued job now (``inline`` backend only).
+
+        Call it without holding the lock (it is re-entrant): jobs take it
+        one chunk at a time.
+        """
+        if self.backend != "inline":
+            return
+        while True:
+            with self.lock:
+                if not self._ready:
+                    return
+                job = self._take()
+            self._run(job)
+
+    # -- Execution --
+
+    def _take(self) -> PropagationJob:
+        job = self._ready.popleft()
+        del self._queued[job.asset_id]
+        job.status = "running"
+        return job
+
+    def _run(self, job: PropagationJob) -> None:
+        try:
+            with self.lock:
+                pairs = self.follow.followers(job.asset_id)
+                job.total = len(pairs)
+            for start in range(0, len(pairs), self.chunk):
+                with self.lock:
+                    for child, parent in pairs[start : start + self.chunk]:
+                        # -- Detached / re-parented since the walk: leave it alone.
+                        if child.follow_mode == "follow" and child.follow_parent_id == parent.id:
+                            child.content_digest = self.blobs.relink(
+                                child.content_digest, parent.content_digest
+                            )
+                            child.synced_version = parent.content_version
+                        job.synced += 1
+        except Exception as exc:  # -- Reported through the job, not raised.
+            job.status, job.error = "failed", str(exc)
+        else:
+            job.status = "done"
+        self._forget_finished()
+
+    def _forget_finished(self) -> None:
+        with self.lock:
+            finished = [job.id for job in self.jobs.values() if job.status in ("done", "failed")]
+            for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+                del self.jobs[job_id]
+
+    def _start_worker(self) -> None:
+        if self._worker is None:
+            self._worker = threading.Thread(
+                target=self._work, name="asset-propagation", daemon=True
+            )
+            self._worker.start()
+
+    def _work(self) -> None:
+        while True:
+            with self.lock:
+                while not self._ready:
+                    self._wakeup.wait()
+                job = self._take()
+            self._run(job)
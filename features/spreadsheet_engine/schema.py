@@ -0,0 +1,52 @@
+"""
+Cached, versioned snapshots of a table's schema.
+
+A :class:`SchemaSnapshot` holds value-less copies of a table's columns —
+data type, validation rules, select options — taken at one
+``Table.schema_version``.  :class:`SchemaCache` keeps the latest snapshot per
+table and rebuilds it only when the schema version moved, so row / cell
+writes never invalidate it.
+
+The batch planner (:mod:`.batch`) validates every operation against a
+snapshot; ``dry_run`` batches stop there and never copy or touch the rows.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from uuid import UUID
+
+from spreadsheet_engine.model import Column, Table
+
+
+@dataclass(frozen=True, slots=True)
+class SchemaSnapshot:
+    table_id: UUID
+    schema_version: int
+    columns: dict[str, Column]
+
+    @classmethod
+    def of(cls, table: Table) -> SchemaSnapshot:
+        return cls(
+            table_id=table.id,
+            schema_version=table.schema_version,
+            columns={
+                key: column.copy(with_values=False) for key, column in table.columns.items()
+            },
+        )
+
+
+class SchemaCache:
+    def __init__(self) -> None:
+        self._snapshots: dict[UUID, SchemaSnapshot] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, table: Table) -> SchemaSnapshot:
+        snapshot = self._snapshots.get(table.id)
+        if snapshot is not None and snapshot.schema_version == table.schema_version:
+            self.hits += 1
+            return snapshot
+        self.misses += 1
+        snapshot = self._snapshots[table.id] = SchemaSnapshot.of(table)
+        return snapshot
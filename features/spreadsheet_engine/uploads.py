@@ -0,0 +1,211 @@
+"""
+Resumable, chunked asset uploads.
+
+``upload_asset`` carries the whole body in one request.  Large design
+documents and gherkin bundles are uploaded in three steps instead:
+
+1. ``start_asset_upload`` opens an :class:`UploadSession` for the asset's
+   metadata (and optionally its announced ``size``).  Starting again with the
+   same ``idempotency_key`` returns the open session with its
+   ``received_bytes``, so an interrupted client resumes where the server
+   stopped;
+2. ``upload_asset_chunk`` appends ``data`` at ``offset``.  Bytes below
+   ``received_bytes`` (a resent chunk) are skipped, a gap is rejected;
+3. ``complete_asset_upload`` hands the staged file to the blob store under
+   its digest and creates the asset.  Completing twice returns the same
+   asset.
+
+Chunks are appended to a staging file and hashed / UTF-8 checked as they
+arrive, so memory use is one chunk whatever the asset size.  ``max_bytes``
+is checked before a chunk is written.  A rejected chunk leaves the session
+as it was (the UTF-8 decoder included), so the client can resend it.
+Sessions not completed within ``ttl_seconds`` are dropped with their
+staging file; :meth:`AssetUploads.close` drops every open one.
+
+Configuration::
+
+    BDD_ASSET_UPLOAD_DIR=<path>            # staging directory (default: tmp)
+    BDD_ASSET_UPLOAD_MAX_BYTES=52428800    # per asset
+    BDD_ASSET_UPLOAD_TTL=86400             # seconds a session stays open
+"""
+
+from __future__ import annotations
+
+import codecs
+import hashlib
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+from uuid import UUID, uuid4
+
+from spreadsheet_engine.errors import AssetUploadError, EntityNotFoundError
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+UPLOAD_DIR = os.environ.get("BDD_ASSET_UPLOAD_DIR") or tempfile.gettempdir()
+MAX_BYTES = int(os.environ.get("BDD_ASSET_UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+TTL_SECONDS = float(os.environ.get("BDD_ASSET_UPLOAD_TTL", "86400"))
+
+
+@dataclass(slots=True)
+class UploadSession:
+    id: UUID
+    project_id: UUID
+    idempotency_key: str | None
+    asset_type: str
+    title: str
+    tags: list[str]
+    size: int | None
+    path: Path
+    expires_at: float
+    received: int = 0
+    sha256: Any = field(default_factory=hashlib.sha256)
+    decoder: codecs.IncrementalDecoder = field(
+        default_factory=lambda: codecs.getincrementaldecoder("utf-8")()
+    )
+    asset_id: UUID | None = None
+
+    @property
+    def digest(self) -> str:
+        return self.sha256.hexdigest()
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "upload_id": self.id,
+            "status": "completed" if self.asset_id is not None else "open",
+            "received_bytes": self.received,
+            "size": self.size,
+            "asset_id": self.asset_id,
+        }
+
+
+class AssetUploads:
+    def __init__(
+        self,
+        directory: str | Path = UPLOAD_DIR,
+        max_bytes: int = MAX_BYTES,
+        ttl_seconds: float = TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.sessions: dict[UUID, UploadSession] = {}
+        self._by_key: dict[tuple[UUID, str], UUID] = {}
+
+    def start(
+        self,
+        project_id: UUID,
+        idempotency_key: str | None,
+        asset_type: str,
+        title: str,
+        tags: list[str],
+        size: int | None = None,
+    ) -> UploadSession:
+        """Open a session, or return the one already open under the key."""
+        self._expire()
+        if idempotency_key:
+            upload_id = self._by_key.get((project_id, idempotency_key))
+            if upload_id is not None:
+                return self.sessions[upload_id]
+        if size is not None and not 0 <= size <= self.max_bytes:
+            raise AssetUploadError(None, f"size {size} exceeds the {self.max_bytes} byte limit")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix="asset-upload-")
+        os.close(fd)
+        session = UploadSession(
+            id=uuid4(),
+            project_id=project_id,
+            idempotency_key=idempotency_key,
+            asset_type=asset_type,
+            title=title,
+            tags=tags,
+            size=size,
+            path=Path(path),
+            expires_at=self.clock() + self.ttl_seconds,
+        )
+        self.sessions[session.id] = session
+        if idempotency_key:
+            self._by_key[(project_id, idempotency_key)] = session.id
+        return session
+
+    def write(self, upload_id: UUID, offset: int, data: bytes) -> UploadSession:
+        """Append the part of *data* past ``received_bytes`` to the staging file."""
+        session = self._open(upload_id)
+        if offset < 0:
+            raise AssetUploadError(upload_id, f"chunk offset {offset} is negative")
+        if offset > session.received:
+            raise AssetUploadError(
+                upload_id, f"chunk at {offset} leaves a gap after {session.received} bytes"
+            )
+        data = data[session.received - offset :]
+        limit = self.max_bytes if session.size is None else session.size
+        if session.received + len(data) > limit:
+            raise AssetUploadError(upload_id, f"upload exceeds {limit} bytes")
+        if data:
+            # -- Roll the decoder back if the chunk is not stored.
+            decoder_state = session.decoder.getstate()
+            try:
+                session.decoder.decode(data)
+                with session.path.open("ab") as handle:
+                    handle.write(data)
+            except UnicodeDecodeError:
+                session.decoder.setstate(decoder_state)
+                raise AssetUploadError(upload_id, "content is not UTF-8 text") from None
+            except BaseException:
+                session.decoder.setstate(decoder_state)
+                os.truncate(session.path, session.received)
+                raise
+            session.sha256.update(data)
+            session.received += len(data)
+        return session
+
+    def finish(self, upload_id: UUID) -> UploadSession:
+        """Validate a fully received session; its staging file is ready to store."""
+        session = self.sessions.get(upload_id)
+        if session is None:
+            raise EntityNotFoundError("Asset upload", upload_id)
+        if session.asset_id is not None:
+            return session
+        if session.size is not None and session.received != session.size:
+            raise AssetUploadError(
+                upload_id, f"received {session.received} of {session.size} bytes"
+            )
+        decoder_state = session.decoder.getstate()
+        try:
+            session.decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            session.decoder.setstate(decoder_state)
+            raise AssetUploadError(upload_id, "content ends inside a UTF-8 sequence") from None
+        return session
+
+    def close(self) -> None:
+        """Drop every session and remove the staging files still open."""
+        for session in self.sessions.values():
+            session.path.unlink(missing_ok=True)
+        self.sessions.clear()
+        self._by_key.clear()
+
+    # -- Internals --
+
+    def _open(self, upload_id: UUID) -> UploadSession:
+        session = self.sessions.get(upload_id)
+        if session is None:
+            raise EntityNotFoundError("Asset upload", upload_id)
+        if session.asset_id is not None:
+            raise AssetUploadError(upload_id, "upload is already completed")
+        return session
+
+    def _expire(self) -> None:
+        now = self.clock()
+        for session in [s for s in self.sessions.values() if s.expires_at <= now]:
+            del self.sessions[session.id]
+            if session.idempotency_key:
+                self._by_key.pop((session.project_id, session.idempotency_key), None)
+            session.path.unlink(missing_ok=True)
@@ -0,0 +1,470 @@
+"""
+Optional NumPy column arrays for whole-column work on the query side.
+
+Evaluating a filter, an aggregate or a formula cell by cell in Python is what
+dominates on wide, 100k-row tables.  When NumPy is importable, a column is
+loaded once per ``(Column.epoch, Table.row_epoch)`` into a typed array over
+all row slots:
+
+* :class:`TypedArray` — the view-typed values (``float64`` numbers,
+  ``datetime64[D]`` dates, ``int32`` dictionary codes for select / text),
+  plus a null mask;
+* :class:`OperandArray` — numbers as formula operands, with per-row masks for
+  empty cells, float values, propagated formula errors and cells the
+  vectorized path cannot reproduce exactly (those fall back per cell).
+
+:func:`filter_mask`, :func:`aggregate` and :func:`evaluate_formula` work on
+those arrays and return ``None`` for anything they do not cover, so callers
+keep their per-cell path as the reference and the fallback.  Results are the
+same as the per-cell path, except that vectorized sums may differ in the last
+bits of a float.
+
+Configuration::
+
+    BDD_ENGINE_VECTORIZE=0               # always use the per-cell path
+    BDD_ENGINE_VECTORIZE_MIN_ROWS=2048   # smaller tables stay per cell
+"""
+
+from __future__ import annotations
+
+import os
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+from spreadsheet_engine.model import Column, Table
+
+try:
+    import numpy as np
+except ImportError:  # -- NumPy is optional; everything has a per-cell path.
+    np = None
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+ENABLED = np is not None and os.environ.get("BDD_ENGINE_VECTORIZE", "1") != "0"
+MIN_ROWS = int(os.environ.get("BDD_ENGINE_VECTORIZE_MIN_ROWS", "2048"))
+
+# Formula error codes by index; 0 means "no error".
+ERRORS = ("", "#VALUE!", "#DIV/0!", "#REF!")
+_VALUE, _DIV0, _REF = 1, 2, 3
+
+# Integers beyond this are not exact in float64 arithmetic: evaluate per cell.
+_EXACT_INT = 2**53
+
+
+class _Fallback:
+    def __repr__(self) -> str:
+        return "FALLBACK"
+
+
+FALLBACK = _Fallback()
+
+
+def enabled(count: int) -> bool:
+    return ENABLED and count >= MIN_ROWS
+
+
+# ---------------------------------------------------------------------------
+# Arrays
+# ---------------------------------------------------------------------------
+@dataclass(slots=True)
+class TypedArray:
+    data: Any
+    null: Any
+    codes: dict[Any, int] | None = None
+
+
+@dataclass(slots=True)
+class OperandArray:
+    data: Any
+    null: Any
+    floaty: Any
+    err: Any
+    fallback: Any
+
+
+def _typed_array(column: Column, to_typed: Callable[[Any], Any]) -> TypedArray:
+    values = [to_typed(value) for value in column.values]
+    null = np.fromiter((value is None for value in values), bool, len(values))
+    if column.data_type == "number":
+        data = np.array([0.0 if value is None else value for value in values], np.float64)
+        return TypedArray(data, null)
+    if column.data_type == "date":
+        return TypedArray(np.array(values, dtype="datetime64[D]"), null)
+    codes: dict[Any, int] = {}
+    data = np.fromiter(
+        (-1 if value is None else codes.setdefault(value, len(codes)) for value in values),
+        np.int32,
+        len(values),
+    )
+    return TypedArray(data, null, codes)
+
+
+def _operand_array(column: Column) -> OperandArray:
+    errors = {code: index for index, code in enumerate(ERRORS) if code}
+    data, null, floaty, err, fallback = [], [], [], [], []
+    for value in column.values:
+        kind = type(value)
+        number, is_null, is_float, code, slow = 0, False, False, 0, False
+        if value is None or value == "":
+            is_null = True
+        elif kind is int and -_EXACT_INT < value < _EXACT_INT:
+            number = value
+        elif kind is float:
+            number, is_float = value, True
+        elif kind is str and column.formula and value in errors:
+            code = errors[value]
+        else:
+            slow = True
+        data.append(number)
+        null.append(is_null)
+        floaty.append(is_float)
+        err.append(code)
+        fallback.append(slow)
+    return OperandArray(
+        np.array(data, np.float64),
+        np.array(null, bool),
+        np.array(floaty, bool),
+        np.array(err, np.int8),
+        np.array(fallback, bool),
+    )
+
+
+def _date_operand(column: Column) -> tuple[Any, Any]:
+    """``(dates, err)``; unparsable cells (empty ones too) are ``#VALUE!``."""
+    errors = {code: index for index, code in enumerate(ERRORS) if code}
+    dates, err = [], []
+    for value in column.values:
+        if column.formula and isinstance(value, str) and value in errors:
+            dates.append(None)
+            err.append(errors[value])
+            continue
+        try:
+            dates.append(date.fromisoformat(str(value)))
+            err.append(0)
+        except ValueError:
+            dates.append(None)
+            err.append(-_VALUE)  # -- Raised by DAYS itself, after its arguments.
+    return np.array(dates, dtype="datetime64[D]"), np.array(err, np.int8)
+
+
+class ArrayCache:
+    """Arrays per ``(table, column, kind)``, rebuilt when the column moved."""
+
+    def __init__(self) -> None:
+        self._arrays: dict[tuple, tuple[tuple[int, int], Any]] = {}
+        self.builds = 0
+
+    def _get(self, table: Table, column: Column, kind: str, build: Callable[[], Any]) -> Any:
+        key = (table.id, column.key, kind)
+        epoch = (column.epoch, table.row_epoch)
+        cached = self._arrays.get(key)
+        if cached is None or cached[0] != epoch:
+            cached = self._arrays[key] = (epoch, build())
+            self.builds += 1
+        return cached[1]
+
+    def typed(
+        self, table: Table, column: Column, to_typed: Callable[[Any], Any]
+    ) -> TypedArray:
+        return self._get(table, column, "typed", lambda: _typed_array(column, to_typed))
+
+    def operand(self, table: Table, column: Column) -> OperandArray:
+        return self._get(table, column, "operand", lambda: _operand_array(column))
+
+    def dates(self, table: Table, column: Column) -> tuple[Any, Any]:
+        return self._get(table, column, "dates", lambda: _date_operand(column))
+
+
+# ---------------------------------------------------------------------------
+# Filters / aggregates
+# ---------------------------------------------------------------------------
+def filter_mask(
+    array: TypedArray, data_type: str, operator: str, value: Any
+) -> Any | None:
+    """Boolean mask over all slots for one view condition, or ``None``."""
+    if data_type == "multi_select" or operator == "contains":
+        return None
+    if operator == "is_empty":
+        return array.null
+    if operator == "is_not_empty":
+        return ~array.null
+
+    if array.codes is not None:
+        if operator in ("eq", "neq"):
+            hits = array.data == array.codes.get(value, -2)
+        elif operator in ("in", "not_in"):
+            wanted = [array.codes[item] for item in value if item in array.codes]
+            hits = np.isin(array.data, wanted + ([-1] if None in value else []))
+        else:
+            return None
+        return ~hits if operator in ("neq", "not_in") else hits
+
+    def scalar(item: Any) -> Any:
+        return np.datetime64(item, "D") if data_type == "date" else float(item)
+
+    present = ~array.null
+    if operator in ("in", "not_in"):
+        wanted = [scalar(item) for item in value if item is not None]
+        hits = np.isin(array.data, wanted) & present
+        if None in value:
+            hits |= array.null
+        return ~hits if operator == "not_in" else hits
+    target = scalar(value)
+    compare = {
+        "eq": np.equal,
+        "neq": np.equal,
+        "gt": np.greater,
+        "gte": np.greater_equal,
+        "lt": np.less,
+        "lte": np.less_equal,
+    }[operator]
+    hits = compare(array.data, target) & present
+    return ~hits if operator == "neq" else hits
+
+
+def aggregate(array: TypedArray, data_type: str, function: str, slots: list[int]) -> Any:
+    """``count`` / ``empty`` / ``sum`` / ``avg`` / ``min`` / ``max`` over *slots*."""
+    index = np.asarray(slots, dtype=np.intp)
+    null = array.null[index]
+    if function == "empty":
+        return int(null.sum())
+    if function == "count":
+        return int(len(index) - null.sum())
+    values = array.data[index][~null]
+    if function in ("sum", "avg"):
+        if function == "sum":
+            return float(values.sum())
+        return float(values.mean()) if len(values) else None
+    if not len(values):
+        return None
+    extreme = values.min() if function == "min" else values.max()
+    if data_type == "date":
+        return extreme.astype(object).isoformat()
+    return float(extreme)
+
+
+# ---------------------------------------------------------------------------
+# Formulas
+# ---------------------------------------------------------------------------
+@dataclass(slots=True)
+class _Vec:
+    data: Any  # float64, or bool for comparisons
+    floaty: Any  # per row: the scalar result would be a float (not an int)
+    err: Any  # int8 error code per row
+    fallback: Any  # per row: evaluate per cell instead
+    null: Any = None  # per row: the referenced cell is empty (direct refs only)
+
+
+def _first_error(*errors: Any) -> Any:
+    """Per row, the first non-zero error code in evaluation order."""
+    result = errors[-1]
+    for err in reversed(errors[:-1]):
+        result = np.where(err != 0, err, result)
+    return result
+
+
+def _numeric(vec: _Vec) -> _Vec:
+    if vec.data.dtype == bool:
+        floaty = np.zeros_like(vec.data)
+        return _Vec(vec.data.astype(np.float64), floaty, vec.err, vec.fallback)
+    return vec
+
+
+def _exact(vec: _Vec) -> _Vec:
+    """Integer results too large for float64 are recomputed per cell."""
+    vec.fallback = vec.fallback | (~vec.floaty & (np.abs(vec.data) >= _EXACT_INT))
+    return vec
+
+
+class _Evaluator:
+    def __init__(self, table: Table, cache: ArrayCache) -> None:
+        self.table = table
+        self.cache = cache
+        self.size = len(table.row_ids)
+        self.no_error = np.zeros(self.size, np.int8)
+        self.no_rows = np.zeros(self.size, bool)
+
+    def constant(self, value: Any) -> _Vec:
+        if isinstance(value, bool):
+            data = np.full(self.size, value, bool)
+            return _Vec(data, self.no_rows, self.no_error, self.no_rows)
+        floaty = np.full(self.size, isinstance(value, float), bool)
+        data = np.full(self.size, value, np.float64)
+        return _Vec(data, floaty, self.no_error, self.no_rows)
+
+    def ref(self, key: str) -> _Vec:
+        column = self.table.columns.get(key)
+        if column is None:
+            vec = self.constant(0)
+            vec.err = np.full(self.size, _REF, np.int8)
+            return vec
+        array = self.cache.operand(self.table, column)
+        return _Vec(array.data, array.floaty, array.err, array.fallback, array.null)
+
+    def evaluate(self, node: tuple) -> _Vec | None:
+        kind = node[0]
+        if kind in ("num", "bool"):
+            return self.constant(node[1])
+        if kind == "ref":
+            return self.ref(node[1])
+        if kind == "neg":
+            operand = self.evaluate(node[1])
+            if operand is None:
+                return None
+            operand = _numeric(operand)
+            return _Vec(-operand.data, operand.floaty, operand.err, operand.fallback)
+        if kind == "bin":
+            return self.binary(node[1], node[2], node[3])
+        if kind == "cmp":
+            return self.compare(node[1], node[2], node[3])
+        if kind == "if":
+            return self.condition(*node[1:])
+        if kind == "call":
+            return self.call(node[1], node[2])
+        return None
+
+    def binary(self, op: str, left_node: tuple, right_node: tuple) -> _Vec | None:
+        if op == "&":
+            return None
+        left, right = self.evaluate(left_node), self.evaluate(right_node)
+        if left is None or right is None:
+            return None
+        left, right = _numeric(left), _numeric(right)
+        err = _first_error(left.err, right.err)
+        fallback = left.fallback | right.fallback
+        if op == "/":
+            zero = right.data == 0
+            err = np.where((err == 0) & zero, _DIV0, err)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                data = np.where(zero, 0.0, left.data / np.where(zero, 1.0, right.data))
+            return _Vec(data, np.ones(self.size, bool), err, fallback)
+        data = {"+": np.add, "-": np.subtract, "*": np.multiply}[op](left.data, right.data)
+        return _exact(_Vec(data, left.floaty | right.floaty, err, fallback))
+
+    def compare(self, op: str, left_node: tuple, right_node: tuple) -> _Vec | None:
+        left, right = self.evaluate(left_node), self.evaluate(right_node)
+        if left is None or right is None:
+            return None
+        fallback = left.fallback | right.fallback
+        # -- An empty operand compares as text in the per-cell path.
+        for vec in (left, right):
+            if vec.null is not None:
+                fallback = fallback | vec.null
+        compare = {
+            "=": np.equal,
+            "<>": np.not_equal,
+            "!=": np.not_equal,
+            "<": np.less,
+            "<=": np.less_equal,
+            ">": np.greater,
+            ">=": np.greater_equal,
+        }[op]
+        data = compare(_numeric(left).data, _numeric(right).data)
+        return _Vec(data, self.no_rows, _first_error(left.err, right.err), fallback)
+
+    def condition(self, test_node: tuple, then_node: tuple, else_node: tuple) -> _Vec | None:
+        if else_node[0] == "none":
+            return None
+        test, then, otherwise = map(self.evaluate, (test_node, then_node, else_node))
+        if test is None or then is None or otherwise is None:
+            return None
+        if (then.data.dtype == bool) != (otherwise.data.dtype == bool):
+            return None
+        chosen = test.data != 0
+        null = None
+        if then.null is not None or otherwise.null is not None:
+            null = np.where(
+                chosen,
+                then.null if then.null is not None else self.no_rows,
+                otherwise.null if otherwise.null is not None else self.no_rows,
+            )
+        return _Vec(
+            np.where(chosen, then.data, otherwise.data),
+            np.where(chosen, then.floaty, otherwise.floaty),
+            _first_error(test.err, np.where(chosen, then.err, otherwise.err)),
+            test.fallback | np.where(chosen, then.fallback, otherwise.fallback),
+            null,
+        )
+
+    def call(self, name: str, arg_nodes: tuple) -> _Vec | None:
+        if name == "DAYS":
+            return self.days(arg_nodes)
+        if name == "ROUND" and not (len(arg_nodes) == 1 or arg_nodes[1:] == (("num", 0),)):
+            return None
+        if name not in ("ABS", "ROUND", "SUM", "MIN", "MAX", "AVERAGE"):
+            return None
+        args = [self.evaluate(node) for node in arg_nodes]
+        if not args or any(arg is None for arg in args):
+            return None
+        args = [_numeric(arg) for arg in args]
+        err = _first_error(*(arg.err for arg in args))
+        fallback = np.logical_or.reduce([arg.fallback for arg in args])
+        if name in ("ABS", "ROUND"):
+            (arg,) = args[:1]
+            data = np.abs(arg.data) if name == "ABS" else np.round(arg.data)
+            return _exact(_Vec(data, arg.floaty, err, fallback))
+        data, floaty = args[0].data, args[0].floaty
+        for arg in args[1:]:
+            if name in ("SUM", "AVERAGE"):
+                data, floaty = data + arg.data, floaty | arg.floaty
+            else:
+                better = arg.data < data if name == "MIN" else arg.data > data
+                data = np.where(better, arg.data, data)
+                floaty = np.where(better, arg.floaty, floaty)
+        if name == "AVERAGE":
+            return _Vec(data / len(args), np.ones(self.size, bool), err, fallback)
+        return _exact(_Vec(data, floaty, err, fallback))
+
+    def days(self, arg_nodes: tuple) -> _Vec | None:
+        if len(arg_nodes) != 2 or any(node[0] != "ref" for node in arg_nodes):
+            return None
+        loaded = []
+        for (_, key) in arg_nodes:
+            column = self.table.columns.get(key)
+            if column is None:
+                dates = np.full(self.size, "NaT", dtype="datetime64[D]")
+                loaded.append((dates, np.full(self.size, _REF, np.int8)))
+            else:
+                loaded.append(self.cache.dates(self.table, column))
+        (end, end_err), (start, start_err) = loaded
+        # -- Propagated errors surface while reading the arguments, before
+        # -- DAYS parses them (negative codes).
+        err = _first_error(
+            np.where(end_err > 0, end_err, 0),
+            np.where(start_err > 0, start_err, 0),
+            np.where((end_err < 0) | (start_err < 0), _VALUE, 0).astype(np.int8),
+        )
+        data = np.where(err == 0, (end - start).astype("timedelta64[D]").astype(np.int64), 0)
+        return _Vec(data.astype(np.float64), self.no_rows, err, self.no_rows)
+
+
+def evaluate_formula(
+    tree: tuple, table: Table, slots: list[int], cache: ArrayCache
+) -> list[Any] | None:
+    """Formula values for *slots*; :data:`FALLBACK` marks per-cell rows."""
+    vec = _Evaluator(table, cache).evaluate(tree)
+    if vec is None:
+        return None
+    index = np.asarray(slots, dtype=np.intp)
+    data = vec.data[index]
+    if data.dtype == bool:
+        values = data.tolist()
+    else:
+        floats = data.tolist()
+        ints = np.where(np.isfinite(data), data, 0).astype(np.int64).tolist()
+        values = [
+            number if is_float else integer
+            for number, integer, is_float in zip(floats, ints, vec.floaty[index].tolist())
+        ]
+    err = vec.err[index]
+    for position in np.flatnonzero(err).tolist():
+        values[position] = ERRORS[err[position]]
+    fallback = vec.fallback[index]
+    if vec.null is not None:
+        fallback = fallback | vec.null[index]
+    for position in np.flatnonzero(fallback).tolist():
+        values[position] = FALLBACK
+    return values
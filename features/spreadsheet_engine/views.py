@@ -0,0 +1,551 @@
+"""
+Compiled view filters / sorts and the column indexes that serve them.
+
+A view's free-form ``filters`` / ``sorts`` are compiled once per
+``(view.id, view.version)`` — and the data types of the columns they
+reference — into a :class:`CompiledView`: typed conditions plus typed sort
+keys.  Two spellings are accepted, matching what the controllers pass
+through::
+
+    filters = {"expr": "状态 = 待确认 and 预计结束 >= 2024-01-01"}
+    filters = {"conjunction": "and",
+               "conditions": [{"column_key": "status", "operator": "eq",
+                               "value": "待确认"}]}
+    sorts = [{"expr": "预计结束 asc"}]
+    sorts = [{"column_key": "planned_end", "direction": "desc"}]
+
+Columns that keep being filtered get a :class:`ColumnIndex` (value -> slots
+for ``select`` columns, a sorted ``(date, slot)`` list for ``date``
+columns).  Indexes are rebuilt lazily when the column's or the table's row
+epoch moved, so kanban / grid views of big tables start from the matching
+slots instead of scanning every cell.  The conditions left over are
+evaluated on NumPy column arrays when available (:mod:`.vector`), as are
+the ``count`` / ``empty`` / ``sum`` / ``avg`` / ``min`` / ``max``
+aggregates of :meth:`ViewPlanner.aggregate`.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any
+
+from spreadsheet_engine import vector
+from spreadsheet_engine.errors import EntityNotFoundError, InvalidViewSpecError
+from spreadsheet_engine.model import Column, Table, View
+
+# Filtering the same column this many times makes it worth indexing.
+INDEX_AFTER_HITS = 2
+
+INDEXED_TYPES = ("select", "date")
+
+AGGREGATES = {
+    "count": None,
+    "empty": None,
+    "sum": ("number",),
+    "avg": ("number",),
+    "min": ("number", "date"),
+    "max": ("number", "date"),
+}
+
+# Keys a ``filters`` object may carry; anything else is a spelling mistake.
+_FILTER_KEYS = frozenset({"expr", "conjunction", "conditions"})
+
+_OPERATOR_ALIASES = {
+    "=": "eq",
+    "==": "eq",
+    "!=": "neq",
+    "<>": "neq",
+    ">": "gt",
+    ">=": "gte",
+    "<": "lt",
+    "<=": "lte",
+    "in": "in",
+    "not in": "not_in",
+    "contains": "contains",
+    "is empty": "is_empty",
+    "is not empty": "is_not_empty",
+}
+_OPERATORS = set(_OPERATOR_ALIASES.values())
+_RANGE_OPERATORS = ("gt", "gte", "lt", "lte")
+
+_EXPR_CONDITION = re.compile(
+    r"^\s*(?P<column>.+?)\s*"
+    r"(?P<op>!=|<>|>=|<=|==|=|>|<|\s+not in\s+|\s+in\s+|\s+contains\s+"
+    r"|\s+is not empty$|\s+is empty$)"
+    r"\s*(?P<value>.*?)\s*$",
+    re.IGNORECASE,
+)
+_EXPR_SPLIT = re.compile(r"\s+(and|or)\s+", re.IGNORECASE)
+
+
+# ---------------------------------------------------------------------------
+# Typed values
+# ---------------------------------------------------------------------------
+def _as_date(value: Any) -> date | None:
+    if value is None or value == "":
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def _as_number(value: Any) -> float | None:
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_options(value: Any) -> frozenset[str]:
+    if value is None or value == "":
+        return frozenset()
+    if isinstance(value, list | tuple | set | frozenset):
+        return frozenset(str(item) for item in value)
+    return frozenset(part.strip() for part in str(value).split(",") if part.strip())
+
+
+def typed(data_type: str) -> Callable[[Any], Any]:
+    """Cell/filter value normalizer for a ``ColumnDataType``."""
+    if data_type == "number":
+        return _as_number
+    if data_type == "date":
+        return _as_date
+    if data_type == "multi_select":
+        return _as_options
+    return lambda value: None if value is None or value == "" else str(value)
+
+
+# ---------------------------------------------------------------------------
+# Compilation
+# ---------------------------------------------------------------------------
+@dataclass(slots=True)
+class Condition:
+    column_key: str
+    operator: str
+    value: Any
+    test: Callable[[Any], bool]
+
+
+@dataclass(slots=True)
+class CompiledView:
+    view_id: Any
+    version: int
+    signature: tuple
+    conjunction: str
+    conditions: list[Condition] = field(default_factory=list)
+    sorts: list[tuple[str, bool]] = field(default_factory=list)
+
+
+def _parse_expr_filters(expr: str) -> tuple[str, list[dict[str, Any]]]:
+    parts = _EXPR_SPLIT.split(expr.strip())
+    clauses, joiners = parts[::2], {joiner.lower() for joiner in parts[1::2]}
+    if len(joiners) > 1:
+        raise InvalidViewSpecError(f"cannot mix 'and' / 'or' in {expr!r}")
+    conditions = []
+    for clause in clauses:
+        match = _EXPR_CONDITION.match(clause)
+        if match is None:
+            raise InvalidViewSpecError(f"cannot parse filter clause {clause!r}")
+        operator = _OPERATOR_ALIASES[" ".join(match["op"].lower().split())]
+        value: Any = match["value"]
+        if operator in ("in", "not_in"):
+            value = [item.strip() for item in value.split(",") if item.strip()]
+        conditions.append(
+            {"column_key": match["column"], "operator": operator, "value": value}
+        )
+    return (joiners.pop() if joiners else "and"), conditions
+
+
+def _filter_spec(filters: dict[str, Any]) -> tuple[str, list[dict[str, Any]]]:
+    if not filters:
+        return "and", []
+    unknown = set(filters) - _FILTER_KEYS
+    if unknown:
+        raise InvalidViewSpecError(f"unknown filter keys {sorted(map(str, unknown))}")
+    if "expr" in filters:
+        if "conditions" in filters:
+            raise InvalidViewSpecError("give either 'expr' or 'conditions', not both")
+        return _parse_expr_filters(str(filters["expr"]))
+    if "conditions" not in filters:
+        raise InvalidViewSpecError("filters need 'expr' or 'conditions'")
+    conjunction = str(filters.get("conjunction", "and")).lower()
+    if conjunction not in ("and", "or"):
+        raise InvalidViewSpecError(f"unknown conjunction {conjunction!r}")
+    conditions = filters["conditions"] or []
+    if not isinstance(conditions, list) or not all(
+        isinstance(condition, dict) for condition in conditions
+    ):
+        raise InvalidViewSpecError("'conditions' must be a list of objects")
+    return conjunction, list(conditions)
+
+
+def check_view_spec(filters: dict[str, Any], sorts: list[dict[str, str]]) -> None:
+    """Reject malformed ``filters`` / ``sorts`` (column keys are checked on read)."""
+    _filter_spec(filters)
+    _sort_spec(sorts)
+
+
+def _sort_spec(sorts: list[dict[str, str]]) -> list[tuple[str, bool]]:
+    compiled = []
+    for sort in sorts or []:
+        if "expr" in sort:
+            column, _, direction = str(sort["expr"]).strip().rpartition(" ")
+            if direction.lower() not in ("asc", "desc"):
+                column, direction = str(sort["expr"]).strip(), "asc"
+        else:
+            column, direction = sort.get("column_key", ""), sort.get("direction", "asc")
+        if direction.lower() not in ("asc", "desc"):
+            raise InvalidViewSpecError(f"unknown sort direction {direction!r}")
+        compiled.append((column.strip(), direction.lower() == "desc"))
+    return compiled
+
+
+def _make_test(column: Column, operator: str, raw: Any) -> tuple[Any, Callable]:
+    to_typed = typed(column.data_type)
+    if operator == "is_empty":
+        return None, lambda cell: to_typed(cell) in (None, frozenset())
+    if operator == "is_not_empty":
+        return None, lambda cell: to_typed(cell) not in (None, frozenset())
+
+    if column.data_type == "multi_select":
+        wanted = _as_options(raw)
+        if operator in ("eq",):
+            return wanted, lambda cell: _as_options(cell) == wanted
+        if operator in ("in", "contains"):
+            return wanted, lambda cell: bool(_as_options(cell) & wanted)
+        if operator in ("neq", "not_in"):
+            return wanted, lambda cell: not (_as_options(cell) & wanted)
+        raise InvalidViewSpecError(f"{operator!r} is not supported for multi_select")
+
+    if operator in ("in", "not_in"):
+        items = raw if isinstance(raw, list | tuple) else [raw]
+        wanted = frozenset(to_typed(item) for item in items)
+        if operator == "in":
+            return wanted, lambda cell: to_typed(cell) in wanted
+        return wanted, lambda cell: to_typed(cell) not in wanted
+
+    if operator == "contains":
+        needle = str(raw)
+        return needle, lambda cell: cell is not None and needle in str(cell)
+
+    value = to_typed(raw)
+    if value is None:
+        raise InvalidViewSpecError(
+            f"{raw!r} is not a valid {column.data_type} value for {column.key!r}"
+        )
+    if operator == "eq":
+        return value, lambda cell: to_typed(cell) == value
+    if operator == "neq":
+        return value, lambda cell: to_typed(cell) != value
+
+    def ranged(compare: Callable[[Any, Any], bool]) -> Callable[[Any], bool]:
+        def test(cell: Any) -> bool:
+            cell_value = to_typed(cell)
+            return cell_value is not None and compare(cell_value, value)
+
+        return test
+
+    return value, ranged(
+        {
+            "gt": lambda a, b: a > b,
+            "gte": lambda a, b: a >= b,
+            "lt": lambda a, b: a < b,
+            "lte": lambda a, b: a <= b,
+        }[operator]
+    )
+
+
+def _referenced_columns(view: View) -> list[str]:
+    _, conditions = _filter_spec(view.filters)
+    keys = [str(condition.get("column_key", "")) for condition in conditions]
+    return keys + [column for column, _ in _sort_spec(view.sorts)]
+
+
+def _signature(table: Table, keys: list[str]) -> tuple:
+    signature = []
+    for key in keys:
+        try:
+            column = table.column(key)
+        except EntityNotFoundError:
+            signature.append((key, None))
+        else:
+            signature.append((key, column.key, column.data_type))
+    return tuple(signature)
+
+
+def compile_view(view: View, table: Table) -> CompiledView:
+    conjunction, specs = _filter_spec(view.filters)
+    conditions = []
+    for spec in specs:
+        raw_operator = str(spec.get("operator", "eq"))
+        operator = _OPERATOR_ALIASES.get(raw_operator, raw_operator)
+        if operator not in _OPERATORS:
+            raise InvalidViewSpecError(f"unknown filter operator {raw_operator!r}")
+        column = table.column(str(spec.get("column_key", "")))
+        value, test = _make_test(column, operator, spec.get("value"))
+        conditions.append(Condition(column.key, operator, value, test))
+    sorts = [
+        (table.column(key).key, descending) for key, descending in _sort_spec(view.sorts)
+    ]
+    return CompiledView(
+        view_id=view.id,
+        version=view.version,
+        signature=_signature(table, _referenced_columns(view)),
+        conjunction=conjunction,
+        conditions=conditions,
+        sorts=sorts,
+    )
+
+
+# ---------------------------------------------------------------------------
+# Indexes
+# ---------------------------------------------------------------------------
+@dataclass(slots=True)
+class ColumnIndex:
+    """Value index over the live slots of one ``select`` / ``date`` column."""
+
+    data_type: str
+    epoch: tuple[int, int]
+    by_value: dict[Any, list[int]] = field(default_factory=dict)
+    ordered: list[tuple[date, int]] = field(default_factory=list)
+    dates: list[date] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, table: Table, column: Column) -> ColumnIndex:
+        index = cls(column.data_type, (column.epoch, table.row_epoch))
+        to_typed = typed(column.data_type)
+        for slot in table.row_slots.values():
+            value = to_typed(column.values[slot])
+            if value is None:
+                continue
+            if column.data_type == "date":
+                index.ordered.append((value, slot))
+            else:
+                index.by_value.setdefault(value, []).append(slot)
+        index.ordered.sort()
+        index.dates = [value for value, _ in index.ordered]
+        return index
+
+    def lookup(self, condition: Condition) -> set[int] | None:
+        """Slots matching *condition*, or ``None`` if the index cannot tell."""
+        operator, value = condition.operator, condition.value
+        if self.data_type == "select":
+            if operator == "eq":
+                return set(self.by_value.get(value, ()))
+            if operator == "in":
+                return {slot for item in value for slot in self.by_value.get(item, ())}
+            return None
+        if operator == "eq":
+            lo, hi = bisect_left(self.dates, value), bisect_right(self.dates, value)
+        elif operator in _RANGE_OPERATORS:
+            lo, hi = {
+                "gt": (bisect_right(self.dates, value), len(self.dates)),
+                "gte": (bisect_left(self.dates, value), len(self.dates)),
+                "lt": (0, bisect_left(self.dates, value)),
+                "lte": (0, bisect_right(self.dates, value)),
+            }[operator]
+        else:
+            return None
+        return {slot for _, slot in self.ordered[lo:hi]}
+
+
+# ---------------------------------------------------------------------------
+# Planner
+# ---------------------------------------------------------------------------
+class ViewPlanner:
+    """Caches compiled views, column indexes and the last result per view."""
+
+    def __init__(self) -> None:
+        self.plans: dict[Any, CompiledView] = {}
+        self.indexes: dict[tuple[Any, str], ColumnIndex] = {}
+        self.filter_hits: dict[tuple[Any, str], int] = {}
+        self._results: dict[Any, tuple[tuple, list[int]]] = {}
+        self._positions: dict[Any, tuple[tuple, dict[int, int]]] = {}
+        self.arrays = vector.ArrayCache()
+        self.compilations = 0
+
+    def plan(self, view: View, table: Table) -> CompiledView:
+        plan = self.plans.get(view.id)
+        if (
+            plan is None
+            or plan.version != view.version
+            or plan.signature != _signature(table, _referenced_columns(view))
+        ):
+            plan = compile_view(view, table)
+            self.plans[view.id] = plan
+            self.compilations += 1
+        return plan
+
+    def forget(self, view_id: Any) -> None:
+        self.plans.pop(view_id, None)
+        self._results.pop(view_id, None)
+        self._positions.pop(view_id, None)
+
+    def _index(self, table: Table, column: Column) -> ColumnIndex | None:
+        if column.data_type not in INDEXED_TYPES:
+            return None
+        key = (table.id, column.key)
+        self.filter_hits[key] = self.filter_hits.get(key, 0) + 1
+        if self.filter_hits[key] < INDEX_AFTER_HITS:
+            return None
+        index = self.indexes.get(key)
+        if index is None or index.epoch != (column.epoch, table.row_epoch):
+            index = ColumnIndex.build(table, column)
+            self.indexes[key] = index
+        return index
+
+    def rows(self, view: View, table: Table) -> list[int]:
+        """Live slots of *table* that pass the view, in view order."""
+        plan = self.plan(view, table)
+        result_key = (plan.version, plan.signature, table.id, table.version)
+        cached = self._results.get(view.id)
+        if cached is not None and cached[0] == result_key:
+            return cached[1]
+
+        slots = self._filter(plan, table)
+        for column_key, descending in reversed(plan.sorts):
+            slots = _sorted(slots, table.columns[column_key], descending)
+        self._results[view.id] = (result_key, slots)
+        return slots
+
+    def position(self, view: View, table: Table, slot: int) -> int | None:
+        """Index of *slot* in :meth:`rows` (built once per result); ``None``
+        when the slot is not part of the view.
+        """
+        slots = self.rows(view, table)
+        result_key = self._results[view.id][0]
+        cached = self._positions.get(view.id)
+        if cached is None or cached[0] != result_key:
+            cached = (result_key, {slot: index for index, slot in enumerate(slots)})
+            self._positions[view.id] = cached
+        return cached[1].get(slot)
+
+    def _filter(self, plan: CompiledView, table: Table) -> list[int]:
+        live = table.live_slots()
+        if not plan.conditions:
+            return live
+
+        # -- Index lookups narrow the candidate set without touching cells.
+        remaining: list[Condition] = []
+        matched: list[set[int]] = []
+        for condition in plan.conditions:
+            index = self._index(table, table.columns[condition.column_key])
+            hits = index.lookup(condition) if index is not None else None
+            if hits is None:
+                remaining.append(condition)
+            else:
+                matched.append(hits)
+
+        # -- Whole-column masks for what the indexes could not answer.
+        masks = []
+        if remaining and vector.enabled(len(live)):
+            per_cell = []
+            for condition in remaining:
+                mask = self._mask(table, condition)
+                if mask is None:
+                    per_cell.append(condition)
+                else:
+                    masks.append(mask)
+            remaining = per_cell
+
+        if plan.conjunction == "and":
+            candidates = live
+            if matched:
+                allowed = set.intersection(*matched)
+                candidates = [slot for slot in live if slot in allowed]
+            if masks:
+                candidates = _masked(candidates, vector.np.logical_and.reduce(masks))
+            for condition in remaining:
+                values, test = table.columns[condition.column_key].values, condition.test
+                candidates = [slot for slot in candidates if test(values[slot])]
+            return candidates
+
+        allowed = set().union(*matched) if matched else set()
+        if masks:
+            allowed.update(_masked(live, vector.np.logical_or.reduce(masks)))
+        for condition in remaining:
+            values, test = table.columns[condition.column_key].values, condition.test
+            allowed.update(slot for slot in live if test(values[slot]))
+        return [slot for slot in live if slot in allowed]
+
+    def _mask(self, table: Table, condition: Condition) -> Any | None:
+        column = table.columns[condition.column_key]
+        if column.data_type == "multi_select":
+            return None
+        array = self.arrays.typed(table, column, typed(column.data_type))
+        return vector.filter_mask(
+            array, column.data_type, condition.operator, condition.value
+        )
+
+    def aggregate(
+        self, table: Table, slots: list[int], specs: list[dict[str, Any]]
+    ) -> list[dict[str, Any]]:
+        """``[{"column_key", "function", "value"}]`` over *slots* (e.g. a view's rows)."""
+        results = []
+        for spec in specs:
+            column = table.column(str(spec.get("column_key", "")))
+            function = str(spec.get("function", "count")).lower()
+            if function not in AGGREGATES:
+                raise InvalidViewSpecError(f"unknown aggregate {function!r}")
+            allowed = AGGREGATES[function]
+            if allowed is not None and column.data_type not in allowed:
+                raise InvalidViewSpecError(
+                    f"{function!r} is not supported for {column.data_type} "
+                    f"column {column.key!r}"
+                )
+            to_typed = typed(column.data_type)
+            if vector.enabled(len(slots)) and column.data_type != "multi_select":
+                array = self.arrays.typed(table, column, to_typed)
+                value = vector.aggregate(array, column.data_type, function, slots)
+            else:
+                value = _aggregate(column, to_typed, function, slots)
+            results.append({"column_key": column.key, "function": function, "value": value})
+        return results
+
+
+def _masked(slots: list[int], mask: Any) -> list[int]:
+    """*slots* (in their order) whose entry in the slot-indexed *mask* is set."""
+    index = vector.np.asarray(slots, dtype=vector.np.intp)
+    return index[mask[index]].tolist()
+
+
+def _aggregate(
+    column: Column, to_typed: Callable[[Any], Any], function: str, slots: list[int]
+) -> Any:
+    values = [to_typed(column.values[slot]) for slot in slots]
+    present = [value for value in values if value not in (None, frozenset())]
+    if function == "count":
+        return len(present)
+    if function == "empty":
+        return len(values) - len(present)
+    if function == "sum":
+        return float(sum(present))
+    if function == "avg":
+        return sum(present) / len(present) if present else None
+    if not present:
+        return None
+    extreme = min(present) if function == "min" else max(present)
+    return extreme.isoformat() if column.data_type == "date" else float(extreme)
+
+
+def _sorted(slots: list[int], column: Column, descending: bool) -> list[int]:
+    """Stable typed sort with empty cells last in either direction."""
+    to_typed = typed(column.data_type)
+    if column.data_type == "multi_select":
+        # -- Option sets have no total order; sort by their sorted members.
+        to_key = lambda value: tuple(sorted(to_typed(value))) or None  # noqa: E731
+    else:
+        to_key = to_typed
+    keyed = [(to_key(column.values[slot]), slot) for slot in slots]
+    present = [item for item in keyed if item[0] is not None]
+    present.sort(key=lambda item: item[0], reverse=descending)
+    return [slot for _, slot in present] + [slot for value, slot in keyed if value is None]
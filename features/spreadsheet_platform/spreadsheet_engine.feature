@@ -0,0 +1,484 @@
+@engine
+Feature: In-memory spreadsheet engine
+    The stateful engine behind the DB-free integration stage keeps the
+    semantics the SQL implementation is measured against.
+
+    Background:
+        Given an engine table "T1" with columns
+            | key   | data_type | formula          |
+            | qty   | number    |                  |
+            | price | number    |                  |
+            | label | text      |                  |
+            | total | number    | ={qty} * {price} |
+        And engine table "T1" has rows
+            | row | qty | price | label  |
+            | R1  | 2   | 5     | "bolt" |
+            | R2  | 1   | 3     | "nut"  |
+
+    Rule: Rows are created, read, updated and deleted through versioned writes
+        Scenario: Add a row
+            When the actor adds row "R3" to "T1"
+                | column | value    |
+                | qty    | 4        |
+                | label  | "washer" |
+            Then the engine accepts the request
+            And "T1" has rows "R1", "R2", "R3"
+            And row "R3" of "T1" has "label" = "washer"
+            And the version of "T1" advanced by 1
+
+        Scenario: Update a cell
+            When the actor sets "label" of row "R1" in "T1" to "screw"
+            Then the engine accepts the request
+            And row "R1" of "T1" has "label" = "screw"
+
+        Scenario: Delete a row
+            When the actor deletes row "R2" from "T1"
+            Then the engine accepts the request
+            And "T1" has rows "R1"
+
+        Scenario: Upsert rows updates the rows that exist and adds the rest
+            When the actor upserts rows into "T1"
+                | row | qty | label   |
+                | R1  | 7   |         |
+                | R3  |     | "rivet" |
+            Then the engine accepts the request
+            And "T1" has rows "R1", "R2", "R3"
+            And row "R1" of "T1" has "qty" = 7
+            And row "R1" of "T1" has "label" = "bolt"
+            And row "R3" of "T1" has "label" = "rivet"
+
+        Scenario: Reject a cell that does not fit its column
+            When the actor sets "qty" of row "R1" in "T1" to "many"
+            Then the engine rejects the request with status 422
+            And the version of "T1" is unchanged
+
+        Scenario: Reject a write to a missing row
+            When the actor deletes row "R9" from "T1"
+            Then the engine rejects the request with status 404
+
+    Rule: Stale writes conflict instead of overwriting
+        Scenario: Reject a write expecting an old table version
+            When the actor sets "label" of row "R1" in "T1" to "screw"
+            And the actor sets "label" of row "R2" in "T1" to "pin" expecting table version 1
+            Then the engine rejects the request with status 409
+            And row "R2" of "T1" has "label" = "nut"
+
+        Scenario: Row versions only conflict on the row that moved on
+            When the actor sets "label" of row "R1" in "T1" to "screw"
+            And the actor sets "label" of row "R2" in "T1" to "pin" expecting row version 7
+            Then the engine accepts the request
+            And row "R2" of "T1" has "label" = "pin"
+
+        Scenario: Reject a stale row version
+            When the actor sets "label" of row "R1" in "T1" to "screw"
+            And the actor sets "label" of row "R1" in "T1" to "pin" expecting row version 7
+            Then the engine rejects the request with status 409
+            And row "R1" of "T1" has "label" = "screw"
+
+    Rule: Batches apply in request order, atomically on demand
+        Scenario Outline: An atomic batch with a failing operation changes nothing (<mode>)
+            When the actor submits an atomic batch to "T1"
+                | operation_id | operation_type | row | column | value  |
+                | 1            | upsert_cell    | R1  | label  | "pin"  |
+                | 2            | add_row        | R3  |        |        |
+                | 3            | upsert_cell    | R3  | qty    | 4      |
+                | 4            | upsert_cell    | R9  | label  | "gone" |
+            Then the engine accepts the request
+            And the engine applied the batch <mode>
+            And the batch results are "failed", "failed", "failed", "failed"
+            And row "R1" of "T1" has "label" = "bolt"
+            And "T1" has rows "R1", "R2"
+            And the version of "T1" is unchanged
+
+            Examples: In order
+                | mode         |
+                | sequentially |
+
+            @plan_batches
+            Examples: Planned
+                | mode                |
+                | through the planner |
+
+        Scenario Outline: A non-atomic batch keeps the operations that succeed (<mode>)
+            When the actor submits a non-atomic batch to "T1"
+                | operation_id | operation_type | row | column | value  |
+                | 1            | upsert_cell    | R1  | label  | "pin"  |
+                | 2            | upsert_cell    | R9  | label  | "gone" |
+                | 3            | delete_row     | R2  |        |        |
+            Then the engine applied the batch <mode>
+            And the batch results are "ok", "failed", "ok"
+            And row "R1" of "T1" has "label" = "pin"
+            And "T1" has rows "R1"
+            And the version of "T1" advanced by 1
+
+            Examples: In order
+                | mode         |
+                | sequentially |
+
+            @plan_batches
+            Examples: Planned
+                | mode                |
+                | through the planner |
+
+        Scenario Outline: A row added by a batch takes cells later in the batch (<mode>)
+            When the actor submits a non-atomic batch to "T1"
+                | operation_id | operation_type | row | column | value  |
+                | 1            | upsert_cell    | R3  | qty    | 4      |
+                | 2            | add_row        | R3  |        |        |
+                | 3            | upsert_cell    | R3  | qty    | 4      |
+                | 4            | upsert_cell    | R3  | label  | "nut"  |
+            Then the engine applied the batch <mode>
+            And the batch results are "failed", "ok", "ok", "ok"
+            And "T1" has rows "R1", "R2", "R3"
+            And row "R3" of "T1" has "qty" = 4
+            And row "R3" of "T1" has "label" = "nut"
+
+            Examples: In order
+                | mode         |
+                | sequentially |
+
+            @plan_batches
+            Examples: Planned
+                | mode                |
+                | through the planner |
+
+        Scenario: A dry-run batch is validated but never committed
+            When the actor submits a dry-run batch to "T1"
+                | operation_id | operation_type | row | column | value |
+                | 1            | upsert_cell    | R1  | label  | "pin" |
+                | 2            | upsert_cell    | R1  | qty    | "x"   |
+            Then the batch results are "ok", "failed"
+            And row "R1" of "T1" has "label" = "bolt"
+            And the version of "T1" is unchanged
+
+        Scenario: A dry run reports the version to write against
+            When the actor submits a dry-run batch to "T1"
+                | operation_id | operation_type | row | column | value |
+                | 1            | upsert_cell    | R1  | label  | "pin" |
+            Then the dry run reports the current version and schema version of "T1"
+            When the actor submits an atomic batch to "T1" expecting the validated version
+                | operation_id | operation_type | row | column | value |
+                | 1            | upsert_cell    | R1  | label  | "pin" |
+            Then the engine accepts the request
+            And the batch results are "ok"
+            And row "R1" of "T1" has "label" = "pin"
+
+        Scenario: The schema version of a dry run only moves with the columns
+            When the actor submits a dry-run batch to "T1"
+                | operation_id | operation_type | row | column | value |
+                | 1            | upsert_cell    | R1  | label  | "pin" |
+            And the actor sets "label" of row "R2" in "T1" to "washer"
+            And the actor submits a dry-run batch to "T1"
+                | operation_id | operation_type | row | column | value |
+                | 1            | upsert_cell    | R1  | label  | "pin" |
+            Then the validated version advanced by 1 since the previous dry run
+            And the schema version is unchanged since the previous dry run
+            When the actor adds formula column "double" to "T1" as ={qty} * 2
+            And the actor submits a dry-run batch to "T1"
+                | operation_id | operation_type | row | column | value |
+                | 1            | upsert_cell    | R1  | label  | "pin" |
+            Then the dry run reports the current version and schema version of "T1"
+            And the schema version advanced by 1 since the previous dry run
+
+        Scenario: A write after the dry run conflicts with its validated version
+            When the actor submits a dry-run batch to "T1"
+                | operation_id | operation_type | row | column | value |
+                | 1            | upsert_cell    | R1  | label  | "pin" |
+            And the actor sets "label" of row "R2" in "T1" to "washer"
+            And the actor submits an atomic batch to "T1" expecting the validated version
+                | operation_id | operation_type | row | column | value |
+                | 1            | upsert_cell    | R1  | label  | "pin" |
+            Then the engine rejects the request with status 409
+            And row "R1" of "T1" has "label" = "bolt"
+
+    Rule: An idempotency key replays the first result of its request
+        Scenario: Retry a batch with the same key
+            When the actor submits a non-atomic batch to "T1" with key "b-1"
+                | operation_id | operation_type | row | column | value |
+                | 1            | add_row        | R3  |        |       |
+            And the actor submits a non-atomic batch to "T1" with key "b-1"
+                | operation_id | operation_type | row | column | value |
+                | 1            | add_row        | R3  |        |       |
+            Then the engine accepts the request
+            And the batch results are "ok"
+            And "T1" has rows "R1", "R2", "R3"
+            And the version of "T1" advanced by 1
+
+        Scenario: Reject a key reused for a different batch
+            When the actor submits a non-atomic batch to "T1" with key "b-1"
+                | operation_id | operation_type | row | column | value |
+                | 1            | add_row        | R3  |        |       |
+            And the actor submits a non-atomic batch to "T1" with key "b-1"
+                | operation_id | operation_type | row | column | value |
+                | 1            | add_row        | R4  |        |       |
+            Then the engine rejects the request with status 422
+            And "T1" has rows "R1", "R2", "R3"
+
+    Rule: Keyset cursors page through a table pinned to its version
+        Scenario: Page through every row
+            Given engine table "T1" has rows
+                | row | qty |
+                | R3  | 1   |
+                | R4  | 1   |
+                | R5  | 1   |
+            When the actor pages through "T1" 2 rows at a time
+            Then the pages read hold rows R1 R2 | R3 R4 | R5
+
+        Scenario: A cursor goes stale once the table changes
+            When the actor reads the first 1 row of "T1"
+            And the actor sets "label" of row "R1" in "T1" to "screw"
+            And the actor reads the next page of "T1"
+            Then the engine rejects the request with status 409
+
+        Scenario: Reject a malformed cursor
+            When the actor reads "T1" with cursor "not-a-cursor"
+            Then the engine rejects the request with status 422
+
+        Scenario: Reject a cursor whose fields have the wrong types
+            When the actor reads "T1" with a cursor encoding [1, 2, 3]
+            Then the engine rejects the request with status 422
+
+        Scenario: Page through a filtered and sorted view
+            Given engine table "T1" has rows
+                | row | qty |
+                | R3  | 0   |
+                | R4  | 3   |
+            And an engine view "busy" of "T1" filtered by "qty >= 1" sorted by "qty desc"
+            When the actor pages through view "busy" of "T1" 2 rows at a time
+            Then the pages read hold rows R4 R1 | R2
+
+        Scenario: A view cursor goes stale once the view changes
+            Given an engine view "busy" of "T1" filtered by "qty >= 1"
+            When the actor reads the first 1 row of view "busy" of "T1"
+            And the actor changes the filter of view "busy" to "qty >= 2"
+            And the actor reads the next page of view "busy" of "T1"
+            Then the engine rejects the request with status 409
+
+        Scenario: A table cursor cannot page a view
+            Given an engine view "busy" of "T1" filtered by "qty >= 1"
+            When the actor reads the first 1 row of "T1"
+            And the actor reads the next page of view "busy" of "T1"
+            Then the engine rejects the request with status 422
+
+        Scenario: Reject view filters with unknown keys
+            When the actor creates view "odd" of "T1" with filters {"a": "x"}
+            Then the engine rejects the request with status 422
+
+        Scenario Outline: Reject a page window outside the table
+            When the actor reads "T1" with limit <limit> and offset <offset>
+            Then the engine rejects the request with status 422
+
+            Examples:
+                | limit | offset |
+                | 0     | 0      |
+                | -1    | 0      |
+                | 2     | -1     |
+
+    Rule: Formula columns are recomputed at commit time
+        Scenario: Formula cells follow their inputs
+            When the actor sets "qty" of row "R1" in "T1" to 3
+            Then row "R1" of "T1" has "total" = 15
+            And row "R2" of "T1" has "total" = 3
+
+        Scenario: A recomputed cell takes the type of its new value
+            When the actor sets "price" of row "R1" in "T1" to 5.0
+            Then row "R1" of "T1" has "total" = 10.0
+
+        Scenario: Changing a formula recomputes the whole column
+            When the actor changes the formula of "total" in "T1" to ={qty} * {price} * 1.0
+            Then row "R1" of "T1" has "total" = 10.0
+            And row "R2" of "T1" has "total" = 3.0
+
+        Scenario: A formula that does not parse is rejected
+            When the actor adds formula column "broken" to "T1" as ={qty} *
+            Then the engine rejects the request with status 422
+            And "T1" has no column "broken"
+
+        Scenario: Formula columns may not reference each other in a cycle
+            When the actor adds formula column "double" to "T1" as ={total} * 2
+            And the actor changes the formula of "total" in "T1" to ={double} + 1
+            Then the engine rejects the request with status 422
+            And row "R1" of "T1" has "double" = 20
+
+        Scenario: A formula referencing a deleted column shows #REF!
+            When the actor deletes column "price" from "T1"
+            Then the engine accepts the request
+            And row "R1" of "T1" has "total" = "#REF!"
+
+    Rule: Link and lookup cells are resolved from their target rows on read
+        Background:
+            Given an engine table "O1" with columns
+                | key  | data_type | formula |
+                | note | text      |         |
+            And "O1" has a link column "part" to "T1" shown by "label"
+            And "O1" has a lookup column "part_qty" of "qty" through "part"
+            And engine row "A1" of "O1" links "part" to "R1"
+            And engine row "A2" of "O1" links "part" to "R1", "R2"
+
+        Scenario: Link cells show their targets and lookup cells read them
+            When the actor reads the first 10 rows of "O1"
+            Then the engine accepts the request
+            And row "A1" of the page shows "part" as "bolt"
+            And row "A2" of the page shows "part" as "bolt, nut"
+            And row "A1" of the page has "part_qty" = 2
+            And row "A2" of the page has "part_qty" = [2, 1]
+
+        Scenario: A write to the target table invalidates the cached targets
+            When the actor reads the first 10 rows of "O1"
+            And the actor reads the first 10 rows of "O1"
+            Then the link cache has answered 2 target rows and fetched 2
+            When the actor sets "label" of row "R1" in "T1" to "screw"
+            And the actor reads the first 10 rows of "O1"
+            Then the link cache has answered 2 target rows and fetched 4
+            And row "A1" of the page shows "part" as "screw"
+            And row "A2" of the page shows "part" as "screw, nut"
+
+    Rule: The change feed sends each change once, until the log is compacted
+        Scenario: Read the net changes since a version
+            When the actor sets "label" of row "R1" in "T1" to "screw"
+            And the actor adds row "R3" to "T1"
+            And the actor deletes row "R2" from "T1"
+            And the actor sets "label" of row "R1" in "T1" to "pin"
+            And the actor reads the changes to "T1" since the start
+            Then the engine accepts the request
+            And the changes insert rows "R3"
+            And the changes delete rows "R2"
+            And the changes set "label" of row "R1" to "pin"
+
+        Scenario: A version the log no longer reaches is gone
+            Given the change log of "T1" keeps 2 versions
+            When the actor sets "label" of row "R1" in "T1" to "screw"
+            And the actor sets "label" of row "R1" in "T1" to "pin"
+            And the actor sets "label" of row "R2" in "T1" to "washer"
+            And the actor reads the changes to "T1" since the start
+            Then the engine rejects the request with status 410
+            When the actor reads the changes to "T1" since 2 versions ago
+            Then the engine accepts the request
+            And the changes set "label" of row "R1" to "pin"
+            And the changes set "label" of row "R2" to "washer"
+
+    Rule: Exports stream a table pinned to the version they started from
+        Scenario: Export a table as NDJSON, one chunk per row
+            When the actor exports "T1" as ndjson 1 row per chunk
+            And the actor reads the rest of the export
+            Then the engine accepts the request
+            And the export was read in 3 chunks
+            And the export is served as "application/x-ndjson" with rows "R1", "R2"
+            And row "R1" of the export has "label" = "bolt"
+            And row "R2" of the export has "total" = 3
+
+        Scenario: Export a table as CSV
+            When the actor exports "T1" as csv
+            And the actor reads the rest of the export
+            Then the engine accepts the request
+            And the export is served as "text/csv" with rows "R1", "R2"
+            And row "R1" of the export has "qty" = 2
+            And row "R2" of the export has "label" = "nut"
+
+        Scenario: A write while the export streams aborts it with a conflict
+            When the actor exports "T1" as ndjson 1 row per chunk
+            And the actor reads 2 chunks of the export
+            And the actor sets "label" of row "R2" in "T1" to "pin"
+            And the actor reads the rest of the export
+            Then the engine rejects the request with status 409
+            And the export is served as "application/x-ndjson" with rows "R1"
+
+    Rule: Asset edits reach their follow copies through a propagation job
+        Background:
+            Given an engine asset "spec.md" holds "v1"
+            And engine asset "copy-1" follows "spec.md"
+            And engine asset "copy-2" follows "spec.md"
+
+        Scenario: A burst of edits is propagated once with the latest content
+            When the actor changes the content of asset "spec.md" to "v2"
+            And the actor changes the content of asset "spec.md" to "v3"
+            Then the engine accepts the request
+            And the edits share one propagation job
+            And engine asset "copy-1" still stores "v1"
+            When the actor looks up the propagation job
+            Then the propagation job is "queued" with 1 coalesced update and 0 of 0 followers synced
+            And engine asset "copy-1" reads "v3"
+            And engine asset "copy-2" reads "v3"
+            When the actor looks up the propagation job
+            Then the propagation job is "done" with 1 coalesced update and 2 of 2 followers synced
+
+        Scenario: A detached copy keeps its content
+            When the actor detaches asset "copy-2" from its parent
+            And the actor changes the content of asset "spec.md" to "v2"
+            Then engine asset "copy-1" reads "v2"
+            And engine asset "copy-2" reads "v1"
+            When the actor looks up the propagation job
+            Then the propagation job is "done" with 0 coalesced updates and 1 of 1 followers synced
+
+    Rule: Table stats count an asset and the copies following it once
+        Background:
+            Given an engine asset "spec.md" holds "v1"
+            And engine asset "copy-1" follows "spec.md" from a row of "T1"
+            And engine asset "copy-2" follows "copy-1" from a row of "T1"
+
+        Scenario: A parent and its followers count as one asset
+            When the actor reads the stats of "T1"
+            Then the engine accepts the request
+            And the stats count 1 design asset in the table and 1 outside any table
+
+        Scenario: A detached copy counts on its own
+            When the actor detaches asset "copy-2" from its parent
+            And the actor reads the stats of "T1"
+            Then the stats count 2 design assets in the table and 1 outside any table
+
+    Rule: Asset bodies are stored once and copied on write
+        Background:
+            Given an engine asset "spec.md" holds "v1"
+
+        Scenario: Uploading the same content again reuses its body
+            When the actor uploads asset "again.md" holding "v1"
+            Then the engine accepts the request
+            And assets "spec.md", "again.md" share one stored body
+            And the blob store holds 1 body with 2 references
+
+        Scenario: Editing a copy writes a new body and leaves its parent alone
+            Given engine asset "copy-1" follows "spec.md"
+            Then assets "spec.md", "copy-1" share one stored body
+            When the actor changes the content of asset "copy-1" to "v2"
+            Then assets "spec.md", "copy-1" do not share one stored body
+            And the blob store holds 2 bodies with 2 references
+            And engine asset "spec.md" reads "v1"
+            And engine asset "copy-1" reads "v2"
+
+    Rule: Large assets upload in resumable chunks
+        Scenario: Upload an asset in chunks
+            When the actor starts uploading "spec.md" announcing 11 bytes
+            And the actor uploads "hello " to "spec.md" at offset 0
+            And the actor uploads "world" to "spec.md" at offset 6
+            And the actor completes the upload of "spec.md"
+            Then the engine accepts the request
+            And asset "spec.md" holds "hello world"
+
+        Scenario: Resume an interrupted upload by its key
+            When the actor starts uploading "spec.md" with key "up-1"
+            And the actor uploads "hello " to "spec.md" at offset 0
+            And the actor starts uploading "spec.md" with key "up-1"
+            Then the upload of "spec.md" has received 6 bytes
+            When the actor uploads "hello world" to "spec.md" at offset 0
+            And the actor completes the upload of "spec.md"
+            Then asset "spec.md" holds "hello world"
+
+        Scenario: Reject a chunk that leaves a gap
+            When the actor starts uploading "spec.md"
+            And the actor uploads "world" to "spec.md" at offset 6
+            Then the engine rejects the request with status 422
+
+        Scenario: Reject a chunk at a negative offset
+            When the actor starts uploading "spec.md"
+            And the actor uploads "abchello" to "spec.md" at offset -3
+            Then the engine rejects the request with status 422
+
+        Scenario: Reject a body that is not UTF-8 text
+            When the actor starts uploading "spec.md"
+            And the actor uploads bytes ff fe to "spec.md" at offset 0
+            Then the engine rejects the request with status 422
+
+        Scenario: Reject a body larger than announced
+            When the actor starts uploading "spec.md" announcing 4 bytes
+            And the actor uploads "hello" to "spec.md" at offset 0
+            Then the engine rejects the request with status 422
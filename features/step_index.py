@@ -0,0 +1,243 @@
+"""
+Precompiled dispatch index for behave step definitions.
+
+behave resolves a step by trying every registered step definition of its
+step type (plus the generic ``@step`` ones) in registration order.  With a
+few hundred ``use_step_matcher("re")`` patterns that linear scan dominates
+feature start-up and dry runs.
+
+:class:`StepIndex` replaces ``find_match`` / ``find_step_definition`` on the
+registry with:
+
+* a **literal-prefix trie** per step type — each pattern is filed under the
+  literal text it must start with, so only definitions whose prefix is a
+  prefix of the step text are tried, still in registration order (the
+  first-match-wins semantics of behave are preserved);
+* a **resolution cache** keyed by ``(step_type, step_text)`` — a repeated
+  step line costs one dict lookup plus a single regex match to build fresh
+  arguments.
+
+:func:`install` also pre-resolves every unique step line of the loaded
+features and reports texts that more than one definition matches, so
+ambiguous patterns surface at load time instead of as a silent shadowing.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from behave.matchers import ParseMatcher, RegexMatcher
+
+STEP_TYPES = ("given", "when", "then", "step")
+
+_REGEX_META = set(".^$*+?{}[]|()")
+_REGEX_QUANTIFIERS = set("*+?{")
+
+
+# ---------------------------------------------------------------------------
+# Literal prefixes
+# ---------------------------------------------------------------------------
+def _has_top_level_alternation(pattern: str) -> bool:
+    depth = 0
+    in_class = False
+    escaped = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+def _regex_prefix(pattern: str) -> str:
+    """Literal text every match of *pattern* (anchored at start) begins with."""
+    if _has_top_level_alternation(pattern):
+        return ""
+    chars: list[str] = []
+    index = 1 if pattern.startswith("^") else 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == "\\":
+            following = pattern[index + 1 : index + 2]
+            if not following or following.isalnum():
+                break  # -- \d, \w, \s, \A, back-references, ...
+            literal, width = following, 2
+        elif char in _REGEX_META:
+            break
+        else:
+            literal, width = char, 1
+        if pattern[index + width : index + width + 1] in _REGEX_QUANTIFIERS:
+            break  # -- The literal itself is optional / repeated.
+        chars.append(literal)
+        index += width
+    return "".join(chars)
+
+
+def literal_prefix(matcher: Any) -> str:
+    """Conservative literal prefix of a step matcher ("" when unknown)."""
+    pattern = getattr(matcher, "pattern", "")
+    if isinstance(matcher, RegexMatcher):
+        return _regex_prefix(pattern)
+    if isinstance(matcher, ParseMatcher):
+        return pattern.split("{", 1)[0]
+    return ""
+
+
+class _TrieNode:
+    __slots__ = ("children", "entries")
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.entries: list[int] = []
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+class StepIndex:
+    """Prefix-trie + cache front-end for a behave ``StepRegistry``."""
+
+    def __init__(self, registry: Any) -> None:
+        self.registry = registry
+        self.hits = 0
+        self.misses = 0
+        self._cache: dict[tuple[str, str], Any] = {}
+        self._tries: dict[str, _TrieNode] = {}
+        self._candidates: dict[str, list[Any]] = {}
+        self._signature: tuple[int, ...] = ()
+        self.rebuild()
+
+    # -- Building --
+
+    def _registry_signature(self) -> tuple[int, ...]:
+        return tuple(len(self.registry.steps[step_type]) for step_type in STEP_TYPES)
+
+    def rebuild(self) -> None:
+        self._cache.clear()
+        self._tries.clear()
+        self._candidates.clear()
+        for step_type in STEP_TYPES:
+            candidates = list(self.registry.steps[step_type])
+            if step_type != "step":
+                candidates += self.registry.steps["step"]
+            root = _TrieNode()
+            for position, matcher in enumerate(candidates):
+                node = root
+                for char in literal_prefix(matcher):
+                    node = node.children.setdefault(char, _TrieNode())
+                node.entries.append(position)
+            self._candidates[step_type] = candidates
+            self._tries[step_type] = root
+        self._signature = self._registry_signature()
+
+    def _ensure_current(self) -> None:
+        # -- Step modules may register definitions after install().
+        if self._registry_signature() != self._signature:
+            self.rebuild()
+
+    # -- Lookup --
+
+    def candidates(self, step_type: str, step_text: str) -> list[Any]:
+        """Definitions whose literal prefix fits *step_text*, in registry order."""
+        node = self._tries[step_type]
+        positions = list(node.entries)
+        for char in step_text:
+            node = node.children.get(char)
+            if node is None:
+                break
+            positions.extend(node.entries)
+        definitions = self._candidates[step_type]
+        return [definitions[position] for position in sorted(positions)]
+
+    def resolve(self, step_type: str, step_text: str) -> Any | None:
+        """The step definition behave would pick for *step_text*, cached."""
+        self._ensure_current()
+        key = (step_type, step_text)
+        if key in self._cache:
+            self.hits += 1
+            return self._cache[key]
+        self.misses += 1
+        found = None
+        for matcher in self.candidates(step_type, step_text):
+            if matcher.match(step_text):
+                found = matcher
+                break
+        self._cache[key] = found
+        return found
+
+    def find_step_definition(self, step: Any) -> Any | None:
+        return self.resolve(step.step_type, step.name)
+
+    def find_match(self, step: Any) -> Any | None:
+        matcher = self.resolve(step.step_type, step.name)
+        return matcher.match(step.name) if matcher is not None else None
+
+    # -- Diagnostics --
+
+    def ambiguities(self, steps: list[Any]) -> list[tuple[str, str, list[Any]]]:
+        """Unique step lines of *steps* that more than one definition matches.
+
+        Also warms the resolution cache for every line it inspects.
+        """
+        found: list[tuple[str, str, list[Any]]] = []
+        seen: set[tuple[str, str]] = set()
+        for step in steps:
+            key = (step.step_type, step.name)
+            if key in seen or step.step_type not in self._tries:
+                continue
+            seen.add(key)
+            self.resolve(*key)
+            matching = [
+                matcher
+                for matcher in self.candidates(*key)
+                if matcher.matches(step.name)
+            ]
+            if len(matching) > 1:
+                found.append((step.step_type, step.name, matching))
+        return found
+
+
+# ---------------------------------------------------------------------------
+# Installation
+# ---------------------------------------------------------------------------
+def _feature_steps(features: list[Any]) -> list[Any]:
+    # -- Outline templates are skipped: their generated scenarios are walked.
+    return [
+        step
+        for feature in features
+        for scenario in feature.walk_scenarios()
+        for step in scenario.all_steps
+    ]
+
+
+def install(context: Any, registry: Any | None = None) -> StepIndex:
+    """Route step lookups of the current run through a :class:`StepIndex`.
+
+    Call from ``before_all``: step modules and feature files are loaded by
+    then, so the index is built once and ambiguities are printed up front.
+    """
+    runner = context._runner
+    if registry is None:
+        registry = runner.step_registry
+        if registry is None:
+            from behave.step_registry import registry
+    index = StepIndex(registry)
+    registry.find_match = index.find_match
+    registry.find_step_definition = index.find_step_definition
+
+    for step_type, text, matching in index.ambiguities(_feature_steps(runner.features)):
+        print(f"[step-index] ambiguous {step_type} step: {text!r}")
+        for position, matcher in enumerate(matching):
+            marker = "uses" if position == 0 else "shadows"
+            print(f"[step-index]   {marker} {matcher.describe()} ({matcher.location})")
+    return index
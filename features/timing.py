@@ -0,0 +1,369 @@
+"""
+Step-, request- and wait-level timing for both behave stages.
+
+:class:`TimingRecorder` collects three kinds of samples:
+
+* **steps** — wall time of every executed step (from ``after_step``);
+* **requests** — latency per endpoint template such as
+  ``POST /api/v1/tables/{id}:batch``, recorded by wrapping the stage's
+  ``TestClient`` (or async drop-in) with :func:`instrument_client`;
+* **waits** — durations of Playwright navigations / waits, recorded by
+  :func:`instrument_page` and by page objects via :func:`measure_wait`.
+
+:meth:`TimingRecorder.write_report` emits a JSON report with per-key
+statistics and slowest-N lists.  When a baseline report is given, keys whose
+mean grew by more than the threshold are listed under ``regressions`` and
+printed.  Sharded workers (``BEHAVE_WORKER_ID``) write one report each and
+skip the comparison; ``parallel_runner`` merges them with
+:func:`merge_reports` and compares the whole run against the baseline.
+
+Configuration (read by the stage environments)::
+
+    BDD_TIMING_REPORT=<path>       # enable + write the JSON report
+    BDD_TIMING_BASELINE=<path>     # compare against an earlier report
+    BDD_TIMING_THRESHOLD=0.25      # allowed relative slowdown (25 %)
+    BDD_TIMING_TOP=10              # size of the slowest-N lists
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import re
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+from urllib.parse import urlsplit
+
+# ---------------------------------------------------------------------------
+# Configuration
+# ---------------------------------------------------------------------------
+REPORT_PATH = os.environ.get("BDD_TIMING_REPORT")
+BASELINE_PATH = os.environ.get("BDD_TIMING_BASELINE")
+THRESHOLD = float(os.environ.get("BDD_TIMING_THRESHOLD", "0.25"))
+TOP_N = int(os.environ.get("BDD_TIMING_TOP", "10"))
+
+# Means below this are noise; they never count as regressions.
+MIN_REGRESSION_MS = 1.0
+
+PAGE_WAIT_METHODS = (
+    "goto",
+    "reload",
+    "wait_for_url",
+    "wait_for_load_state",
+    "wait_for_selector",
+    "wait_for_timeout",
+)
+
+_ID_SEGMENT = re.compile(
+    r"^(?:[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+    r"|\d+)$"
+)
+
+
+def endpoint_template(method: str, url: str) -> str:
+    """``POST /tables/<uuid>:batch?x=1`` -> ``POST /tables/{id}:batch``."""
+    segments = []
+    for segment in urlsplit(str(url)).path.split("/"):
+        head, colon, action = segment.partition(":")
+        if _ID_SEGMENT.match(head):
+            head = "{id}"
+        segments.append(head + colon + action)
+    return f"{method.upper()} {'/'.join(segments) or '/'}"
+
+
+def worker_path(path: str) -> str:
+    """``timing.json`` -> ``timing.worker-<id>.json`` inside sharded workers."""
+    worker_id = os.environ.get("BEHAVE_WORKER_ID")
+    if not worker_id:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.worker-{worker_id}{ext}"
+
+
+def _merge_stats(parts: list[dict[str, float]]) -> dict[str, float]:
+    """Combine per-worker stats; ``p95_ms`` is the worst worker's (an upper bound)."""
+    count = sum(part["count"] for part in parts)
+    total = sum(part["total_ms"] for part in parts)
+    return {
+        "count": count,
+        "total_ms": total,
+        "mean_ms": total / count,
+        "p95_ms": max(part["p95_ms"] for part in parts),
+        "max_ms": max(part["max_ms"] for part in parts),
+    }
+
+
+def _stats(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {
+        "count": len(ordered),
+        "total_ms": sum(ordered) * 1000,
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p95_ms": p95 * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Recorder
+# ---------------------------------------------------------------------------
+class TimingRecorder:
+    def __init__(self, stage: str) -> None:
+        self.stage = stage
+        self.steps: list[dict[str, Any]] = []
+        self.requests: dict[str, list[float]] = defaultdict(list)
+        self.waits: dict[str, list[float]] = defaultdict(list)
+
+    # -- Recording --
+
+    def record_step(self, scenario: Any, step: Any) -> None:
+        self.steps.append(
+            {
+                "step": f"{step.keyword} {step.name}",
+                "scenario": getattr(scenario, "name", None),
+                "location": str(step.location),
+                "status": str(getattr(step.status, "name", step.status)),
+                "duration_ms": (step.duration or 0.0) * 1000,
+            }
+        )
+
+    def record_request(self, method: str, url: str, seconds: float) -> None:
+        self.requests[endpoint_template(method, url)].append(seconds)
+
+    def record_wait(self, name: str, seconds: float) -> None:
+        self.waits[name].append(seconds)
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_wait(name, time.perf_counter() - started)
+
+    # -- Reporting --
+
+    def report(self, top_n: int = TOP_N) -> dict[str, Any]:
+        step_samples: dict[str, list[float]] = defaultdict(list)
+        for entry in self.steps:
+            step_samples[entry["step"]].append(entry["duration_ms"] / 1000)
+        requests = {key: _stats(samples) for key, samples in self.requests.items()}
+        waits = {key: _stats(samples) for key, samples in self.waits.items()}
+        return {
+            "stage": self.stage,
+            "worker": os.environ.get("BEHAVE_WORKER_ID"),
+            "steps": {key: _stats(samples) for key, samples in step_samples.items()},
+            "requests": requests,
+            "waits": waits,
+            "slowest_steps": sorted(
+                self.steps, key=lambda entry: entry["duration_ms"], reverse=True
+            )[:top_n],
+            "slowest_requests": _slowest(requests, top_n),
+            "slowest_waits": _slowest(waits, top_n),
+        }
+
+    def write_report(
+        self,
+        path: str,
+        baseline_path: str | None = None,
+        threshold: float = THRESHOLD,
+    ) -> dict[str, Any]:
+        if os.environ.get("BEHAVE_WORKER_ID"):
+            # -- One shard only; the parent compares the merged run.
+            baseline_path = None
+        return save_report(self.report(), worker_path(path), baseline_path, threshold)
+
+    def print_summary(self, report: dict[str, Any]) -> None:
+        print_summary(report)
+
+
+def save_report(
+    report: dict[str, Any],
+    path: str,
+    baseline_path: str | None = None,
+    threshold: float = THRESHOLD,
+) -> dict[str, Any]:
+    """Write *report* to *path*, with ``regressions`` against *baseline_path*."""
+    if baseline_path and os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), threshold)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return report
+
+
+def merge_reports(reports: list[dict[str, Any]], top_n: int = TOP_N) -> dict[str, Any]:
+    """One report for a sharded run out of the per-worker reports."""
+    merged: dict[str, Any] = {
+        "stage": reports[0]["stage"],
+        "worker": None,
+        "workers": len(reports),
+    }
+    for section in ("steps", "requests", "waits"):
+        parts: dict[str, list[dict[str, float]]] = defaultdict(list)
+        for report in reports:
+            for key, stats in report.get(section, {}).items():
+                parts[key].append(stats)
+        merged[section] = {key: _merge_stats(stats) for key, stats in parts.items()}
+    merged["slowest_steps"] = sorted(
+        (entry for report in reports for entry in report.get("slowest_steps", ())),
+        key=lambda entry: entry["duration_ms"],
+        reverse=True,
+    )[:top_n]
+    merged["slowest_requests"] = _slowest(merged["requests"], top_n)
+    merged["slowest_waits"] = _slowest(merged["waits"], top_n)
+    return merged
+
+
+def print_summary(report: dict[str, Any]) -> None:
+    prefix = f"[timing:{report['stage']}]"
+    for entry in report["slowest_steps"][:5]:
+        print(f"{prefix} step {entry['duration_ms']:9.1f} ms  {entry['step']}")
+    for entry in report["slowest_requests"][:5]:
+        print(f"{prefix} http {entry['mean_ms']:9.1f} ms  {entry['key']}")
+    for entry in report["slowest_waits"][:5]:
+        print(f"{prefix} wait {entry['mean_ms']:9.1f} ms  {entry['key']}")
+    for regression in report.get("regressions", ()):
+        print(
+            f"{prefix} REGRESSION {regression['section']} {regression['key']}: "
+            f"{regression['baseline_ms']:.1f} -> {regression['current_ms']:.1f} ms "
+            f"(+{regression['change']:.0%})"
+        )
+
+
+def _slowest(stats: dict[str, dict[str, float]], top_n: int) -> list[dict[str, Any]]:
+    ranked = sorted(stats.items(), key=lambda item: item[1]["mean_ms"], reverse=True)
+    return [{"key": key, **values} for key, values in ranked[:top_n]]
+
+
+def compare(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    threshold: float = THRESHOLD,
+) -> list[dict[str, Any]]:
+    """Keys whose mean grew by more than *threshold* relative to *baseline*."""
+    regressions = []
+    for section in ("steps", "requests", "waits"):
+        previous = baseline.get(section, {})
+        for key, stats in current.get(section, {}).items():
+            before = previous.get(key, {}).get("mean_ms")
+            after = stats["mean_ms"]
+            if not before or after - before < MIN_REGRESSION_MS:
+                continue
+            change = after / before - 1
+            if change > threshold:
+                regressions.append(
+                    {
+                        "section": section,
+                        "key": key,
+                        "baseline_ms": before,
+                        "current_ms": after,
+                        "change": change,
+                    }
+                )
+    return sorted(regressions, key=lambda entry: entry["change"], reverse=True)
+
+
+def accumulate_overhead(path: str, mode: str, stats: dict[str, float]) -> None:
+    """Store one mode's hook overhead in *path* and compare it with the others."""
+    report: dict[str, dict] = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+    report[mode] = stats
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    for other_mode, other in sorted(report.items()):
+        if other_mode == mode or not other.get("mean_ms"):
+            continue
+        print(
+            f"[http-stage]   vs {other_mode}: {other['mean_ms']:.3f} ms/scenario "
+            f"({stats['mean_ms'] / other['mean_ms']:.2f}x)"
+        )
+
+
+# ---------------------------------------------------------------------------
+# Active recorder (used by page objects)
+# ---------------------------------------------------------------------------
+_active: TimingRecorder | None = None
+
+
+def activate(recorder: TimingRecorder | None) -> None:
+    global _active
+    _active = recorder
+
+
+@contextmanager
+def measure_wait(name: str) -> Iterator[None]:
+    """Record a wait on the active recorder; a no-op when timing is off."""
+    if _active is None:
+        yield
+        return
+    with _active.measure(name):
+        yield
+
+
+# ---------------------------------------------------------------------------
+# Instrumentation
+# ---------------------------------------------------------------------------
+def instrument_client(client: Any, recorder: TimingRecorder) -> Any:
+    """Time every request of a ``TestClient`` or :class:`AsyncStageClient`.
+
+    The wrapper is installed on the instance (on ``arequest`` for the async
+    client), so ``get``/``post``/... are all covered.  Instrumenting twice is
+    a no-op.
+    """
+    if getattr(client, "_timing_recorder", None) is recorder:
+        return client
+
+    if hasattr(client, "arequest"):
+        original = client.arequest
+
+        @functools.wraps(original)
+        async def arequest(method: str, url: str, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await original(method, url, **kwargs)
+            finally:
+                recorder.record_request(method, url, time.perf_counter() - started)
+
+        client.arequest = arequest
+    else:
+        original = client.request
+
+        @functools.wraps(original)
+        def request(method: str, url: Any, *args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return original(method, url, *args, **kwargs)
+            finally:
+                recorder.record_request(method, url, time.perf_counter() - started)
+
+        client.request = request
+    client._timing_recorder = recorder
+    return client
+
+
+def instrument_page(page: Any, recorder: TimingRecorder) -> Any:
+    """Time Playwright navigations and page-level waits of *page*."""
+    for name in PAGE_WAIT_METHODS:
+        original = getattr(page, name)
+
+        setattr(page, name, _timed(recorder, f"page.{name}", original))
+    return page
+
+
+def _timed(recorder: TimingRecorder, name: str, func: Any) -> Any:
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with recorder.measure(name):
+            return func(*args, **kwargs)
+
+    return wrapper
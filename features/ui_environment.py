@@ -12,6 +12,30 @@ Prerequisites before running:
 
 Usage from workspace root:
   ``uv run behave --stage ui``
+
+Parallel runs
+~~~~~~~~~~~~~
+``uv run python features/parallel_runner.py --stage ui --workers N`` shards
+scenarios across N behave processes, each with its own browser: the sync
+Playwright API is bound to one thread, so a worker runs its scenarios one
+at a time, each in a new context.  ``UI_BROWSERS`` (comma-separated, default
+``chromium``) lists the browser types; worker ``i`` launches entry
+``i % len(UI_BROWSERS)``, so e.g. ``chromium,firefox`` splits the workers
+between both engines.  Workers are told apart by ``BEHAVE_WORKER_ID``:
+failure screenshots and debug artifacts go to
+``features/screenshots/worker-<id>/`` and ``artifacts/worker-<id>/``.
+
+Authenticated state
+~~~~~~~~~~~~~~~~~~~
+The admin signs in once per worker; the resulting ``storage_state`` is
+cached by :class:`auth_state.AuthStateCache` (and written to
+``reports/auth/``) and every scenario's context is seeded from it.  A
+redirect to ``/sign-in`` drops the cache and triggers a fresh login.
+Scenarios tagged ``@fresh_session`` start from an empty context, and
+``UI_AUTH_STATE=off`` disables the cache altogether.
+
+Set ``BDD_TIMING_REPORT=<path>`` to record step and Playwright wait timings
+(see :mod:`timing`).
 """
 
 from __future__ import annotations
@@ -26,6 +50,10 @@ if _FEATURES_DIR not in sys.path:
 
 from playwright.sync_api import sync_playwright
 
+import step_index
+import timing
+from auth_state import AuthStateCache
+
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -38,29 +66,85 @@ SLOW_MO = int(os.environ.get("UI_SLOW_MO", "0"))
 ADMIN_USERNAME = os.environ.get("UI_ADMIN_USERNAME", "super_admin")
 ADMIN_PASSWORD = os.environ.get("UI_ADMIN_PASSWORD", "admin123")
 
+# Parallel workers (parallel_runner.py) each get a distinct id.
+WORKER_ID = os.environ.get("BEHAVE_WORKER_ID")
+# Browser types the workers are spread over (chromium | firefox | webkit).
+BROWSERS = [
+    name.strip()
+    for name in os.environ.get("UI_BROWSERS", "chromium").split(",")
+    if name.strip()
+]
+
+# Reuse one signed-in storage state per worker; opt out per scenario by tag.
+AUTH_STATE = os.environ.get("UI_AUTH_STATE", "on").lower() not in ("off", "0", "false")
+FRESH_SESSION_TAG = "fresh_session"
+
+# Route step lookups through the prefix-trie index (see ``step_index``).
+STEP_INDEX = os.environ.get("BDD_STEP_INDEX", "on").lower() not in ("off", "0", "false")
+
 
 # ---------------------------------------------------------------------------
 # Hooks
 # ---------------------------------------------------------------------------
 def before_all(context):
-    """Start Playwright and launch a single browser for the whole run."""
+    """Start Playwright and launch this worker's browser for the whole run."""
+    if STEP_INDEX:
+        step_index.install(context)
     context.playwright = sync_playwright().start()
-    context.browser = context.playwright.chromium.launch(
+    browser_type = getattr(context.playwright, _worker_browser())
+    context.browser = browser_type.launch(
         headless=HEADLESS,
         slow_mo=SLOW_MO,
     )
     context.base_url = FRONTEND_BASE_URL
     context.admin_username = ADMIN_USERNAME
     context.admin_password = ADMIN_PASSWORD
+    context.artifacts_dir = _worker_dir("artifacts")
+    context.timing = timing.TimingRecorder("ui") if timing.REPORT_PATH else None
+    timing.activate(context.timing)
+    context.auth_state = (
+        AuthStateCache(
+            context.browser,
+            FRONTEND_BASE_URL,
+            ADMIN_USERNAME,
+            ADMIN_PASSWORD,
+            path=os.path.join(
+                _worker_dir(os.path.join(_FEATURES_DIR, "..", "reports", "auth")),
+                "storage-state.json",
+            ),
+        )
+        if AUTH_STATE
+        else None
+    )
 
 
 def before_scenario(context, scenario):
-    """Open a fresh browser context (isolated cookies/storage) per scenario."""
-    context.browser_context = context.browser.new_context()
+    """Create a fresh browser context (isolated cookies/storage).
+
+    Unless the scenario opts out, the context is seeded with the cached
+    admin storage state, so the scenario starts signed in.
+    """
+    context.authenticated = (
+        context.auth_state is not None
+        and FRESH_SESSION_TAG not in scenario.effective_tags
+    )
+    if context.authenticated:
+        context.browser_context = context.browser.new_context(
+            storage_state=context.auth_state.get()
+        )
+    else:
+        context.browser_context = context.browser.new_context()
     context.page = context.browser_context.new_page()
+    if context.timing is not None:
+        timing.instrument_page(context.page, context.timing)
     context.current_username = None
 
 
+def after_step(context, step):
+    if context.timing is not None:
+        context.timing.record_step(context.scenario, step)
+
+
 def after_scenario(context, scenario):
     """Take a screenshot on failure, then close the context."""
     if scenario.status == "failed":
@@ -81,17 +165,31 @@ def after_all(context):
     pw = getattr(context, "playwright", None)
     if pw:
         pw.stop()
+    recorder = getattr(context, "timing", None)
+    if recorder is not None:
+        report = recorder.write_report(timing.REPORT_PATH, timing.BASELINE_PATH)
+        recorder.print_summary(report)
 
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
+def _worker_browser() -> str:
+    """The browser type this worker launches (round-robin over ``BROWSERS``)."""
+    return BROWSERS[int(WORKER_ID or 0) % len(BROWSERS)]
+
+
+def _worker_dir(base: str) -> str:
+    """*base*, or its ``worker-<id>`` subfolder when running sharded."""
+    return os.path.join(base, f"worker-{WORKER_ID}") if WORKER_ID else base
+
+
 def _save_screenshot(context, scenario) -> None:
     """Save a PNG screenshot into features/screenshots/ on failure."""
     page = getattr(context, "page", None)
     if page is None:
         return
-    screenshots_dir = os.path.join(_FEATURES_DIR, "screenshots")
+    screenshots_dir = _worker_dir(os.path.join(_FEATURES_DIR, "screenshots"))
     os.makedirs(screenshots_dir, exist_ok=True)
     safe_name = scenario.name.replace(" ", "_").replace("/", "_")[:80]
     path = os.path.join(screenshots_dir, f"{safe_name}.png")
@@ -57,15 +57,27 @@ def _nav_bar(context) -> NavBar:
 
 def _ensure_admin_on_users_page(context) -> None:
     """Log in as admin (if needed) and navigate to /users."""
-    # Each scenario starts with a fresh browser context, so always log in.
+    users = _users_page(context)
     sign_in = _sign_in_page(context)
+    if getattr(context, "authenticated", False):
+        # Context was seeded with the cached admin session; the frontend
+        # redirects to /sign-in if the backend no longer accepts it.
+        users.navigate()
+        users.page_title.or_(sign_in.form).first.wait_for(
+            state="visible", timeout=DEFAULT_TIMEOUT_MS
+        )
+        if "/sign-in" not in context.page.url:
+            return
+        context.auth_state.invalidate()
+
     sign_in.navigate()
     sign_in.login(context.admin_username, context.admin_password)
     context.page.wait_for_url(
         lambda url: "/sign-in" not in url, timeout=DEFAULT_TIMEOUT_MS
     )
+    if getattr(context, "authenticated", False):
+        context.auth_state.store(context.browser_context)
 
-    users = _users_page(context)
     users.navigate()
     users.expect_visible()
 
@@ -73,63 +85,54 @@ def _ensure_admin_on_users_page(context) -> None:
 def _create_user_via_ui(
     context, username: str, password: str = DEFAULT_PASSWORD
 ) -> None:
-    """Create a user through the Add User dialog."""
+    """Create a user through the Add User dialog.
+
+    The outcome is decided by the ``POST /api/v1/users/`` response as soon
+    as it arrives; a duplicate username is treated as idempotent so the
+    Given steps stay stable when the test DB already contains the user.
+    """
     users = _users_page(context)
-    users.create_user(username, password)
-    # Wait for the success toast or capture failure state for debugging
-    notifications = NotificationsPage(context.page)
-    success_toast = notifications.locator(role="status", toast_type="success")
-    error_toast = notifications.locator(role="alert", toast_type="error")
+    response = users.create_user(username, password)
+    if response.ok:
+        # Allow the table to refresh after invalidation
+        users.expect_user_row(username)
+        return
+
+    body = response.text()
+    if response.status == 409 or "already exists" in body:
+        users.expect_user_row(username)
+        # The Add User dialog stays open on a duplicate error; close it so
+        # subsequent steps can interact normally.
+        users.close_dialog()
+        return
+
+    screenshot_path, html_path = _save_debug_artifacts(context)
+    raise AssertionError(
+        f"Create user failed with HTTP {response.status}: {body}. "
+        f"Artifacts: {screenshot_path}, {html_path}"
+    )
+
+
+def _save_debug_artifacts(context) -> tuple[str, str]:
+    """Save a screenshot + page HTML for a failed UI action."""
+    import os
+
+    artifacts_dir = getattr(context, "artifacts_dir", "artifacts")
+    os.makedirs(artifacts_dir, exist_ok=True)
+    safe_name = (
+        context.scenario.name.replace(" ", "_").replace("/", "_")
+        if hasattr(context, "scenario")
+        else "scenario"
+    )
+    screenshot_path = os.path.join(artifacts_dir, f"{safe_name}.png")
+    html_path = os.path.join(artifacts_dir, f"{safe_name}.html")
     try:
-        success_toast.first.wait_for(state="visible", timeout=DEFAULT_TIMEOUT_MS)
+        context.page.screenshot(path=screenshot_path, full_page=True)
+        with open(html_path, "w", encoding="utf-8") as f:
+            f.write(context.page.content())
     except Exception:
-        # Save debug artifacts: screenshot + page HTML
-        import os
-
-        os.makedirs("artifacts", exist_ok=True)
-        safe_name = (
-            context.scenario.name.replace(" ", "_").replace("/", "_")
-            if hasattr(context, "scenario")
-            else "scenario"
-        )
-        screenshot_path = f"artifacts/{safe_name}.png"
-        html_path = f"artifacts/{safe_name}.html"
-        try:
-            context.page.screenshot(path=screenshot_path, full_page=True)
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write(context.page.content())
-        except Exception:
-            pass
-
-        # If an error toast is visible, inspect it. If it's a duplicate-user
-        # message treat the step as idempotent (user already exists) — this
-        # keeps the Given step stable when the test DB already contains the
-        # user. For other errors, fail and include artifacts.
-        try:
-            if error_toast.first.is_visible():
-                text = error_toast.first.inner_text()
-                if "already exists" in text:
-                    # Ensure the row is present and continue without raising.
-                    users.expect_user_row(username)
-                    # If the Add User dialog remained open (duplicate error),
-                    # close it so subsequent steps can interact normally.
-                    try:
-                        dialog_close = context.page.locator("[data-slot='dialog-close']")
-                        if dialog_close.first.is_visible():
-                            dialog_close.first.click()
-                    except Exception:
-                        pass
-                    return
-                raise AssertionError(f"Create user failed: error toast visible: {text}")
-        except Exception:
-            pass
-
-        raise AssertionError(
-            f"Create user did not show success toast within timeout. Artifacts: {screenshot_path}, {html_path}"
-        )
-
-    # Allow the table to refresh after invalidation
-    users.expect_user_row(username)
+        pass
+    return screenshot_path, html_path
 
 
 # ===================================================================
@@ -155,11 +158,12 @@ def given_deactivated_user(context, username):
     users.open_row_menu(username)
     users.click_row_action("Deactivate")
 
-    # Wait for the deactivation success toast
+    # Wait for the deactivation success toast (or fail fast on an error toast)
     notifications = NotificationsPage(context.page)
-    notifications.wait_for_toast(
-        "deactivated", role="status", timeout=DEFAULT_TIMEOUT_MS
+    outcome, text = notifications.wait_for_outcome(
+        "deactivated", timeout=DEFAULT_TIMEOUT_MS
     )
+    assert outcome == "success", f"Deactivation failed: {text}"
     context.current_username = username
 
 
@@ -189,7 +193,7 @@ def when_actor_creates_user(context, username):
     if "/users" not in context.page.url:
         users.navigate()
         users.expect_visible()
-    users.create_user(username, DEFAULT_PASSWORD)
+    context.ui_response = users.create_user(username, DEFAULT_PASSWORD)
     context.current_username = username
 
 
@@ -204,7 +208,7 @@ def when_user_attempts_auth(context):
 
     # Try to sign in as the test user
     sign_in = _sign_in_page(context)
-    sign_in.login(username, DEFAULT_PASSWORD)
+    context.ui_response = sign_in.login(username, DEFAULT_PASSWORD)
 
 
 @when("an authorized actor activates the user")
@@ -245,6 +249,8 @@ def when_authorized_deactivates(context):
 @then('the request is rejected with a "user already exists" error')
 def then_request_rejected_duplicate(context):
     """Assert an error toast containing 'already exists' appears."""
+    response = context.ui_response
+    assert not response.ok, f"Expected the create request to fail, got {response.status}"
     # Wait for an error toast that contains the substring "already exists".
     notifications = NotificationsPage(context.page)
     notifications.wait_for_toast(
@@ -256,6 +262,8 @@ def then_request_rejected_duplicate(context):
 def then_authentication_denied(context):
     """Assert an error toast appears and the user stays on sign-in."""
     # The backend returns 401 with a message; the frontend shows it as an alert toast
+    response = context.ui_response
+    assert not response.ok, f"Expected sign-in to be rejected, got {response.status}"
     notifications = NotificationsPage(context.page)
     notifications.wait_for_toast(role="alert", timeout=DEFAULT_TIMEOUT_MS)
     # Verify we did NOT navigate away from sign-in
@@ -269,9 +277,12 @@ def then_user_becomes_active(context):
     """Assert the row status badge shows 'active'."""
     username = context.current_username
 
-    # Wait for the activation success toast
+    # Wait for the activation success toast (or fail fast on an error toast)
     notifications = NotificationsPage(context.page)
-    notifications.wait_for_toast("activated", role="status", timeout=DEFAULT_TIMEOUT_MS)
+    outcome, text = notifications.wait_for_outcome(
+        "activated", timeout=DEFAULT_TIMEOUT_MS
+    )
+    assert outcome == "success", f"Activation failed: {text}"
 
     # Verify status badge in the table row
     row = _users_page(context).user_row(username)
@@ -284,11 +295,12 @@ def then_user_becomes_deactivated(context):
     """Assert the row status badge shows 'inactive'."""
     username = context.current_username
 
-    # Wait for the deactivation success toast
+    # Wait for the deactivation success toast (or fail fast on an error toast)
     notifications = NotificationsPage(context.page)
-    notifications.wait_for_toast(
-        "deactivated", role="status", timeout=DEFAULT_TIMEOUT_MS
+    outcome, text = notifications.wait_for_outcome(
+        "deactivated", timeout=DEFAULT_TIMEOUT_MS
     )
+    assert outcome == "success", f"Deactivation failed: {text}"
 
     # Verify status badge in the table row
     row = _users_page(context).user_row(username)
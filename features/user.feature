@@ -8,6 +8,7 @@ Feature: User management
       Then the request is rejected with a "user already exists" error
 
   Rule: User activation affects login
+    @fresh_session
     Scenario: Deactivated users cannot authenticate
       Given a deactivated user with username "bob"
       When the user attempts to authenticate